@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 請求排程器
+所有 OpenAI API 呼叫都經過這裡：以 token bucket 控制每分鐘請求數 (RPM)
+與預估 token 數 (TPM)，遇到 429 / 逾時等暫時性錯誤時以帶抖動的指數退避重試
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+import openai
+
+# 可重試的暫時性錯誤
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+# 429 中代表帳號額度或帳單問題的錯誤碼，重試不會成功
+NON_RETRYABLE_CODES = {"insufficient_quota", "billing_hard_limit_reached"}
+
+
+class TokenBucket:
+    """每分鐘補充 rate_per_minute 個額度的 token bucket"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now):
+        """
+        預約額度 (可預支)，呼叫端需在鎖內使用
+
+        Returns:
+            float: 需要等待的秒數
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def retry_after_seconds(error):
+    """讀取錯誤回應中的 Retry-After (秒數或 HTTP 日期)，沒有時回傳 None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        # 格式錯誤的 Retry-After 當成沒有提供，改用指數退避
+        return None
+    return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def is_retryable(error):
+    """暫時性錯誤才重試；額度用完的 429 (insufficient_quota) 重試也不會成功"""
+    if not isinstance(error, RETRYABLE_ERRORS):
+        return False
+    return getattr(error, "code", None) not in NON_RETRYABLE_CODES
+
+
+class APIScheduler:
+    """依模型分開計算 RPM / TPM 的共用排程器 (執行緒安全)"""
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=200000,
+                 max_retries=5, base_delay=1.0, max_delay=60.0):
+        """
+        Args:
+            requests_per_minute (int): 未另外設定的模型使用的 RPM 上限
+            tokens_per_minute (int): 未另外設定的模型使用的 TPM 上限 (None 表示不限制)
+            max_retries (int): 暫時性錯誤的最多重試次數
+            base_delay (float): 指數退避的起始秒數
+            max_delay (float): 單次退避的最長秒數
+        """
+        self.default_limits = (requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limits = {}
+        self._buckets = {}
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.requests = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def set_limits(self, key, requests_per_minute, tokens_per_minute=None):
+        """設定某個模型的 RPM / TPM 上限"""
+        with self._lock:
+            self._limits[key] = (requests_per_minute, tokens_per_minute)
+            self._buckets.pop(key, None)
+
+    def _buckets_for(self, key):
+        if key not in self._buckets:
+            rpm, tpm = self._limits.get(key, self.default_limits)
+            self._buckets[key] = (TokenBucket(rpm), TokenBucket(tpm) if tpm else None)
+        return self._buckets[key]
+
+    def _acquire(self, key, estimated_tokens, not_before=0.0):
+        """等到請求與 token 額度都足夠、429 造成的全域暫停與本次的退避時間都結束才返回"""
+        with self._lock:
+            now = time.monotonic()
+            request_bucket, token_bucket = self._buckets_for(key)
+            wait = request_bucket.reserve(1, now)
+            if token_bucket is not None and estimated_tokens:
+                wait = max(wait, token_bucket.reserve(estimated_tokens, now))
+            wait = max(wait, self._paused_until - now, not_before - now)
+            self.requests += 1
+            if wait > 0:
+                self.throttled += 1
+                self.throttle_seconds += wait
+            self.queue_depth += 1
+        try:
+            if wait > 0:
+                time.sleep(wait)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def _retry_delay(self, error, attempt):
+        """有 Retry-After 時照辦，否則使用 full jitter 指數退避"""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.5)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, key, func, *args, estimated_tokens=0, **kwargs):
+        """
+        在額度內執行 API 呼叫，暫時性錯誤會自動重試
+
+        Args:
+            key (str): 額度分類 (通常是模型名稱)
+            func (callable): 要執行的 API 呼叫
+            estimated_tokens (int): 預估使用的 token 數 (輸入 + 最大輸出)
+
+        Returns:
+            API 呼叫的回傳值
+        """
+        not_before = 0.0
+        for attempt in range(self.max_retries + 1):
+            self._acquire(key, estimated_tokens, not_before)
+            try:
+                return func(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                # 額度用完時直接拋出，也不觸發全域暫停
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._retry_delay(e, attempt)
+                not_before = time.monotonic() + delay
+                with self._lock:
+                    self.retries += 1
+                    if isinstance(e, openai.RateLimitError):
+                        # 被限流時讓所有呼叫一起暫停，避免持續撞牆
+                        self.rate_limited += 1
+                        self._paused_until = max(self._paused_until, not_before)
+                print(f"⏳ API 暫時無法使用 ({type(e).__name__})，{delay:.1f} 秒後重試 ({attempt + 1}/{self.max_retries})")
+
+    def stats(self):
+        """
+        Returns:
+            dict: 等待中的請求數、總請求數、被限流次數與等待秒數、重試次數、429 次數
+        """
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "throttle_seconds": round(self.throttle_seconds, 2),
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+            }
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原子寫檔
+先寫入同資料夾的暫存檔，完成後才改名為目標檔案，中途失敗不會留下寫到一半的檔案。
+
+mkstemp 建立的暫存檔權限為 0600，改名前會套用目標檔案原本的權限；
+新檔案則與 open(path, "w") 相同，由 umask 決定 (通常為 0644)。
+"""
+
+import contextlib
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+# umask 只能在設定時讀出，於匯入時 (工作執行緒啟動前) 讀取一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _target_mode(path):
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="w", encoding="utf-8", suffix=".part"):
+    """
+    開啟暫存檔供寫入，離開 with 區塊時改名為 path；發生例外則刪除暫存檔
+
+    Args:
+        path (str or Path): 目標檔案
+        mode (str): "w" 或 "wb"
+        encoding (str): 文字模式的編碼
+
+    Yields:
+        file: 暫存檔的檔案物件
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=suffix, dir=path.parent)
+    try:
+        os.chmod(temp_path, _target_mode(path))
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def write_text_atomic(path, text):
+    """以原子方式寫入文字檔"""
+    with atomic_open(path) as f:
+        f.write(text)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音訊分段工具
+將超過 OpenAI 25MB 限制的錄音在靜音處切成多段，並將各段轉錄結果依序接合
+需要系統已安裝 ffmpeg 與 ffprobe
+"""
+
+import re
+import shutil
+import subprocess
+from difflib import SequenceMatcher
+from pathlib import Path
+
+SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+def check_ffmpeg():
+    """確認 ffmpeg / ffprobe 可以使用"""
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        raise RuntimeError("找不到 ffmpeg/ffprobe，處理超過 25MB 的檔案需要先安裝 ffmpeg")
+
+
+def probe_duration(file_path):
+    """
+    取得音訊長度
+
+    Args:
+        file_path (str): 音訊檔案路徑
+
+    Returns:
+        float: 長度 (秒)
+    """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+
+def detect_silences(file_path, noise_db=-35, min_silence=0.5):
+    """
+    使用 ffmpeg silencedetect 找出靜音區段
+
+    Args:
+        file_path (str): 音訊檔案路徑
+        noise_db (int): 低於此音量 (dB) 視為靜音
+        min_silence (float): 最短靜音長度 (秒)
+
+    Returns:
+        list: [(開始秒數, 結束秒數), ...]
+    """
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", str(file_path), "-vn",
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True, text=True, errors="replace"
+    )
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = SILENCE_START_RE.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_RE.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_chunks(duration, file_size, silences, max_chunk_bytes, overlap=1.0, search_ratio=0.15):
+    """
+    規劃切割點：在接近目標長度的靜音處切開，並讓相鄰兩段稍微重疊
+
+    目標長度由平均位元率換算，預留 10% 給容器標頭與位元率變化。
+
+    Args:
+        duration (float): 音訊總長度 (秒)
+        file_size (int): 檔案大小 (bytes)
+        silences (list): detect_silences 的結果
+        max_chunk_bytes (int): 每段大小上限 (bytes)
+        overlap (float): 相鄰兩段的重疊秒數
+        search_ratio (float): 在目標切點前多少比例的範圍內尋找靜音
+
+    Returns:
+        list: [(開始秒數, 結束秒數), ...]
+    """
+    if duration <= 0:
+        raise ValueError("無法取得音訊長度")
+
+    bytes_per_second = file_size / duration
+    target = max_chunk_bytes * 0.9 / bytes_per_second - 2 * overlap
+    if target <= overlap * 2:
+        raise ValueError("分段大小設定過小，無法切割此檔案")
+
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = []
+    position = 0.0
+    while duration - position > target:
+        ideal = position + target
+        window_start = ideal - target * search_ratio
+        candidates = [m for m in midpoints if window_start <= m <= ideal]
+        cut = max(candidates) if candidates else ideal
+        cuts.append(cut)
+        position = cut
+
+    bounds = [0.0] + cuts + [duration]
+    chunks = []
+    for i in range(len(bounds) - 1):
+        start = bounds[i] - overlap if i > 0 else 0.0
+        end = bounds[i + 1] + overlap if i + 1 < len(bounds) - 1 else duration
+        chunks.append((max(0.0, start), min(duration, end)))
+    return chunks
+
+
+def extract_chunk(file_path, start, end, output_path):
+    """
+    以串流複製 (不重新編碼) 的方式擷取一段音訊
+
+    Args:
+        file_path (str): 原始音訊檔案
+        start (float): 開始秒數
+        end (float): 結束秒數
+        output_path (str): 輸出檔案路徑
+
+    Returns:
+        Path: 輸出檔案路徑
+    """
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         "-ss", f"{start:.3f}", "-i", str(file_path), "-t", f"{end - start:.3f}",
+         "-vn", "-c", "copy", str(output_path)],
+        check=True
+    )
+    return Path(output_path)
+
+
+def _needs_space(left, right):
+    """英數字之間接合時需要空白，中文則直接相連"""
+    return left.isascii() and left.isalnum() and right.isascii() and right.isalnum()
+
+
+def merge_overlap(left, right, window=200, min_match=6):
+    """
+    接合兩段文字，移除重疊錄音造成的重複內容
+
+    在前段結尾與後段開頭各取一個視窗，找出最長的共同片段，
+    找到足夠長的共同片段時以它為接縫，否則直接相接。
+
+    Args:
+        left (str): 前一段文字
+        right (str): 後一段文字
+        window (int): 比對視窗大小 (字元)
+        min_match (int): 視為重疊的最短長度 (字元)
+
+    Returns:
+        str: 接合後的文字
+    """
+    left = left.rstrip()
+    right = right.lstrip()
+    if not left or not right:
+        return left or right
+
+    tail = left[-window:]
+    head = right[:window]
+    match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+    if match.size >= min_match:
+        cut = len(left) - len(tail) + match.a + match.size
+        return left[:cut] + right[match.b + match.size:]
+
+    separator = " " if _needs_space(left[-1], right[0]) else ""
+    return left + separator + right
+
+
+def stitch_transcripts(texts):
+    """
+    依序接合各段轉錄結果
+
+    Args:
+        texts (list): 各段轉錄文字 (依時間順序)
+
+    Returns:
+        str: 完整文字
+    """
+    merged = ""
+    for text in texts:
+        merged = merge_overlap(merged, text)
+    return merged
+
+
+def stitch_segments(segment_lists, chunks):
+    """
+    依序接合各段的時間戳記片段，轉換成原始錄音的時間並移除重疊區重複的片段
+
+    相鄰兩段重疊區的中點就是原本的切割點，每個片段只保留在中點落在
+    [前一個切割點, 下一個切割點) 之內的那一段。
+
+    Args:
+        segment_lists (list): 各段的片段 [(開始秒數, 結束秒數, 文字), ...]，時間相對於該段開頭
+        chunks (list): plan_chunks 的結果 [(開始秒數, 結束秒數), ...]
+
+    Returns:
+        list: [(開始秒數, 結束秒數, 文字), ...]，時間相對於原始錄音開頭
+    """
+    cuts = [(chunks[i][1] + chunks[i + 1][0]) / 2 for i in range(len(chunks) - 1)]
+    stitched = []
+    for i, (segments, (offset, _)) in enumerate(zip(segment_lists, chunks)):
+        low = cuts[i - 1] if i > 0 else float("-inf")
+        high = cuts[i] if i < len(cuts) else float("inf")
+        for start, end, text in segments:
+            start, end = start + offset, end + offset
+            if low <= (start + end) / 2 < high:
+                stitched.append((start, end, text))
+    return stitched
+
+
+def join_segments(segments):
+    """
+    依序相接片段的文字 (英數字之間加空白，中文直接相連)
+
+    Args:
+        segments (list): [(開始秒數, 結束秒數, 文字), ...]
+
+    Returns:
+        str: 完整文字
+    """
+    parts = []
+    for _, _, text in segments:
+        text = text.strip()
+        if not text:
+            continue
+        if parts and _needs_space(parts[-1][-1], text[0]):
+            parts.append(" ")
+        parts.append(text)
+    return "".join(parts)
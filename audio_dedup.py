@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複錄音偵測
+iCloud / AirDrop 同步常在資料夾留下同一段錄音的多個副本 (有時還被重新編碼成另一種格式)。
+先以檔案大小與內容雜湊找出完全相同的檔案，再以聲學指紋找出內容相同但編碼不同的錄音，
+每組只轉錄一個代表檔案，其他檔案直接複製它的結果。
+
+聲學指紋需要 ffmpeg 與 numpy；缺少時只偵測完全相同的檔案。
+"""
+
+import shutil
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from result_cache import hash_file
+from transcription_backends import audio_duration
+
+try:
+    import numpy as np
+except ImportError:  # numpy 為可選套件，只有聲學指紋需要
+    np = None
+
+EXACT = "exact"
+SIMILAR = "similar"
+
+# Whisper API 的價格 (美元 / 分鐘)，用來估計省下的費用
+WHISPER_USD_PER_MINUTE = 0.006
+
+# 指紋以 8kHz 單聲道計算，只取開頭的 FINGERPRINT_SECONDS 秒
+FINGERPRINT_RATE = 8000
+FINGERPRINT_SECONDS = 180
+FRAME_SIZE = 2048
+HOP_SIZE = 256
+# 300–2000Hz 之間以對數間隔分成 33 個頻帶，相鄰頻帶的能量差在時間上的變化構成每個音框 32 位元
+BAND_EDGES_HZ = (300, 2000)
+BANDS = 33
+
+# 兩個指紋的位元錯誤率低於此值視為同一段錄音 (無關的錄音約為 0.5)
+MAX_BIT_ERROR_RATE = 0.3
+# 比對時容許的最大時間位移 (秒)，涵蓋編碼器延遲與匯出時的些微裁切
+MAX_SHIFT_SECONDS = 2.0
+# 長度相差超過 max(2 秒, 2%) 的錄音不會是重新編碼的副本
+DURATION_TOLERANCE_SECONDS = 2.0
+DURATION_TOLERANCE_RATIO = 0.02
+# 整體音量低於此值 (約 -50 dBFS) 的錄音不計算指紋 (靜音的指紋沒有辨識度)
+MIN_RMS = 100
+# 比對時略過比最大聲的音框小 25dB 以上的音框 (停頓與背景雜訊)
+QUIET_FRAME_DB = 25
+
+
+def fingerprint_available():
+    """是否可以計算聲學指紋 (需要 numpy 與 ffmpeg)"""
+    return np is not None and shutil.which("ffmpeg") is not None
+
+
+def _decode(file_path, seconds=FINGERPRINT_SECONDS):
+    """以 ffmpeg 將錄音開頭解碼成 8kHz 單聲道 PCM"""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(file_path), "-vn",
+         "-t", str(seconds), "-ac", "1", "-ar", str(FINGERPRINT_RATE), "-f", "s16le", "pipe:1"],
+        capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype="<i2").astype(np.float32)
+
+
+def fingerprint(file_path):
+    """
+    計算聲學指紋：每個音框 (256ms，每 32ms 一個) 一個 32 位元整數
+
+    各頻帶的能量差在時間上變大為 1、變小為 0，對重新編碼、音量改變與些微雜訊不敏感。
+    所有音框一次以矩陣運算完成。
+
+    Returns:
+        tuple: (uint32 陣列, 是否為有聲音框的 bool 陣列)，錄音太短或太安靜時為 None
+    """
+    samples = _decode(file_path)
+    if len(samples) < FRAME_SIZE * 2 or np.sqrt(np.mean(samples ** 2)) < MIN_RMS:
+        return None
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1 / FINGERPRINT_RATE)
+    edges = np.geomspace(*BAND_EDGES_HZ, BANDS + 1)
+    band_of = np.digitize(freqs, edges) - 1
+    valid = (band_of >= 0) & (band_of < BANDS)
+    energy = np.zeros((len(frames), BANDS), dtype=np.float64)
+    np.add.at(energy.T, band_of[valid], spectrum[:, valid].T)
+    total = energy.sum(axis=1)
+    loud = total > np.percentile(total, 95) * 10 ** (-QUIET_FRAME_DB / 10)
+    energy = np.log(energy + 1e-6)
+
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    codes = np.packbits(bits, axis=1).view(">u4").ravel().astype(np.uint32)
+    return codes, loud[1:] & loud[:-1]
+
+
+def bit_error_rate(a, b, max_shift=None):
+    """
+    兩個指紋在容許的時間位移內最接近時的位元錯誤率 (只比較兩邊都有聲音的音框)
+
+    Args:
+        a, b (tuple): fingerprint() 的結果
+
+    Returns:
+        float: 0 (相同) 到 1；重疊部分太短時為 1
+    """
+    if max_shift is None:
+        max_shift = int(MAX_SHIFT_SECONDS * FINGERPRINT_RATE / HOP_SIZE)
+    (codes_a, loud_a), (codes_b, loud_b) = a, b
+    best = 1.0
+    min_overlap = max(16, min(loud_a.sum(), loud_b.sum()) // 2)
+    for shift in range(-max_shift, max_shift + 1):
+        start_a, start_b = max(shift, 0), max(-shift, 0)
+        n = min(len(codes_a) - start_a, len(codes_b) - start_b)
+        if n <= 0:
+            continue
+        both = loud_a[start_a:start_a + n] & loud_b[start_b:start_b + n]
+        if both.sum() < min_overlap:
+            continue
+        diff = np.bitwise_xor(codes_a[start_a:start_a + n][both], codes_b[start_b:start_b + n][both])
+        best = min(best, np.unpackbits(diff.view(np.uint8)).mean())
+    return float(best)
+
+
+class DuplicateGroup:
+    """一組重複的錄音：代表檔案與其他副本"""
+
+    def __init__(self, representative, duration):
+        self.representative = Path(representative)
+        self.duration = duration
+        # [(檔案, EXACT / SIMILAR, 位元錯誤率), ...]
+        self.duplicates = []
+
+    @property
+    def files(self):
+        return [self.representative] + [path for path, _, _ in self.duplicates]
+
+
+class DedupReport:
+    """重複偵測的結果與省下的上傳量、轉錄時間與費用"""
+
+    def __init__(self, files, groups, representatives, fingerprinted):
+        self.files = files
+        self.groups = groups
+        self.representatives = representatives
+        self.fingerprinted = fingerprinted
+
+    @property
+    def duplicate_count(self):
+        return sum(len(group.duplicates) for group in self.groups)
+
+    @property
+    def saved_bytes(self):
+        return sum(path.stat().st_size for group in self.groups for path, _, _ in group.duplicates)
+
+    @property
+    def saved_seconds(self):
+        return sum(group.duration * len(group.duplicates) for group in self.groups)
+
+    @property
+    def saved_usd(self):
+        return self.saved_seconds / 60 * WHISPER_USD_PER_MINUTE
+
+    def print(self, summary_types=()):
+        """印出重複的錄音與省下的上傳量及費用"""
+        if not self.groups:
+            print(f"🧬 {len(self.files)} 個檔案中沒有重複的錄音")
+            return
+        print(f"🧬 找到 {len(self.groups)} 組重複的錄音，共 {self.duplicate_count} 個副本不需要轉錄:")
+        for group in self.groups:
+            print(f"   📌 {group.representative.name} ({group.duration / 60:.1f} 分鐘)")
+            for path, kind, error_rate in group.duplicates:
+                detail = "內容相同" if kind == EXACT else f"聲音相似 (差異 {error_rate:.0%})"
+                print(f"      ↳ {path.name}  {detail}")
+        line = (f"💰 省下 {self.duplicate_count} 次上傳 ({self.saved_bytes / (1024 * 1024):.1f}MB)、"
+                f"{self.saved_seconds / 60:.1f} 分鐘轉錄，約 ${self.saved_usd:.2f}")
+        if summary_types:
+            line += f"，以及 {self.duplicate_count * len(summary_types)} 次整理"
+        print(line)
+
+
+def _exact_groups(files):
+    """
+    大小相同的檔案才計算雜湊
+
+    Returns:
+        dict: {檔案: 同內容的第一個檔案}，只包含有重複的檔案
+    """
+    by_size = defaultdict(list)
+    for path in files:
+        by_size[path.stat().st_size].append(path)
+    first = {}
+    for same_size in by_size.values():
+        if len(same_size) < 2:
+            continue
+        by_hash = defaultdict(list)
+        for path in same_size:
+            by_hash[hash_file(path)].append(path)
+        for group in by_hash.values():
+            if len(group) > 1:
+                first.update((path, group[0]) for path in group)
+    return first
+
+
+def _pick_representative(paths):
+    """優先選擇已有逐字稿的檔案，其次是最早的檔案 (通常是原始錄音)"""
+    return min(paths, key=lambda p: (not p.with_suffix(".txt").exists(), p.stat().st_mtime, str(p)))
+
+
+def find_duplicates(files, similar=True, workers=4):
+    """
+    找出完全相同與聲音相似的錄音
+
+    Args:
+        files (list): 音訊檔案路徑
+        similar (bool): 是否以聲學指紋比對重新編碼的副本
+        workers (int): 同時計算指紋的檔案數
+
+    Returns:
+        DedupReport: 重複的錄音組與每組的代表檔案
+    """
+    files = [Path(f) for f in files]
+    exact_first = _exact_groups(files)
+    # 完全相同的檔案視為同一個「內容」，每個內容只計算一次指紋
+    content_of = {path: exact_first.get(path, path) for path in files}
+    parent = {content: content for content in content_of.values()}
+
+    def find(content):
+        while parent[content] != content:
+            parent[content] = parent[parent[content]]
+            content = parent[content]
+        return content
+
+    fingerprinted = False
+    error_rates = {}
+    durations = {}
+    if similar and fingerprint_available():
+        fingerprinted = True
+
+        def measure(content):
+            try:
+                return content, audio_duration(content), fingerprint(content)
+            except (OSError, ValueError, subprocess.CalledProcessError):
+                return content, None, None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            measured = [row for row in executor.map(measure, sorted(parent, key=str)) if row[2] is not None]
+        durations = {content: duration for content, duration, _ in measured}
+        measured.sort(key=lambda row: row[1])
+
+        # 依長度排序，只比對長度相近的錄音
+        for i, (content_a, duration_a, print_a) in enumerate(measured):
+            tolerance = max(DURATION_TOLERANCE_SECONDS, duration_a * DURATION_TOLERANCE_RATIO)
+            for content_b, duration_b, print_b in measured[i + 1:]:
+                if duration_b - duration_a > tolerance:
+                    break
+                error_rate = bit_error_rate(print_a, print_b)
+                if error_rate <= MAX_BIT_ERROR_RATE:
+                    for content in (content_a, content_b):
+                        error_rates[content] = min(error_rate, error_rates.get(content, 1.0))
+                    parent[find(content_a)] = find(content_b)
+
+    members = defaultdict(list)
+    for path in files:
+        members[find(content_of[path])].append(path)
+    groups = []
+    representatives = []
+    for paths in members.values():
+        representative = _pick_representative(paths)
+        representatives.append(representative)
+        if len(paths) == 1:
+            continue
+        duration = durations.get(content_of[representative])
+        group = DuplicateGroup(representative, duration if duration is not None else audio_duration(representative))
+        for path in sorted(paths, key=str):
+            if path == representative:
+                continue
+            if content_of[path] == content_of[representative]:
+                group.duplicates.append((path, EXACT, 0.0))
+            else:
+                group.duplicates.append((path, SIMILAR, error_rates.get(content_of[path], 0.0)))
+        groups.append(group)
+    groups.sort(key=lambda group: str(group.representative))
+    return DedupReport(files, groups, sorted(representatives), fingerprinted)
+
+
+def copy_outputs(representative, duplicate, suffixes):
+    """
+    將代表檔案的輸出 (<檔名><suffix>) 複製給副本；
+    檔名相同、只有副檔名不同的副本 (新錄音 5.m4a 與 新錄音 5.mp3) 本來就共用輸出
+
+    Args:
+        representative (Path): 代表檔案
+        duplicate (Path): 副本
+        suffixes (list): 輸出檔的副檔名，例如 [".txt", ".會議紀錄.txt"]
+
+    Returns:
+        list: 複製出的檔案
+    """
+    copied = []
+    for suffix in suffixes:
+        source = Path(representative).with_suffix(suffix)
+        target = Path(duplicate).with_suffix(suffix)
+        if source.exists() and target != source:
+            shutil.copyfile(source, target)
+            copied.append(target)
+    return copied
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音訊前處理工具
+上傳前將錄音轉成單聲道 16kHz 的 Opus (WebM 容器)，並可選擇去除開頭與結尾的長靜音，
+大幅減少上傳量，也讓更多檔案不必走分段流程
+需要系統已安裝 ffmpeg 與 ffprobe
+"""
+
+import subprocess
+from pathlib import Path
+
+from audio_chunker import detect_silences, probe_duration
+
+# 語音辨識只需要單聲道 16kHz；Opus 在低位元率下仍能保留語音清晰度
+SAMPLE_RATE = 16000
+BITRATE = "24k"
+OUTPUT_SUFFIX = ".webm"
+
+
+def preprocess_signature(trim_silence=False, sample_rate=SAMPLE_RATE, bitrate=BITRATE):
+    """前處理設定的識別字串，用於快取鍵 (設定不同時轉錄結果可能不同)"""
+    return f"opus-{sample_rate}-{bitrate}-mono" + ("-trim" if trim_silence else "")
+
+
+def find_speech_bounds(file_path, duration, min_silence=2.0, noise_db=-35, margin=0.3):
+    """
+    找出去除開頭與結尾長靜音後的範圍
+
+    Args:
+        file_path (str): 音訊檔案路徑
+        duration (float): 音訊總長度 (秒)
+        min_silence (float): 只去除長度超過此秒數的靜音
+        noise_db (int): 低於此音量 (dB) 視為靜音
+        margin (float): 保留在語音前後的秒數
+
+    Returns:
+        tuple: (開始秒數, 結束秒數)，不需要裁切時為 None
+    """
+    silences = detect_silences(file_path, noise_db=noise_db, min_silence=min_silence)
+    start, end = 0.0, duration
+    if silences and silences[0][0] <= 0.05:
+        start = max(0.0, silences[0][1] - margin)
+    if silences and silences[-1][1] >= duration - 0.05:
+        end = min(duration, silences[-1][0] + margin)
+    if end <= start:
+        # 整段都是靜音時保留原樣，交給 Whisper 判斷
+        return None
+    if start == 0.0 and end == duration:
+        return None
+    return start, end
+
+
+def preprocess_audio(file_path, output_dir, trim_silence=False, sample_rate=SAMPLE_RATE, bitrate=BITRATE):
+    """
+    將音訊轉成單聲道、低取樣率的 Opus 檔案
+
+    ffmpeg 直接解碼並編碼到輸出檔，不會產生未壓縮的中間檔。
+
+    Args:
+        file_path (str): 原始音訊檔案
+        output_dir (str): 輸出資料夾 (通常是暫存資料夾)
+        trim_silence (bool): 是否去除開頭與結尾的長靜音
+        sample_rate (int): 輸出取樣率 (Hz)
+        bitrate (str): 輸出位元率
+
+    Returns:
+        tuple: (輸出檔案路徑, 去除的秒數, 開頭去除的秒數)
+    """
+    file_path = Path(file_path)
+    output_path = Path(output_dir) / f"{file_path.stem}{OUTPUT_SUFFIX}"
+
+    trim_args = []
+    trimmed = 0.0
+    offset = 0.0
+    if trim_silence:
+        duration = probe_duration(file_path)
+        bounds = find_speech_bounds(file_path, duration)
+        if bounds is not None:
+            start, end = bounds
+            trimmed = duration - (end - start)
+            offset = start
+            trim_args = ["-ss", f"{start:.3f}", "-t", f"{end - start:.3f}"]
+
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         *trim_args, "-i", str(file_path),
+         "-vn", "-ac", "1", "-ar", str(sample_rate),
+         "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+         str(output_path)],
+        check=True
+    )
+    return output_path, trimmed, offset
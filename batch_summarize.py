@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次整理
+把整個資料夾的整理請求打包成 JSONL，交給 OpenAI Batch API 離線處理
+(費用約為即時呼叫的一半，也不佔用即時呼叫的速率限制)。
+
+長文本需要多輪：先整理各段 (第一輪)，合併結果仍然太長時逐層合併，
+最後再依整理類型進行最終整理。所有檔案同一輪的請求一起送出，
+每一輪完成後才產生下一輪的請求。
+"""
+
+import json
+import time
+from pathlib import Path
+
+import http_transport
+from atomic_file import atomic_open
+from text_chunker import chunk_text, count_tokens
+
+# Batch API 單一批次的請求數上限
+MAX_BATCH_REQUESTS = 50000
+
+# 批次工作結束的狀態
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def plan_summaries(stt, text, summary_types, chunk_min_fill=0.0):
+    """
+    依即時整理相同的步驟產生每一輪的請求
+
+    以產生器表示：每次 yield 一輪的請求 (stt._xxx_request 產生的 tuple)，
+    呼叫端以 send() 送回同樣順序的結果，最後以 StopIteration.value 回傳整理結果。
+
+    Args:
+        stt (SpeechToText): 提供模型、token 預算與請求內容
+        text (str): 需要整理的文字
+        summary_types (list): 整理類型
+        chunk_min_fill (float): 分段至少填滿預算的比例 (與即時整理相同才能共用快取)
+
+    Returns:
+        dict: {整理類型: 整理後的文字}
+    """
+    if count_tokens(text, stt.summary_model) <= stt.max_input_tokens:
+        results = yield [stt._single_request(text, t) for t in summary_types]
+        return dict(zip(summary_types, results))
+
+    chunks = chunk_text(text, stt.chunk_tokens, stt.summary_model, min_fill=chunk_min_fill)
+    summaries = yield [stt._chunk_request(i, len(chunks), chunk) for i, chunk in enumerate(chunks)]
+
+    fan_in = max(2, int(stt.merge_fan_in))
+    while len(summaries) > 1 and \
+            count_tokens(stt._combine_summaries(summaries), stt.summary_model) > stt.max_input_tokens:
+        groups = [summaries[i:i + fan_in] for i in range(0, len(summaries), fan_in)]
+        summaries = yield [stt._condense_request(group) for group in groups]
+
+    combined_summary = stt._combine_summaries(summaries)
+    results = yield [stt._merge_request(combined_summary, t) for t in summary_types]
+    return dict(zip(summary_types, results))
+
+
+def _write_json_atomic(path, data):
+    with atomic_open(path, suffix=".tmp") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class BulkSummarizer:
+    """
+    以 Batch API 整理多份文字
+
+    每個請求的 custom_id 就是摘要快取鍵：相同內容只送出一次，結果寫入摘要快取，
+    之後的即時整理與批次整理都可以直接沿用。送出的批次記錄在狀態檔，
+    中斷後重新執行會先取回這些批次的結果，不會重複付費。
+    """
+
+    def __init__(self, stt, state_path=".stt_bulk_batches.json", poll_interval=30.0,
+                 max_batch_requests=MAX_BATCH_REQUESTS, chunk_min_fill=0.0):
+        """
+        Args:
+            stt (SpeechToText): 提供 OpenAI 客戶端、排程器、摘要快取與請求內容
+            state_path (str): 記錄未完成批次的狀態檔
+            poll_interval (float): 查詢批次狀態的間隔 (秒)
+            max_batch_requests (int): 單一批次的請求數上限
+            chunk_min_fill (float): 分段至少填滿預算的比例
+        """
+        self.stt = stt
+        self.state_path = Path(state_path)
+        self.poll_interval = poll_interval
+        self.max_batch_requests = max(1, int(max_batch_requests))
+        self.chunk_min_fill = chunk_min_fill
+        self._known = {}
+        self.counts = {"batches": 0, "batch_requests": 0, "cached": 0, "fallback": 0}
+
+    def run(self, documents, summary_types, on_done=None):
+        """
+        整理所有文字，直到每份文字的所有輪次都完成
+
+        Args:
+            documents (dict): {名稱: 文字}
+            summary_types (list): 整理類型
+            on_done (callable): 每份文字完成時呼叫 on_done(名稱, {整理類型: 文字})
+
+        Returns:
+            tuple: ({名稱: {整理類型: 文字}}, {名稱: 錯誤訊息})
+        """
+        self.resume()
+        results = {}
+        failed = {}
+        plans = {}
+        pending = {}
+        for name, text in documents.items():
+            plan = plan_summaries(self.stt, text, summary_types, self.chunk_min_fill)
+            plans[name] = plan
+            pending[name] = next(plan)
+
+        round_number = 1
+        while pending:
+            print(f"📦 第 {round_number} 輪: {len(pending)} 份文字，"
+                  f"{sum(len(requests) for requests in pending.values())} 個請求")
+            keys = {name: [self.stt._summary_cache_key(request[3]) for request in requests]
+                    for name, requests in pending.items()}
+            self._fetch(pending, keys)
+
+            next_pending = {}
+            for name, requests in pending.items():
+                try:
+                    outputs = [self._result(key, request) for key, request in zip(keys[name], requests)]
+                    next_pending[name] = plans[name].send(outputs)
+                except StopIteration as done:
+                    results[name] = done.value
+                    if on_done is not None:
+                        on_done(name, done.value)
+                except Exception as e:
+                    failed[name] = str(e)
+                    print(f"❌ {name}: {e}")
+            pending = next_pending
+            round_number += 1
+        return results, failed
+
+    def _fetch(self, pending, keys):
+        """把這一輪還沒有結果的請求 (相同的快取鍵只送一次) 分批送出並等待完成"""
+        batch = {}
+        for name, requests in pending.items():
+            for key, request in zip(keys[name], requests):
+                if key in self._known or key in batch:
+                    continue
+                cached = self.stt.summary_cache.get_result(key) if self.stt.summary_cache is not None else None
+                if cached is not None:
+                    self._known[key] = cached
+                    self.counts["cached"] += 1
+                else:
+                    batch[key] = request
+        if not batch:
+            print("♻️  這一輪的結果都已在快取中")
+            return
+
+        items = list(batch.items())
+        batch_ids = []
+        for start in range(0, len(items), self.max_batch_requests):
+            batch_ids.append(self.submit(items[start:start + self.max_batch_requests]))
+        for batch_id in batch_ids:
+            self.collect(batch_id)
+
+    def _result(self, key, request):
+        """取得一個請求的結果；批次中失敗的請求改以即時呼叫重送"""
+        if key not in self._known:
+            print(f"🔁 批次中失敗的請求改為即時呼叫 ({request[3][0]})")
+            self.counts["fallback"] += 1
+            self._known[key] = self.stt._chat(*request)
+        return self._known[key]
+
+    def _batch_line(self, key, request):
+        system_content, user_content, max_tokens, _ = request
+        return json.dumps({
+            "custom_id": key,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": self.stt.summary_model,
+                "messages": [
+                    {"role": "system", "content": system_content},
+                    {"role": "user", "content": user_content}
+                ],
+                "max_tokens": max_tokens,
+                "temperature": 0.3,
+            },
+        }, ensure_ascii=False)
+
+    def submit(self, items):
+        """
+        上傳 JSONL 並建立批次工作，記錄到狀態檔
+
+        Args:
+            items (list): [(快取鍵, 請求), ...]
+
+        Returns:
+            str: 批次工作 ID
+        """
+        client = self.stt.client
+        scheduler = self.stt.scheduler
+        transport = self.stt.transport
+        data = ("\n".join(self._batch_line(key, request) for key, request in items) + "\n").encode("utf-8")
+        print(f"📤 正在上傳 {len(items)} 個請求 ({len(data) / 1024:.1f}KB)...")
+        uploaded = scheduler.call(
+            "batches", self.stt.upload_client.files.create,
+            file=(f"stt_bulk_{int(time.time())}.jsonl", data, "application/jsonl"), purpose="batch",
+            timeout=transport.timeout(http_transport.FILES)
+        )
+        batch = scheduler.call(
+            "batches", client.batches.create,
+            input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window="24h",
+            metadata={"source": "speech_to_text bulk summarize"}, timeout=transport.timeout()
+        )
+        self._update_state(batch.id, {"requests": len(items), "created_at": time.time()})
+        self.counts["batches"] += 1
+        self.counts["batch_requests"] += len(items)
+        print(f"🚀 已建立批次工作: {batch.id}")
+        return batch.id
+
+    def collect(self, batch_id):
+        """
+        等待批次工作結束並取回結果，成功的結果寫入摘要快取
+
+        Returns:
+            int: 取得的結果數
+        """
+        client = self.stt.client
+        scheduler = self.stt.scheduler
+        transport = self.stt.transport
+        with self.stt.metrics.stage("batch", batch_id=batch_id) as stage:
+            last_progress = None
+            while True:
+                # 查詢間隔比 keep-alive 短時沿用同一條連線
+                batch = scheduler.call("batches", client.batches.retrieve, batch_id, timeout=transport.timeout())
+                if batch.status in FINAL_STATUSES:
+                    break
+                counts = batch.request_counts
+                progress = (batch.status, counts.completed if counts else 0, counts.total if counts else 0)
+                if progress != last_progress:
+                    print(f"⏳ 批次 {batch_id}: {progress[0]} ({progress[1]}/{progress[2]})")
+                    last_progress = progress
+                time.sleep(self.poll_interval)
+
+            stage["status"] = batch.status
+            received = 0
+            if batch.output_file_id:
+                content = scheduler.call(
+                    "batches", client.files.content, batch.output_file_id,
+                    timeout=transport.timeout(http_transport.FILES)
+                )
+                for line in content.text.splitlines():
+                    if line.strip() and self._ingest(json.loads(line)):
+                        received += 1
+            stage["results"] = received
+        if batch.status == "completed":
+            print(f"✅ 批次 {batch_id} 完成，取得 {received} 個結果")
+        else:
+            print(f"⚠️  批次 {batch_id} 狀態為 {batch.status}，取得 {received} 個結果，其餘改為即時呼叫")
+        self._update_state(batch_id, None)
+        return received
+
+    def _ingest(self, item):
+        """處理輸出檔的一行，成功時記錄結果並寫入摘要快取"""
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            return False
+        body = response.get("body") or {}
+        try:
+            content = body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            return False
+        key = item["custom_id"]
+        self._known[key] = content
+        if self.stt.summary_cache is not None:
+            self.stt.summary_cache.put_result(key, content, body.get("usage"))
+        return True
+
+    def resume(self):
+        """取回上次中斷時尚未取得結果的批次"""
+        batch_ids = list(self._load_state())
+        if batch_ids:
+            print(f"🔄 取回上次未完成的 {len(batch_ids)} 個批次...")
+        for batch_id in batch_ids:
+            self.collect(batch_id)
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, encoding="utf-8") as f:
+            return json.load(f).get("batches", {})
+
+    def _update_state(self, batch_id, entry):
+        batches = self._load_state()
+        if entry is None:
+            batches.pop(batch_id, None)
+        else:
+            batches[batch_id] = entry
+        if batches:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_json_atomic(self.state_path, {"batches": batches})
+        elif self.state_path.exists():
+            self.state_path.unlink()
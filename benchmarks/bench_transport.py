@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+連線重用測試
+以本機模擬的 OpenAI 伺服器比較 SDK 預設的連線設定與 http_transport 的共用連線池：
+同樣的工作量下建立了幾條連線、每條連線處理幾個請求，以及請求延遲。
+
+情境：
+    burst  多個執行緒連續轉錄並整理 (批次處理)
+    paced  每個執行緒每隔 --gap 秒送出一段 (即時轉錄、批次查詢狀態)，
+           間隔超過 SDK 預設的 5 秒 keep-alive 時每次都要重新連線
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import http_transport  # noqa: E402
+from mock_openai_server import MockConfig, MockOpenAIServer, _get_option  # noqa: E402
+from metrics import percentile  # noqa: E402
+from run_benchmarks import RESULTS_DIR, git_revision, make_audio_files  # noqa: E402
+
+TRANSPORTS = ("default", "tuned")
+
+
+def make_stt(transport):
+    """
+    建立 SpeechToText；default 換回 SDK 預設的連線設定 (加入 http_transport 之前的客戶端)
+    """
+    from openai import OpenAI
+    from speech_to_text import SpeechToText
+
+    # 每次都從空的連線池開始，避免沿用上一個情境留下的連線
+    http_transport.close_shared_clients()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stt = SpeechToText(use_cache=False)
+    if transport == "default":
+        stt.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"], max_retries=0)
+        stt.upload_client = stt.client
+    return stt
+
+
+def run_burst(stt, files, jobs):
+    """每個檔案轉錄後整理一次，jobs 個執行緒同時處理"""
+    latencies = []
+
+    def work(path):
+        start = time.perf_counter()
+        text = stt.transcribe_audio(path)
+        stt.summarize_text(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(work, files))
+    return latencies
+
+
+def run_paced(stt, path, jobs, rounds, gap):
+    """jobs 個執行緒各自每隔 gap 秒轉錄一段，共 rounds 次"""
+    latencies = []
+    lock = threading.Lock()
+
+    def work(_):
+        for i in range(rounds):
+            if i:
+                time.sleep(gap)
+            start = time.perf_counter()
+            stt.backends.openai.transcribe_clip(path, "zh")
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(work, range(jobs)))
+    return latencies
+
+
+def measure(server, name, transport, func):
+    server.reset_stats()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = func()
+    elapsed = time.perf_counter() - start
+    api = server.stats()
+    requests = sum(api["calls"].values())
+    return {
+        "scenario": name,
+        "transport": transport,
+        "requests": requests,
+        "connections": api["connections"],
+        "requests_per_connection": round(requests / max(1, api["connections"]), 2),
+        "elapsed_s": round(elapsed, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "max": round(max(latencies), 1),
+        },
+    }
+
+
+def print_result(result, baseline=None):
+    line = (f"{result['scenario']:<6} {result['transport']:<8} {result['requests']:>4} 請求  "
+            f"{result['connections']:>4} 連線 ({result['requests_per_connection']:>5.1f} 請求/連線)  "
+            f"{result['elapsed_s']:>7.2f}s  p50 {result['latency_ms']['p50']:>7.1f}ms  "
+            f"p95 {result['latency_ms']['p95']:>7.1f}ms")
+    if baseline is not None and baseline["connections"]:
+        line += f"  (連線數為 {baseline['transport']} 的 {result['connections'] / baseline['connections']:.0%})"
+    print(line)
+
+
+def main():
+    """
+    使用方法: python benchmarks/bench_transport.py [選項]
+        --jobs N            同時處理的執行緒數 (預設 8)
+        --files N           burst 情境的檔案數 (預設 32)
+        --rounds N          paced 情境每個執行緒送出的段數 (預設 3)
+        --gap 秒數          paced 情境每段之間的間隔 (預設 6，超過 SDK 預設的 5 秒 keep-alive)
+        --latency-ms N      模擬 API 延遲 (預設 50)
+        --handshake-ms N    每條新連線額外的交握延遲 (預設 30，模擬 TLS)
+        --only=burst,paced  只執行指定的情境
+        --output 檔案       結果 JSON 路徑 (預設 系統暫存資料夾/stt_benchmarks/transport-<時間>.json)
+    """
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print(main.__doc__)
+        return
+
+    config = MockConfig(
+        latency_ms=float(_get_option("latency-ms", 50)),
+        jitter_ms=0,
+        handshake_ms=float(_get_option("handshake-ms", 30)),
+        transcript_chars=500,
+        summary_chars=200,
+        latency_per_mb_ms=0,
+        seed=1234,
+    )
+    jobs = int(_get_option("jobs", 8))
+    file_count = int(_get_option("files", 32))
+    rounds = int(_get_option("rounds", 3))
+    gap = float(_get_option("gap", 6))
+    only = _get_option("only")
+    selected = set(only.split(",")) if only else {"burst", "paced"}
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    output_path = Path(_get_option("output", RESULTS_DIR / f"transport-{timestamp}.json"))
+
+    with MockOpenAIServer(config) as server, tempfile.TemporaryDirectory(prefix="stt_transport_") as work_dir:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "sk-mock"
+        os.environ.setdefault("STT_AUDIO_RPM", "60000")
+        os.environ.setdefault("STT_CHAT_RPM", "60000")
+        os.environ.setdefault("STT_CHAT_TPM", "100000000")
+        files = make_audio_files(work_dir, file_count, 256 * 1024, 1)
+
+        print(f"🧪 模擬伺服器: {server.base_url}")
+        print(f"⚙️  延遲 {config.latency_ms:g}ms，新連線交握 {config.handshake_ms:g}ms，同時 {jobs} 個")
+        print("─" * 60)
+        results = []
+        for name in ("burst", "paced"):
+            if name not in selected:
+                continue
+            baseline = None
+            for transport in TRANSPORTS:
+                stt = make_stt(transport)
+                if name == "burst":
+                    func = lambda: run_burst(stt, files, jobs)  # noqa: E731
+                else:
+                    func = lambda: run_paced(stt, files[0], jobs, rounds, gap)  # noqa: E731
+                result = measure(server, name, transport, func)
+                results.append(result)
+                print_result(result, baseline)
+                baseline = baseline or result
+
+    report = {
+        "timestamp": timestamp,
+        "git_revision": git_revision(),
+        "jobs": jobs,
+        "mock": config.to_dict(),
+        "tuned": http_transport.TransportConfig.from_env().describe(),
+        "results": results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("─" * 60)
+    print(f"💾 結果已儲存到: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
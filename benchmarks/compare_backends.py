@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轉錄引擎比較
+以實際的錄音比較 OpenAI API 與本機 faster-whisper 的即時率
+(real-time factor，處理時間 / 音訊長度，越小越快)，結果存成 JSON
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_openai_server import MockConfig, MockServerProcess, _get_option  # noqa: E402
+from metrics import percentile  # noqa: E402
+from run_benchmarks import RESULTS_DIR, git_revision, peak_rss_mb  # noqa: E402
+import transcription_backends  # noqa: E402
+from transcription_backends import audio_duration, timed_transcribe  # noqa: E402
+
+AUDIO_SUFFIXES = {".mp3", ".mp4", ".mpeg", ".mpga", ".m4a", ".wav", ".webm", ".ogg", ".flac"}
+
+
+def collect_files(targets):
+    files = []
+    for target in targets:
+        path = Path(target)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in AUDIO_SUFFIXES))
+        elif path.is_file():
+            files.append(path)
+    return files
+
+
+def run_backend(stt, name, files, language, runs, quiet=True):
+    """
+    以指定的轉錄引擎轉錄所有檔案 runs 次
+
+    Returns:
+        dict: 總音訊長度、處理時間、整體即時率與每個檔案即時率的百分位數
+    """
+    backend = stt.backends.local if name == transcription_backends.LOCAL else stt.backends.openai
+    load_s = 0.0
+    if name == transcription_backends.LOCAL:
+        # 模型載入只發生一次，與轉錄時間分開計算
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            backend._load()
+        load_s = time.perf_counter() - start
+
+    rows = []
+    errors = 0
+    for path in files:
+        duration = audio_duration(path)
+        for _ in range(runs):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                    text, _, elapsed, rtf = timed_transcribe(backend, path, language, duration)
+            except Exception as e:
+                errors += 1
+                print(f"  ❌ {path.name}: {e}")
+                continue
+            rows.append({"file": path.name, "audio_s": duration, "elapsed_s": elapsed, "rtf": rtf, "chars": len(text)})
+
+    audio_s = sum(row["audio_s"] for row in rows)
+    elapsed_s = sum(row["elapsed_s"] for row in rows)
+    rtfs = [row["rtf"] for row in rows if row["rtf"] is not None]
+    return {
+        "backend": name,
+        "model": backend.cache_id,
+        "files": len(files),
+        "runs": runs,
+        "audio_s": round(audio_s, 2),
+        "elapsed_s": round(elapsed_s, 2),
+        "load_s": round(load_s, 2),
+        "rtf": round(elapsed_s / audio_s, 4) if audio_s else None,
+        "rtf_p50": round(percentile(rtfs, 0.5), 4) if rtfs else None,
+        "rtf_p95": round(percentile(rtfs, 0.95), 4) if rtfs else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "errors": errors,
+        "rows": rows,
+    }
+
+
+def print_result(result):
+    if result["rtf"] is None:
+        print(f"{result['backend']:<8} 沒有成功的轉錄 (失敗 {result['errors']} 次)")
+        return
+    line = (f"{result['backend']:<8} {result['model']:<28} 音訊 {result['audio_s']:>8.1f}s  "
+            f"處理 {result['elapsed_s']:>8.1f}s  RTF {result['rtf']:>6.3f}  "
+            f"p50 {result['rtf_p50']:>6.3f}  p95 {result['rtf_p95']:>6.3f}  RSS {result['peak_rss_mb']:>6.1f}MB")
+    if result["load_s"]:
+        line += f"  (模型載入 {result['load_s']:.1f}s)"
+    if result["errors"]:
+        line += f"  ❌ {result['errors']} 失敗"
+    print(line)
+
+
+def main():
+    """
+    使用方法: python benchmarks/compare_backends.py <音訊檔案或資料夾>... [選項]
+        --backends=openai,local  要比較的轉錄引擎 (預設兩者；未安裝 faster-whisper 時略過 local)
+        --runs N                 每個檔案轉錄幾次 (預設 1)
+        --language=zh            語言代碼
+        --mock                   OpenAI 改用本機模擬伺服器 (只驗證流程，不代表實際的 API 速度)
+        --latency-ms N           模擬伺服器的延遲 (預設 200)
+        --output 檔案            結果 JSON 路徑 (預設 系統暫存資料夾/stt_benchmarks/backends-<時間>.json)
+        --verbose                顯示 SpeechToText 的輸出
+    """
+    targets = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--help" in sys.argv or "-h" in sys.argv or not targets:
+        print(main.__doc__)
+        return
+    files = collect_files(targets)
+    if not files:
+        print("❌ 找不到音訊檔案")
+        sys.exit(1)
+
+    names = _get_option("backends", "openai,local").split(",")
+    if transcription_backends.LOCAL in names and not transcription_backends.local_available():
+        print("⚠️  未安裝 faster-whisper，略過 local (pip install faster-whisper)")
+        names.remove(transcription_backends.LOCAL)
+    runs = int(_get_option("runs", 1))
+    language = _get_option("language", "zh")
+    quiet = "--verbose" not in sys.argv
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    output_path = Path(_get_option("output", RESULTS_DIR / f"backends-{timestamp}.json"))
+
+    with contextlib.ExitStack() as stack:
+        if "--mock" in sys.argv:
+            server = stack.enter_context(MockServerProcess(MockConfig(latency_ms=float(_get_option("latency-ms", 200)))))
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            os.environ["OPENAI_API_KEY"] = "sk-mock"
+            print(f"🧪 模擬伺服器: {server.base_url}")
+
+        from speech_to_text import SpeechToText
+
+        backend = transcription_backends.OPENAI if transcription_backends.OPENAI in names else transcription_backends.LOCAL
+        stt = SpeechToText(use_cache=False, backend=backend)
+        print(f"🎧 {len(files)} 個檔案，每個轉錄 {runs} 次")
+        print("─" * 60)
+        results = []
+        for name in names:
+            result = run_backend(stt, name, files, language, runs, quiet)
+            results.append(result)
+            print_result(result)
+
+    report = {
+        "timestamp": timestamp,
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "mock": "--mock" in sys.argv,
+        "results": results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("─" * 60)
+    print(f"💾 結果已儲存到: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機模擬 OpenAI API 伺服器
+提供 /v1/audio/transcriptions、/v1/chat/completions，以及批次整理用的 /v1/files 與 /v1/batches，
+可設定延遲、抖動、429 錯誤比例與回應大小，讓效能測試不必花費真正的 API 額度
+"""
+
+import email.parser
+import email.policy
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 產生回應文字用的句子
+SAMPLE_SENTENCES = [
+    "今天的會議主要討論下一季的產品規劃。",
+    "我們需要在月底前完成測試並提交報告。",
+    "客戶回饋顯示新版介面比較容易上手。",
+    "預算的部分還需要財務部門再確認一次。",
+    "接下來請各組分享目前的進度與遇到的問題。",
+]
+
+
+def make_text(chars, seed=0):
+    """產生約 chars 個字元的中文內容"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < chars:
+        sentence = rng.choice(SAMPLE_SENTENCES)
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)[:max(chars, 1)]
+
+
+class MockConfig:
+    """模擬伺服器的行為設定"""
+
+    def __init__(self, latency_ms=200.0, jitter_ms=50.0, error_rate=0.0,
+                 transcript_chars=2000, summary_chars=800, latency_per_mb_ms=100.0,
+                 retry_after_ms=200, batch_delay_ms=500.0, handshake_ms=0.0, seed=None):
+        """
+        Args:
+            latency_ms (float): 每個請求的基本延遲 (毫秒)
+            jitter_ms (float): 延遲的隨機抖動範圍 (± 毫秒)
+            error_rate (float): 回傳 429 的比例 (0 ~ 1)
+            transcript_chars (int): 轉錄結果的字元數
+            summary_chars (int): 整理結果的字元數
+            latency_per_mb_ms (float): 轉錄時每 MB 上傳量額外增加的延遲 (毫秒)
+            retry_after_ms (int): 429 回應附帶的 retry-after-ms
+            batch_delay_ms (float): 批次工作從建立到完成的時間 (毫秒)
+            handshake_ms (float): 每條新連線第一個請求額外的延遲 (毫秒)，模擬 TCP 與 TLS 交握
+            seed (int): 亂數種子 (可選)
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.transcript_chars = transcript_chars
+        self.summary_chars = summary_chars
+        self.latency_per_mb_ms = latency_per_mb_ms
+        self.retry_after_ms = retry_after_ms
+        self.batch_delay_ms = batch_delay_ms
+        self.handshake_ms = handshake_ms
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self._handshake_pending = True
+
+    def _handshake(self):
+        """
+        新連線的第一個請求先等待交握時間；連線數在這裡才計入，
+        只用來查詢或重設統計的連線 (MockServerProcess) 不會算進去
+        """
+        if self._handshake_pending:
+            self._handshake_pending = False
+            self.server.mock.count_connection()
+            delay = self.server.mock.config.handshake_ms
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+    def _read_body(self):
+        """讀取請求內容，支援 Content-Length 與 chunked 兩種傳輸方式"""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # 略過 trailer 直到空行
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_bytes(self, data, content_type="application/octet-stream"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        mock = self.server.mock
+        path = self.path.split("?", 1)[0].rstrip("/")
+        parts = path.split("/")
+        if path == "/stats":
+            self._send_json(200, mock.stats())
+            return
+        self._handshake()
+        if len(parts) >= 4 and parts[-2] == "batches":
+            batch = mock.get_batch(parts[-1])
+            if batch is None:
+                self._send_json(404, {"error": {"message": f"batch not found: {parts[-1]}"}})
+            else:
+                self._send_json(200, batch)
+        elif len(parts) >= 5 and parts[-3] == "files" and parts[-1] == "content":
+            data = mock.files.get(parts[-2])
+            if data is None:
+                self._send_json(404, {"error": {"message": f"file not found: {parts[-2]}"}})
+            else:
+                self._send_bytes(data)
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        mock = self.server.mock
+        body = self._read_body()
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/stats/reset":
+            mock.reset_stats()
+            self._send_json(200, mock.stats())
+            return
+        self._handshake()
+        if path.endswith("/files"):
+            self._send_json(200, mock.create_file(self.headers.get("Content-Type", ""), body))
+            return
+        if path.endswith("/batches"):
+            request = json.loads(body or b"{}")
+            if request.get("input_file_id") not in mock.files:
+                self._send_json(400, {"error": {"message": "input file not found"}})
+                return
+            self._send_json(200, mock.create_batch(request))
+            return
+        if path.endswith("/audio/transcriptions"):
+            endpoint = "transcriptions"
+        elif path.endswith("/chat/completions"):
+            endpoint = "chat"
+        else:
+            self._send_json(404, {"error": {"message": f"unknown endpoint: {self.path}"}})
+            return
+
+        delay, rate_limited = mock.plan_request(endpoint, len(body))
+        time.sleep(delay)
+        if rate_limited:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"retry-after-ms": str(mock.config.retry_after_ms)}
+            )
+            return
+
+        if endpoint == "transcriptions":
+            self._send_json(200, transcription(self.headers.get("Content-Type", ""), body, mock.config.transcript_chars))
+            return
+
+        request = json.loads(body or b"{}")
+        if request.get("stream"):
+            content = make_text(mock.config.summary_chars, len(body))
+            self._stream_chat(request, content, max(1, len(body) // 3), len(content))
+        else:
+            self._send_json(200, chat_completion(request, len(body), mock.config.summary_chars))
+
+    def _stream_chat(self, request, content, prompt_tokens, completion_tokens):
+        """以 server-sent events 逐段回傳內容"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+        }
+
+        def send(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        step = 20
+        for i in range(0, len(content), step):
+            delta = {"content": content[i:i + step]}
+            if i == 0:
+                delta["role"] = "assistant"
+            send(json.dumps({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]},
+                            ensure_ascii=False))
+        send(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send(json.dumps({**base, "choices": [], "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }}))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def chat_completion(request, body_bytes, summary_chars):
+    """產生 chat.completion 回應內容 (即時呼叫與批次工作共用)"""
+    content = make_text(summary_chars, body_bytes)
+    prompt_tokens = max(1, body_bytes // 3)
+    completion_tokens = len(content)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def transcription(content_type, body, transcript_chars):
+    """
+    產生轉錄回應：response_format=verbose_json 時附帶每句一個片段的時間戳記 (每個字約 0.25 秒)
+    """
+    text = make_text(transcript_chars, len(body))
+    fields = _parse_multipart(content_type, body)
+    if fields.get("response_format") != b"verbose_json":
+        return {"text": text}
+    segments = []
+    offset = 0
+    position = 0.0
+    for sentence in text.split("。"):
+        if not sentence:
+            continue
+        piece = sentence + "。" if offset + len(sentence) < len(text) else sentence
+        duration = round(len(piece) * 0.25, 2)
+        segments.append({
+            "id": len(segments), "seek": 0, "start": round(position, 2), "end": round(position + duration, 2),
+            "text": piece, "tokens": [], "temperature": 0.0, "avg_logprob": -0.2,
+            "compression_ratio": 1.2, "no_speech_prob": 0.01,
+        })
+        offset += len(piece)
+        position += duration + 0.3
+    language = (fields.get("language") or b"zh").decode()
+    return {"task": "transcribe", "language": language, "duration": round(position, 2), "text": text,
+            "segments": segments}
+
+
+def _parse_multipart(content_type, body):
+    """
+    Returns:
+        dict: {欄位名稱: bytes}
+    """
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = part.get_payload(decode=True) or b""
+    return fields
+
+
+class MockOpenAIServer:
+    """在背景執行緒執行的模擬伺服器，並統計各端點的呼叫次數"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        """
+        Args:
+            config (MockConfig): 行為設定
+            host (str): 監聽位址
+            port (int): 監聽埠號 (0 表示自動選擇)
+        """
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+        self.files = {}
+        self._batches = {}
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def plan_request(self, endpoint, body_bytes):
+        """
+        決定這次請求的延遲以及是否回傳 429，並更新統計
+
+        Returns:
+            tuple: (延遲秒數, 是否回傳 429)
+        """
+        config = self.config
+        with self._lock:
+            rate_limited = self._rng.random() < config.error_rate
+            jitter = self._rng.uniform(-config.jitter_ms, config.jitter_ms)
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            self.request_bytes += body_bytes
+            if rate_limited:
+                self.rate_limited[endpoint] = self.rate_limited.get(endpoint, 0) + 1
+        delay_ms = config.latency_ms + jitter
+        if endpoint == "transcriptions" and not rate_limited:
+            delay_ms += config.latency_per_mb_ms * body_bytes / (1024 * 1024)
+        return max(0.0, delay_ms) / 1000, rate_limited
+
+    def create_file(self, content_type, body):
+        """儲存上傳的檔案 (批次工作的輸入 JSONL)"""
+        fields = _parse_multipart(content_type, body)
+        data = fields.get("file", b"")
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self.files[file_id] = data
+            self.calls["files"] = self.calls.get("files", 0) + 1
+            self.request_bytes += len(body)
+        return {
+            "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": "batch.jsonl", "purpose": (fields.get("purpose") or b"batch").decode(), "status": "processed",
+        }
+
+    def create_batch(self, request):
+        """建立批次工作，batch_delay_ms 之後視為完成"""
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        lines = [line for line in self.files[request["input_file_id"]].splitlines() if line.strip()]
+        now = time.time()
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(now),
+            "metadata": request.get("metadata"),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        with self._lock:
+            self._batches[batch_id] = (batch, lines, now + self.config.batch_delay_ms / 1000)
+            self.calls["batches"] = self.calls.get("batches", 0) + 1
+            self.calls["batch_requests"] = self.calls.get("batch_requests", 0) + len(lines)
+        return dict(batch)
+
+    def get_batch(self, batch_id):
+        """
+        查詢批次工作；時間到了就產生所有結果並寫入輸出檔
+
+        Returns:
+            dict: 批次工作狀態，找不到時為 None
+        """
+        with self._lock:
+            entry = self._batches.get(batch_id)
+            if entry is None:
+                return None
+            batch, lines, done_at = entry
+            if batch["status"] == "in_progress" and time.time() >= done_at:
+                output = []
+                for line in lines:
+                    item = json.loads(line)
+                    body = json.dumps(item["body"], ensure_ascii=False).encode("utf-8")
+                    output.append(json.dumps({
+                        "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                        "custom_id": item["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "request_id": uuid.uuid4().hex,
+                            "body": chat_completion(item["body"], len(body), self.config.summary_chars),
+                        },
+                        "error": None,
+                    }, ensure_ascii=False))
+                output_id = f"file-{uuid.uuid4().hex[:12]}"
+                self.files[output_id] = ("\n".join(output) + "\n").encode("utf-8")
+                batch.update(
+                    status="completed", output_file_id=output_id, completed_at=int(time.time()),
+                    request_counts={"total": len(lines), "completed": len(lines), "failed": 0},
+                )
+            return dict(batch)
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = {}
+            self.rate_limited = {}
+            self.request_bytes = 0
+            self.connections = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: 各端點呼叫次數、429 次數、收到的位元組數與建立的連線數
+        """
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "rate_limited": dict(self.rate_limited),
+                "request_bytes": self.request_bytes,
+                "connections": self.connections,
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class MockServerProcess:
+    """
+    在子程序執行的模擬伺服器，介面與 MockOpenAIServer 相同
+
+    模擬伺服器解析上傳內容時會用掉與上傳量相當的記憶體，放在子程序裡
+    量測記憶體峰值時才只會算到客戶端；統計資料透過 /stats 與 /stats/reset 取得
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self._host = host
+        self._port = port
+        self._process = None
+        self.base_url = None
+
+    def _control(self, path, method="GET"):
+        root = self.base_url[:-len("/v1")]
+        request = urllib.request.Request(root + path, data=b"" if method == "POST" else None, method=method)
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())
+
+    def stats(self):
+        return self._control("/stats")
+
+    def reset_stats(self):
+        self._control("/stats/reset", method="POST")
+
+    def start(self):
+        self._process = subprocess.Popen(
+            [sys.executable, "-u", __file__, "--host", self._host, "--port", str(self._port),
+             "--config", json.dumps(self.config.to_dict())],
+            stdout=subprocess.PIPE, text=True, encoding="utf-8",
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        )
+        # 第一行為「🧪 模擬 OpenAI 伺服器已啟動: <base_url>」
+        line = self._process.stdout.readline()
+        if not line.strip():
+            self._process.wait()
+            raise RuntimeError(f"模擬伺服器啟動失敗 (結束碼 {self._process.returncode})")
+        self.base_url = line.split(": ", 1)[1].strip()
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _get_option(name, default=None):
+    """讀取命令列選項，支援 --name=值 與 --name 值 兩種寫法"""
+    flag = f"--{name}"
+    for i, arg in enumerate(sys.argv):
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+        if arg == flag and i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("--"):
+            return sys.argv[i + 1]
+    return default
+
+
+def main():
+    """單獨執行模擬伺服器，供手動測試使用 (--config 為 MockConfig 的 JSON，供 MockServerProcess 使用)"""
+    config_json = _get_option("config")
+    if config_json:
+        config = MockConfig(**json.loads(config_json))
+    else:
+        config = MockConfig(
+            latency_ms=float(_get_option("latency-ms", 200)),
+            jitter_ms=float(_get_option("jitter-ms", 50)),
+            error_rate=float(_get_option("error-rate", 0)),
+            transcript_chars=int(_get_option("transcript-chars", 2000)),
+            summary_chars=int(_get_option("summary-chars", 800)),
+            batch_delay_ms=float(_get_option("batch-delay-ms", 500)),
+            handshake_ms=float(_get_option("handshake-ms", 0)),
+        )
+    server = MockOpenAIServer(config, host=_get_option("host", "127.0.0.1"), port=int(_get_option("port", 8765)))
+    print(f"🧪 模擬 OpenAI 伺服器已啟動: {server.base_url}")
+    print(f"💡 使用方式: OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=sk-mock python speech_to_text.py ...")
+    print("💡 按 Ctrl-C 停止")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 已停止")
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
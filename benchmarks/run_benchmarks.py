@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+效能測試
+以本機模擬的 OpenAI 伺服器驅動 SpeechToText 的 process_file、process_text_file
+與 _process_long_text，量測吞吐量、延遲百分位數、記憶體峰值與 API 呼叫次數，
+結果存成 JSON 方便比較不同版本
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_openai_server import MockConfig, MockServerProcess, _get_option, make_text  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+# 合成語料：(名稱, 檔案數, 每個檔案大小 或 字元數)
+AUDIO_CORPORA = [
+    ("audio_small", 8, 256 * 1024),
+    ("audio_medium", 4, 4 * 1024 * 1024),
+    ("audio_large", 2, 20 * 1024 * 1024),
+]
+TEXT_CORPORA = [
+    ("text_short", 8, 2000),
+    ("text_medium", 4, 6000),
+]
+LONG_TEXT_CORPORA = [
+    ("long_text_50k", 1, 50000),
+    ("long_text_200k", 1, 200000),
+]
+
+
+# 未指定 --output 時結果存放的資料夾 (不寫進專案目錄)
+RESULTS_DIR = Path(tempfile.gettempdir()) / "stt_benchmarks"
+
+
+def peak_rss_mb():
+    """
+    目前程序的記憶體峰值 (MB)，Linux 的 ru_maxrss 單位為 KB，macOS 為 bytes
+    模擬伺服器在子程序執行 (MockServerProcess)，這裡只包含客戶端；
+    上傳時以 mmap 對應的檔案頁面也會計入，但屬於可回收的頁面快取，不是複製出來的 bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_audio_files(folder, count, size, seed):
+    """建立隨機內容的假音訊檔 (模擬伺服器不會解碼)"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = Path(folder) / f"{seed}_{i}.m4a"
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                block = min(remaining, 1024 * 1024)
+                f.write(rng.randbytes(block))
+                remaining -= block
+        paths.append(path)
+    return paths
+
+
+def make_text_files(folder, count, chars, seed):
+    paths = []
+    for i in range(count):
+        path = Path(folder) / f"{seed}_{i}.txt"
+        path.write_text(make_text(chars, seed * 1000 + i), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def run_scenario(stt, server, name, items, func, jobs, units, quiet=True):
+    """
+    以 jobs 個執行緒處理 items，回傳統計結果
+
+    Args:
+        items (list): 要處理的項目
+        func (callable): 處理單一項目的函式
+        units (float): 這批項目的總量 (MB 或字元數)，用來計算吞吐量
+    """
+    server.reset_stats()
+    scheduler_before = stt.scheduler.stats()
+    latencies = []
+    errors = []
+
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            func(item)
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    output = io.StringIO() if quiet else sys.stdout
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(timed, items))
+    elapsed = time.perf_counter() - start
+
+    scheduler_after = stt.scheduler.stats()
+    api = server.stats()
+    return {
+        "scenario": name,
+        "items": len(items),
+        "jobs": jobs,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "items_per_min": round(len(items) / elapsed * 60, 2),
+        "units_per_s": round(units / elapsed, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "max": round(max(latencies), 1),
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "api_calls": api["calls"],
+        "api_rate_limited": api["rate_limited"],
+        "api_request_mb": round(api["request_bytes"] / (1024 * 1024), 2),
+        "scheduler_retries": scheduler_after["retries"] - scheduler_before["retries"],
+        "scheduler_throttle_s": round(scheduler_after["throttle_seconds"] - scheduler_before["throttle_seconds"], 2),
+    }
+
+
+def print_result(result, baseline=None):
+    line = (f"{result['scenario']:<16} {result['items']:>4} 項  {result['elapsed_s']:>8.2f}s  "
+            f"{result['items_per_min']:>8.1f}/分  p50 {result['latency_ms']['p50']:>8.1f}ms  "
+            f"p95 {result['latency_ms']['p95']:>8.1f}ms  RSS {result['peak_rss_mb']:>6.1f}MB  "
+            f"API {sum(result['api_calls'].values()):>4}")
+    if baseline and baseline.get("elapsed_s"):
+        line += f"  ({baseline['elapsed_s'] / result['elapsed_s']:.2f}x)"
+    if result["errors"]:
+        line += f"  ❌ {result['errors']} 失敗"
+    print(line)
+
+
+def main():
+    """
+    使用方法: python benchmarks/run_benchmarks.py [選項]
+        --only=名稱1,名稱2     只執行指定的情境
+        --jobs N               同時處理的檔案數 (預設 4)
+        --latency-ms N         模擬 API 延遲 (預設 200)
+        --jitter-ms N          延遲抖動 (預設 50)
+        --error-rate R         429 比例 (預設 0.02)
+        --transcript-chars N   轉錄結果字元數 (預設 2000)
+        --summary-chars N      整理結果字元數 (預設 800)
+        --cache                開啟本機快取 (預設關閉，量測實際 API 路徑)
+        --output 檔案          結果 JSON 路徑 (預設 系統暫存資料夾/stt_benchmarks/<時間>.json)
+        --baseline 檔案        與先前的結果比較
+        --verbose              顯示 SpeechToText 的輸出
+    """
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print(main.__doc__)
+        return
+
+    config = MockConfig(
+        latency_ms=float(_get_option("latency-ms", 200)),
+        jitter_ms=float(_get_option("jitter-ms", 50)),
+        error_rate=float(_get_option("error-rate", 0.02)),
+        transcript_chars=int(_get_option("transcript-chars", 2000)),
+        summary_chars=int(_get_option("summary-chars", 800)),
+        seed=1234,
+    )
+    jobs = int(_get_option("jobs", 4))
+    only = _get_option("only")
+    selected = set(only.split(",")) if only else None
+    quiet = "--verbose" not in sys.argv
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    output_path = Path(_get_option("output", RESULTS_DIR / f"{timestamp}.json"))
+    baseline = {}
+    baseline_path = _get_option("baseline")
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    def wanted(name):
+        return selected is None or name in selected
+
+    with MockServerProcess(config) as server, tempfile.TemporaryDirectory(prefix="stt_bench_") as work_dir:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "sk-mock"
+        os.environ["STT_CACHE_DIR"] = str(Path(work_dir) / "cache")
+        # 模擬環境不需要真實帳號的限流設定
+        os.environ.setdefault("STT_AUDIO_RPM", "6000")
+        os.environ.setdefault("STT_CHAT_RPM", "6000")
+        os.environ.setdefault("STT_CHAT_TPM", "10000000")
+
+        from speech_to_text import SpeechToText
+
+        stt = SpeechToText(use_cache="--cache" in sys.argv)
+        print(f"🧪 模擬伺服器: {server.base_url}")
+        print(f"⚙️  延遲 {config.latency_ms:g}±{config.jitter_ms:g}ms，429 比例 {config.error_rate:g}，同時 {jobs} 個")
+        print("─" * 60)
+
+        results = []
+
+        def record(result):
+            results.append(result)
+            print_result(result, baseline.get(result["scenario"]))
+
+        for seed, (name, count, size) in enumerate(AUDIO_CORPORA, start=1):
+            if not wanted(name):
+                continue
+            files = make_audio_files(work_dir, count, size, seed)
+            record(run_scenario(
+                stt, server, name, files,
+                lambda path: stt.process_file(path, auto_summarize=True),
+                jobs, count * size / (1024 * 1024), quiet
+            ))
+
+        for seed, (name, count, chars) in enumerate(TEXT_CORPORA, start=10):
+            if not wanted(name):
+                continue
+            files = make_text_files(work_dir, count, chars, seed)
+            record(run_scenario(
+                stt, server, name, files,
+                lambda path: stt.process_text_file(path),
+                jobs, count * chars, quiet
+            ))
+
+        for seed, (name, count, chars) in enumerate(LONG_TEXT_CORPORA, start=20):
+            if not wanted(name):
+                continue
+            texts = [make_text(chars, seed * 1000 + i) for i in range(count)]
+            record(run_scenario(
+                stt, server, name, texts,
+                lambda text: stt._process_long_text(text, "重點整理"),
+                1, count * chars, quiet
+            ))
+
+    report = {
+        "timestamp": timestamp,
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jobs": jobs,
+        "cache": "--cache" in sys.argv,
+        "mock": config.to_dict(),
+        "results": results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("─" * 60)
+    print(f"💾 結果已儲存到: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,11 @@
 
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from text_loader import DIAGNOSE_ENCODINGS, load_text
+
 def diagnose_file(file_path):
     """診斷檔案問題"""
     file_path = Path(file_path)
@@ -30,50 +33,30 @@ def diagnose_file(file_path):
         print("❌ 檔案是空的")
         return
     
-    # 嘗試不同編碼讀取檔案
-    encodings = ['utf-8', 'big5', 'cp950', 'gbk', 'latin-1']
-    content = None
-    used_encoding = None
-    
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            used_encoding = encoding
-            print(f"✅ 成功使用 {encoding} 編碼讀取")
-            break
-        except UnicodeDecodeError:
-            print(f"❌ {encoding} 編碼讀取失敗")
-            continue
-    
-    if content is None:
+    # 由 BOM 與開頭樣本判斷編碼，再分段解碼並一次算出所有統計 (不保留完整內容)
+    try:
+        loaded = load_text(file_path, DIAGNOSE_ENCODINGS, keep_text=False)
+    except ValueError:
         print("❌ 無法使用任何常見編碼讀取檔案")
         return
+    stats = loaded.stats
+    print(f"✅ 成功使用 {loaded.encoding} 編碼讀取")
     
     # 分析內容
-    print(f"📝 使用編碼: {used_encoding}")
-    print(f"📄 總字元數: {len(content)}")
-    
-    lines = content.splitlines()
-    print(f"📊 總行數: {len(lines)}")
-    
-    non_empty_lines = [line.strip() for line in lines if line.strip()]
-    print(f"📊 非空行數: {len(non_empty_lines)}")
+    print(f"📝 使用編碼: {loaded.encoding}")
+    print(f"📄 總字元數: {stats.chars}")
+    print(f"📊 總行數: {stats.lines}")
+    print(f"📊 非空行數: {stats.non_empty_lines}")
     
     # 檢查內容類型
-    import re
-    chinese_chars = re.findall(r'[\u4e00-\u9fff]', content)
-    english_chars = re.findall(r'[a-zA-Z]', content)
-    digits = re.findall(r'\d', content)
-    
-    print(f"🈳 中文字符數: {len(chinese_chars)}")
-    print(f"🔤 英文字符數: {len(english_chars)}")
-    print(f"🔢 數字字符數: {len(digits)}")
+    print(f"🈳 中文字符數: {stats.cjk}")
+    print(f"🔤 英文字符數: {stats.latin}")
+    print(f"🔢 數字字符數: {stats.digits}")
     
     # 顯示前幾行內容
     print("\n📄 檔案前 5 行內容:")
     print("-" * 50)
-    for i, line in enumerate(lines[:5]):
+    for i, line in enumerate(stats.preview):
         if line.strip():
             print(f"{i+1:2}: {line[:100]}{'...' if len(line) > 100 else ''}")
         else:
@@ -81,30 +64,104 @@ def diagnose_file(file_path):
     print("-" * 50)
     
     # 檢查特殊字符
-    special_chars = set()
-    for char in content:
-        if ord(char) < 32 and char not in '\n\r\t':
-            special_chars.add(repr(char))
-    
-    if special_chars:
-        print(f"⚠️  發現特殊控制字符: {', '.join(list(special_chars)[:10])}")
+    if stats.control_chars:
+        print(f"⚠️  發現特殊控制字符: {', '.join(sorted(stats.control_chars)[:10])}")
     
     # 檢查是否適合整理
-    if len(content.strip()) < 50:
-        print("⚠️  內容太短，可能不適合進行 AI 整理")
-    elif len(chinese_chars) < 10:
-        print("⚠️  中文內容較少，整理效果可能不佳")
-    else:
-        print("✅ 檔案內容適合進行 AI 整理")
+    ok, message = _suitability(stats)
+    print(f"{'✅' if ok else '⚠️ '} {message}")
     
     print("\n💡 如果檔案有問題，請檢查:")
     print("   1. 檔案是否為純文字格式")
     print("   2. 檔案編碼是否正確")
     print("   3. 檔案是否包含有意義的文字內容")
 
+def _suitability(stats):
+    """
+    Returns:
+        tuple: (是否適合整理, 說明)
+    """
+    if stats.content_chars < 50:
+        return False, "內容太短，可能不適合進行 AI 整理"
+    if stats.cjk < 10:
+        return False, "中文內容較少，整理效果可能不佳"
+    return True, "檔案內容適合進行 AI 整理"
+
+def scan_file(file_path):
+    """
+    批次模式使用：診斷單一檔案並回傳結果 (在子程序中執行)
+
+    Returns:
+        dict: 檔案、大小、編碼、統計與問題說明
+    """
+    result = {"file": str(file_path), "size": os.path.getsize(file_path), "encoding": None, "ok": False}
+    if result["size"] == 0:
+        result["issue"] = "檔案是空的"
+        return result
+    try:
+        loaded = load_text(file_path, DIAGNOSE_ENCODINGS, keep_text=False)
+    except ValueError:
+        result["issue"] = "無法辨識編碼"
+        return result
+    except OSError as e:
+        result["issue"] = str(e)
+        return result
+    stats = loaded.stats
+    ok, message = _suitability(stats)
+    result.update(
+        encoding=loaded.encoding, ok=ok and not stats.control_chars,
+        chars=stats.chars, cjk=stats.cjk, lines=stats.lines, control=stats.control,
+    )
+    if not ok:
+        result["issue"] = message
+    elif stats.control_chars:
+        result["issue"] = f"含有 {stats.control} 個控制字元"
+    return result
+
+def diagnose_folder(folder, pattern="*.txt", workers=None):
+    """
+    以多個程序同時診斷資料夾中的所有文字檔案
+
+    Args:
+        folder (str): 資料夾路徑 (包含子資料夾)
+        pattern (str): 檔名樣式
+        workers (int): 同時執行的程序數，預設為 CPU 核心數
+
+    Returns:
+        list: 各檔案的診斷結果 (依檔名排序)
+    """
+    files = sorted(p for p in Path(folder).rglob(pattern) if p.is_file())
+    if not files:
+        print(f"⚠️  找不到符合 {pattern} 的檔案: {folder}")
+        return []
+
+    print(f"🔍 批次診斷 {len(files)} 個檔案: {folder}")
+    print("=" * 70)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(scan_file, files, chunksize=4))
+
+    for result in results:
+        name = Path(result["file"]).name
+        if result["encoding"] is None:
+            print(f"❌ {name}: {result['issue']}")
+            continue
+        mark = "✅" if result["ok"] else "⚠️ "
+        print(f"{mark} {name}: {result['encoding']}，{result['chars']} 字元 (中文 {result['cjk']})，"
+              f"{result['lines']} 行" + (f"，{result['issue']}" if result.get("issue") else ""))
+
+    problems = sum(1 for result in results if not result["ok"])
+    print("=" * 70)
+    print(f"📊 共 {len(results)} 個檔案，{len(results) - problems} 個正常，{problems} 個需要檢查")
+    return results
+
 def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--batch":
+        results = diagnose_folder(sys.argv[2])
+        sys.exit(0 if results and all(result["ok"] for result in results) else 1)
+
     if len(sys.argv) != 2:
         print("使用方法: python debug_file.py <檔案路徑>")
+        print("          python debug_file.py --batch <資料夾>    同時診斷資料夾中所有 .txt 檔案")
         print("範例: python debug_file.py recordings/新錄音\\ 5.txt")
         sys.exit(1)
     
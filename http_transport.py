@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 連線設定
+同一個程序中的所有 API 呼叫共用連線池，並依用途分成兩個：
+上傳 (轉錄、批次檔案) 使用 HTTP/1.1、每個請求獨占一條連線，
+其他呼叫 (整理、查詢批次) 可以開啟 HTTP/2，不會排在大型上傳後面等待。
+
+OpenAI SDK 預設閒置 5 秒就關閉連線，即時轉錄每段之間、批次查詢狀態之間
+都超過這個時間，每次呼叫都要重新建立 TCP 與 TLS 連線；這裡預設保留 120 秒。
+"""
+
+import atexit
+import io
+import mmap
+import os
+import threading
+
+try:
+    import httpx
+except ImportError:  # 較新的 openai SDK 改用介面相同的 httpx2
+    import httpx2 as httpx
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # HTTP/2 需要 h2 (pip install "httpx[http2]")
+    h2 = None
+
+# 用途：轉錄上傳、整理 (chat)、批次檔案上傳與下載、其他 (查詢批次狀態等)
+TRANSCRIPTION = "transcription"
+CHAT = "chat"
+FILES = "files"
+DEFAULT = "default"
+
+# 連線池
+UPLOAD_POOL = "upload"
+API_POOL = "api"
+
+# 各用途的讀取 / 寫入逾時 (秒)：轉錄要等 Whisper 處理完整個檔案，上傳 25MB 在慢速網路也需要時間
+DEFAULT_TIMEOUTS = {
+    TRANSCRIPTION: {"read": 600.0, "write": 300.0},
+    CHAT: {"read": 120.0, "write": 30.0},
+    FILES: {"read": 120.0, "write": 300.0},
+    DEFAULT: {"read": 60.0, "write": 30.0},
+}
+
+
+def http2_available():
+    """是否已安裝 HTTP/2 需要的 h2"""
+    return h2 is not None
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+class TransportConfig:
+    """連線池大小、keep-alive、HTTP/2 與各用途逾時的設定"""
+
+    def __init__(self, max_connections=64, max_keepalive=32, keepalive_seconds=120.0, http2=False,
+                 connect_timeout=10.0, pool_timeout=60.0, timeouts=None):
+        """
+        Args:
+            max_connections (int): 每個連線池的連線數上限
+            max_keepalive (int): 每個連線池保留的閒置連線數
+            keepalive_seconds (float): 閒置連線保留的時間 (秒)
+            http2 (bool): 非上傳的呼叫是否使用 HTTP/2 (需要 h2，未安裝時使用 HTTP/1.1)
+            connect_timeout (float): 建立連線的逾時 (秒)
+            pool_timeout (float): 連線池已滿時等待可用連線的逾時 (秒)
+            timeouts (dict): 覆寫各用途的 {"read": 秒數, "write": 秒數}
+        """
+        self.max_connections = max(1, int(max_connections))
+        self.max_keepalive = max(0, min(int(max_keepalive), self.max_connections))
+        self.keepalive_seconds = keepalive_seconds
+        self.http2 = bool(http2)
+        self.connect_timeout = connect_timeout
+        self.pool_timeout = pool_timeout
+        self.timeouts = {operation: dict(values) for operation, values in DEFAULT_TIMEOUTS.items()}
+        for operation, values in (timeouts or {}).items():
+            self.timeouts.setdefault(operation, dict(DEFAULT_TIMEOUTS[DEFAULT])).update(values)
+
+    @classmethod
+    def from_env(cls):
+        """由 STT_HTTP_* 環境變數建立設定"""
+        return cls(
+            max_connections=int(os.getenv('STT_HTTP_MAX_CONNECTIONS', '64')),
+            max_keepalive=int(os.getenv('STT_HTTP_MAX_KEEPALIVE', '32')),
+            keepalive_seconds=_env_float('STT_HTTP_KEEPALIVE_SECONDS', 120.0),
+            http2=os.getenv('STT_HTTP2', '').lower() in ('1', 'true', 'yes'),
+            connect_timeout=_env_float('STT_HTTP_CONNECT_TIMEOUT', 10.0),
+            pool_timeout=_env_float('STT_HTTP_POOL_TIMEOUT', 60.0),
+            timeouts={
+                TRANSCRIPTION: {
+                    "read": _env_float('STT_TRANSCRIBE_TIMEOUT', DEFAULT_TIMEOUTS[TRANSCRIPTION]["read"]),
+                    "write": _env_float('STT_UPLOAD_TIMEOUT', DEFAULT_TIMEOUTS[TRANSCRIPTION]["write"]),
+                },
+                CHAT: {"read": _env_float('STT_CHAT_TIMEOUT', DEFAULT_TIMEOUTS[CHAT]["read"])},
+                FILES: {"write": _env_float('STT_UPLOAD_TIMEOUT', DEFAULT_TIMEOUTS[FILES]["write"])},
+            },
+        )
+
+    def key(self):
+        """用來共用連線池的設定鍵 (逾時每次呼叫各自指定，不影響連線池)"""
+        return (self.max_connections, self.max_keepalive, self.keepalive_seconds, self.http2)
+
+    def limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_seconds,
+        )
+
+    def timeout(self, operation=DEFAULT):
+        """
+        某個用途的逾時設定 (傳給 SDK 呼叫的 timeout=)
+
+        Returns:
+            httpx.Timeout: 連線、讀取、寫入與等待連線池的逾時
+        """
+        values = self.timeouts.get(operation, self.timeouts[DEFAULT])
+        return httpx.Timeout(
+            connect=self.connect_timeout, read=values["read"], write=values["write"], pool=self.pool_timeout
+        )
+
+    def describe(self):
+        http2 = "HTTP/2" if self.http2 and http2_available() else "HTTP/1.1"
+        return (f"連線池上限 {self.max_connections}、保留 {self.max_keepalive} 條閒置連線 "
+                f"{self.keepalive_seconds:g} 秒，整理使用 {http2}")
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(config, pool=API_POOL):
+    """
+    取得共用的 HTTP 客戶端：相同設定與用途的呼叫端 (所有執行緒、所有 SpeechToText 實例) 共用同一個連線池
+
+    Args:
+        config (TransportConfig): 連線設定
+        pool (str): upload (轉錄與檔案上傳，固定使用 HTTP/1.1) 或 api
+
+    Returns:
+        httpx.Client: HTTP 客戶端，程序結束時自動關閉
+    """
+    http2 = config.http2 and pool == API_POOL
+    if http2 and not http2_available():
+        print("⚠️  未安裝 h2，使用 HTTP/1.1 (pip install \"httpx[http2]\" 可開啟 HTTP/2)")
+        config.http2 = http2 = False
+    key = (pool, *config.key())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = httpx.Client(
+                limits=config.limits(),
+                timeout=config.timeout(),
+                http2=http2,
+                follow_redirects=True,
+            )
+            _clients[key] = client
+    return client
+
+
+def async_client(config, pool=API_POOL):
+    """
+    建立非同步 HTTP 客戶端 (函式庫介面使用)
+
+    非同步連線無法跨事件迴圈共用，所以每個 AsyncSpeechToText 各自建立，由它的所有協程共用；
+    未安裝 h2 時直接使用 HTTP/1.1 (不輸出訊息)。
+
+    Returns:
+        httpx.AsyncClient: HTTP 客戶端，由呼叫端負責關閉
+    """
+    return httpx.AsyncClient(
+        limits=config.limits(),
+        timeout=config.timeout(),
+        http2=config.http2 and pool == API_POOL and http2_available(),
+        follow_redirects=True,
+    )
+
+
+def close_shared_clients():
+    """關閉所有共用的連線池"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_shared_clients)
+
+
+class MappedUpload(io.RawIOBase):
+    """
+    以 mmap 對應要上傳的檔案，read() 直接回傳指向頁面快取的 memoryview，
+    不會把檔案讀進記憶體，也不會為每一塊另外複製出 bytes
+
+    是 io.IOBase 的子類別並提供 fileno()，OpenAI SDK 會把它當成檔案逐塊上傳，
+    HTTP 層也能由檔案大小算出 Content-Length，不需要改用 chunked 傳輸。
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self._file = open(path, "rb")
+        self.name = str(path)
+        size = os.fstat(self._file.fileno()).st_size
+        # 空檔案無法 mmap
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b"")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        else:
+            position = len(self._view) + offset
+        self._position = max(0, position)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def read(self, size=-1):
+        start = self._position
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), start + size)
+        self._position = max(start, end)
+        return self._view[start:end]
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self._view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # HTTP 層仍持有最後一塊的參照，交給垃圾回收釋放
+                pass
+        self._file.close()
+        super().close()
@@ -79,6 +79,9 @@ pip install openai
 echo ℹ️  安裝 python-dotenv...
 pip install python-dotenv
 
+echo ℹ️  安裝 tiktoken (計算長文本的 token 數)...
+pip install tiktoken
+
 echo ✅ 所有依賴安裝完成
 
 :: 創建必要目錄
@@ -119,6 +122,13 @@ if errorlevel 1 (
     echo ✅ python-dotenv: OK
 )
 
+pip show tiktoken >nul 2>&1
+if errorlevel 1 (
+    echo ⚠️  tiktoken: 未安裝 ^(以估計值計算 token 數^)
+) else (
+    echo ✅ tiktoken: OK
+)
+
 :: 檢查主要檔案
 if exist speech_to_text.py (
     echo ✅ 主程式: OK
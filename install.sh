@@ -171,6 +171,9 @@ install_dependencies() {
     print_info "安裝 python-dotenv..."
     $PIP_CMD install python-dotenv
     
+    print_info "安裝 tiktoken (計算長文本的 token 數)..."
+    $PIP_CMD install tiktoken || print_warning "tiktoken 安裝失敗，將以估計值計算 token 數"
+    
     print_success "所有依賴安裝完成"
 }
 
@@ -308,6 +311,12 @@ verify_installation() {
         return 1
     fi
     
+    if $PIP_CMD show tiktoken &> /dev/null; then
+        print_success "tiktoken: OK"
+    else
+        print_warning "tiktoken: 未安裝 (以估計值計算 token 數)"
+    fi
+    
     # 檢查主要檔案
     if [ -f "speech_to_text.py" ]; then
         print_success "主程式: OK"
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次工作佇列
+以 SQLite 記錄每個檔案每個階段 (transcribe、summarize:<整理類型>) 的狀態、嘗試次數與錯誤訊息，
+批次中斷後可以從停下的地方繼續，多個程序也能同時領取工作
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+TRANSCRIBE = "transcribe"
+SUMMARIZE_PREFIX = "summarize:"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATES = (PENDING, RUNNING, DONE, FAILED)
+
+
+def summarize_stage(summary_type):
+    return f"{SUMMARIZE_PREFIX}{summary_type}"
+
+
+class JobStore:
+    """
+    每個 (檔案, 階段) 一列的工作表
+
+    領取工作時以 BEGIN IMMEDIATE 取得寫入鎖，多個程序同時領取也不會拿到同一個工作；
+    處理中的程序以 renew() 定期延長租約，程序中斷後租約到期的工作會被重新領取。
+    領取者名稱為 <owner>:<編號>，owner 為「主機名稱:PID」。
+    """
+
+    def __init__(self, db_path, lease_seconds=300, max_attempts=3):
+        """
+        Args:
+            db_path (str): SQLite 檔案路徑
+            lease_seconds (float): 最後一次延長租約後多久視為中斷 (秒)
+            max_attempts (int): 失敗的工作最多嘗試幾次
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " file TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " language TEXT NOT NULL DEFAULT 'zh',"
+            " state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " updated_at REAL NOT NULL,"
+            " UNIQUE (file, stage))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+        # 重複的錄音 (--dedup)：不加入工作，代表檔案完成各階段後複製結果
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS duplicates ("
+            " file TEXT PRIMARY KEY,"
+            " representative TEXT NOT NULL,"
+            " kind TEXT NOT NULL)"
+        )
+
+    def enqueue(self, files, stages, language="zh"):
+        """
+        加入工作，已存在的 (檔案, 階段) 保持原狀態
+
+        Args:
+            files (list): 音訊檔案路徑
+            stages (list): 階段名稱
+            language (str): 語言代碼
+
+        Returns:
+            int: 新加入的工作數
+        """
+        now = time.time()
+        rows = [(str(Path(f).resolve()), stage, language, PENDING, now) for f in files for stage in stages]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (file, stage, language, state, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+
+    def add_duplicates(self, groups):
+        """
+        記錄重複的錄音 (同一個檔案再次記錄時以新的代表檔案為準)
+
+        Args:
+            groups (list): DuplicateGroup 列表
+        """
+        rows = [
+            (str(Path(path).resolve()), str(group.representative.resolve()), kind)
+            for group in groups for path, kind, _ in group.duplicates
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duplicates (file, representative, kind) VALUES (?, ?, ?)", rows
+            )
+
+    def duplicates_of(self, representative):
+        """
+        Returns:
+            list: 以此檔案為代表的重複錄音路徑
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT file FROM duplicates WHERE representative = ? ORDER BY file",
+                (str(Path(representative).resolve()),)
+            ).fetchall()
+        return [Path(row[0]) for row in rows]
+
+    def claim(self, worker, retry_failed=False):
+        """
+        領取一個可執行的工作：待處理、租約到期，或 (retry_failed 時) 尚未用完嘗試次數的失敗工作。
+        整理階段要等同一個檔案轉錄完成才能領取。
+
+        Args:
+            worker (str): 領取者名稱
+            retry_failed (bool): 是否重試失敗的工作
+
+        Returns:
+            dict: 工作 (id, file, stage, language, attempts)，沒有可領取的工作時為 None
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, file, stage, language, attempts FROM jobs AS j"
+                    " WHERE (state = ? OR (state = ? AND lease_until < ?)"
+                    "        OR (? AND state = ? AND attempts < ?))"
+                    "   AND (stage = ? OR EXISTS (SELECT 1 FROM jobs AS t"
+                    "        WHERE t.file = j.file AND t.stage = ? AND t.state = ?))"
+                    " ORDER BY id LIMIT 1",
+                    (PENDING, RUNNING, now, int(retry_failed), FAILED, self.max_attempts,
+                     TRANSCRIBE, TRANSCRIBE, DONE)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (RUNNING, worker, now + self.lease_seconds, now, row[0])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"id": row[0], "file": row[1], "stage": row[2], "language": row[3], "attempts": row[4] + 1}
+
+    def complete(self, job_id, worker):
+        """
+        標記完成 (只有仍持有租約的領取者可以更新)
+
+        Returns:
+            bool: 是否更新成功 (租約已過期並被重新領取時為 False)
+        """
+        return self._finish(job_id, worker, DONE, None)
+
+    def fail(self, job_id, worker, error):
+        """標記失敗並記錄錯誤訊息，回傳值同 complete"""
+        return self._finish(job_id, worker, FAILED, str(error))
+
+    def _finish(self, job_id, worker, state, error):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, lease_until = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND state = ?",
+                (state, error, time.time(), job_id, worker, RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def _owned_by(owner):
+        """
+        比對 worker 欄位開頭的 <owner>: (不用 LIKE，主機名稱中的 _ 與 % 不會被當成萬用字元，
+        PID 12 也不會比對到 123)
+
+        Returns:
+            tuple: (SQL 條件, 參數)
+        """
+        prefix = f"{owner}:"
+        return "substr(worker, 1, ?) = ?", (len(prefix), prefix)
+
+    def renew(self, owner):
+        """
+        延長某個程序所有處理中工作的租約 (處理中定期呼叫，長錄音不會因為超過租約被重新領取)
+
+        Returns:
+            int: 延長的工作數
+        """
+        clause, params = self._owned_by(owner)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE state = ? AND {clause}",
+                (time.time() + self.lease_seconds, RUNNING, *params)
+            )
+            return cursor.rowcount
+
+    def release(self, owner):
+        """
+        將某個程序尚未完成的工作放回待處理 (例如按下 Ctrl-C 時)
+
+        Args:
+            owner (str): 程序的 owner (主機名稱:PID)
+
+        Returns:
+            int: 放回的工作數
+        """
+        clause, params = self._owned_by(owner)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), worker = NULL, lease_until = NULL,"
+                f" updated_at = ? WHERE state = ? AND {clause}",
+                (PENDING, time.time(), RUNNING, *params)
+            )
+            return cursor.rowcount
+
+    def has_active(self):
+        """是否還有租約有效、處理中的工作 (完成後可能讓整理階段變成可領取)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM jobs WHERE state = ? AND lease_until >= ? LIMIT 1", (RUNNING, time.time())
+            ).fetchone()
+        return row is not None
+
+    def status(self):
+        """
+        Returns:
+            dict: {階段: {狀態: 數量}}
+        """
+        summary = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, state, COUNT(*) FROM jobs GROUP BY stage, state").fetchall()
+        for stage, state, count in rows:
+            summary.setdefault(stage, dict.fromkeys(STATES, 0))[state] = count
+        return summary
+
+    def failures(self, limit=20):
+        """
+        Returns:
+            list: [(檔案, 階段, 嘗試次數, 錯誤訊息), ...]
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT file, stage, attempts, error FROM jobs WHERE state = ? ORDER BY updated_at DESC LIMIT ?",
+                (FAILED, limit)
+            ).fetchall()
+
+    def print_status(self):
+        """印出各階段的進度與最近的失敗"""
+        summary = self.status()
+        print(f"📋 工作佇列: {self.db_path}")
+        if not summary:
+            print("（佇列是空的，請先執行 --batch）")
+            return
+        print(f"{'階段':<20}{'待處理':>8}{'處理中':>8}{'完成':>8}{'失敗':>8}")
+        print("-" * 52)
+        for stage in sorted(summary, key=lambda s: (s != TRANSCRIBE, s)):
+            counts = summary[stage]
+            print(f"{stage:<20}{counts[PENDING]:>8}{counts[RUNNING]:>8}{counts[DONE]:>8}{counts[FAILED]:>8}")
+        with self._lock:
+            duplicates = self._conn.execute("SELECT COUNT(*) FROM duplicates").fetchone()[0]
+        if duplicates:
+            print(f"🧬 另有 {duplicates} 個重複的錄音，沿用代表檔案的結果")
+        failures = self.failures()
+        if failures:
+            print("")
+            print("❌ 失敗的工作:")
+            for file, stage, attempts, error in failures:
+                print(f"  {Path(file).name} ({stage}，已嘗試 {attempts} 次): {error}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+即時轉錄
+持續讀取錄音中、仍在變大的音訊檔 (或標準輸入的串流)，由 ffmpeg 解碼成 PCM，
+切成有重疊的固定長度片段，每段一完成就送去轉錄，去除重疊的重複文字後附加到 .txt
+"""
+
+import array
+import contextvars
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import audio_chunker
+import metrics
+from metrics import percentile
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # s16le
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+
+# 每次從 ffmpeg 讀取的 PCM 大小 (0.25 秒)
+READ_BYTES = BYTES_PER_SECOND // 4
+
+# 片段的最大振幅低於此值 (約 -36 dBFS) 視為靜音，不送出轉錄
+SILENCE_PEAK = 500
+
+
+def _format_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class LiveTranscriber:
+    """
+    片段依序送出、可同時轉錄多段；由一個執行緒依原本的順序接合結果並附加到輸出檔，
+    每段記錄從音訊可用到文字寫入的延遲
+    """
+
+    def __init__(self, stt, output_path, language="zh", window_seconds=15.0, overlap_seconds=2.0, jobs=2):
+        """
+        Args:
+            stt (SpeechToText): 提供轉錄引擎的實例
+            output_path (str): 逐字稿輸出路徑
+            language (str): 語言代碼
+            window_seconds (float): 每段長度 (秒)
+            overlap_seconds (float): 相鄰兩段重疊的長度 (秒)
+            jobs (int): 同時轉錄的段數
+        """
+        if not 0 <= overlap_seconds < window_seconds:
+            raise ValueError("重疊長度必須小於片段長度")
+        self.stt = stt
+        self.output_path = Path(output_path)
+        self.language = language
+        self.window_bytes = int(window_seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+        self.overlap_bytes = int(overlap_seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+        self.jobs = max(1, int(jobs))
+        self.text = ""
+        self.lags = []
+        self._written = ""
+        self._results = queue.Queue()
+
+    def run(self, source, follow=True, idle_seconds=10.0, poll_interval=0.5):
+        """
+        讀取音訊直到結束：標準輸入讀到 EOF，或檔案超過 idle_seconds 秒沒有變大
+
+        Args:
+            source (str): 音訊檔案路徑，"-" 表示標準輸入
+            follow (bool): 是否持續等待檔案變大
+            idle_seconds (float): 檔案多久沒有變大視為錄音結束 (秒)
+            poll_interval (float): 檢查檔案是否變大的間隔 (秒)
+
+        Returns:
+            str: 完整的逐字稿
+        """
+        audio_chunker.check_ffmpeg()
+        self.output_path.write_text("", encoding="utf-8")
+        decoder = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        feeder = threading.Thread(
+            target=self._feed, args=(source, decoder.stdin, follow, idle_seconds, poll_interval), daemon=True
+        )
+        feeder.start()
+        # 寫入執行緒沿用目前的 context，每段延遲才會記錄到同一筆效能指標
+        writer = threading.Thread(target=contextvars.copy_context().run, args=(self._write_results,), daemon=True)
+        writer.start()
+
+        print(f"🔴 即時轉錄中: {source if source != '-' else '標準輸入'} → {self.output_path}")
+        print(f"⏱️  每段 {self.window_bytes / BYTES_PER_SECOND:g} 秒，重疊 {self.overlap_bytes / BYTES_PER_SECOND:g} 秒，按 Ctrl-C 結束")
+        with tempfile.TemporaryDirectory(prefix="stt_live_") as temp_dir, \
+                ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            try:
+                self._cut_windows(decoder.stdout, executor, temp_dir)
+            except KeyboardInterrupt:
+                print("\n🛑 停止錄音，等待已送出的片段完成...")
+            finally:
+                decoder.kill()
+                decoder.wait()
+                self._results.put(None)
+                writer.join()
+        self.report_lag()
+        return self.text
+
+    def _feed(self, source, pipe, follow, idle_seconds, poll_interval):
+        """把檔案新增的內容 (或標準輸入) 依序寫入 ffmpeg"""
+        try:
+            if source == "-":
+                while True:
+                    data = sys.stdin.buffer.read1(64 * 1024)
+                    if not data:
+                        break
+                    pipe.write(data)
+                    pipe.flush()
+                return
+            with open(source, "rb") as f:
+                last_growth = time.monotonic()
+                while True:
+                    data = f.read(64 * 1024)
+                    if data:
+                        pipe.write(data)
+                        pipe.flush()
+                        last_growth = time.monotonic()
+                        continue
+                    if not follow or time.monotonic() - last_growth > idle_seconds:
+                        break
+                    time.sleep(poll_interval)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                pipe.close()
+            except BrokenPipeError:
+                pass
+
+    def _cut_windows(self, pcm, executor, temp_dir):
+        """讀取 PCM，湊滿一段就送出轉錄，保留重疊的部分給下一段"""
+        buffer = bytearray()
+        start_bytes = 0
+        index = 0
+        while True:
+            data = pcm.read(READ_BYTES)
+            buffer += data
+            while len(buffer) >= self.window_bytes:
+                self._submit(executor, temp_dir, index, start_bytes, bytes(buffer[:self.window_bytes]))
+                index += 1
+                step = self.window_bytes - self.overlap_bytes
+                del buffer[:step]
+                start_bytes += step
+            if not data:
+                # 最後一段：剩下的內容比已轉錄過的重疊部分長才需要送出
+                if len(buffer) > (self.overlap_bytes if index else 0):
+                    self._submit(executor, temp_dir, index, start_bytes, bytes(buffer))
+                return
+
+    def _submit(self, executor, temp_dir, index, start_bytes, window):
+        ready_at = time.perf_counter()
+        start = start_bytes / BYTES_PER_SECOND
+        end = start + len(window) / BYTES_PER_SECOND
+        samples = array.array("h", window)
+        if not samples or max(max(samples), -min(samples)) < SILENCE_PEAK:
+            # 靜音片段不送出 (Whisper 在靜音上容易產生幻覺文字)
+            return
+        path = Path(temp_dir) / f"window_{index:05d}.wav"
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(SAMPLE_WIDTH)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(window)
+        future = metrics.submit(executor, self._transcribe_window, path)
+        self._results.put((index, start, end, ready_at, future))
+
+    def _transcribe_window(self, path):
+        try:
+            backend, _ = self.stt.backends.select(path)
+            return backend.transcribe_clip(path, self.language)
+        finally:
+            path.unlink(missing_ok=True)
+
+    def _write_results(self):
+        """依片段順序取得轉錄結果、接合並附加到輸出檔"""
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            index, start, end, ready_at, future = item
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"⚠️  [{_format_time(start)}–{_format_time(end)}] 轉錄失敗: {e}")
+                continue
+            added = self._append(text)
+            lag = time.perf_counter() - ready_at
+            self.lags.append(lag)
+            self.stt.metrics.add_stage("live_window", lag * 1000, index=index, audio_end_s=round(end, 1))
+            if added.strip():
+                print(f"📝 [{_format_time(start)}–{_format_time(end)}] {added.strip()}  (延遲 {lag:.1f} 秒)")
+
+    def _append(self, text):
+        """
+        以重疊比對接合新的文字；接縫沒有動到已寫入的內容時直接附加，否則重寫整個檔案
+
+        Returns:
+            str: 新增的文字
+        """
+        merged = audio_chunker.merge_overlap(self.text, text)
+        previous = self.text
+        self.text = merged
+        if merged.startswith(self._written):
+            added = merged[len(self._written):]
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(added)
+        else:
+            self.output_path.write_text(merged, encoding="utf-8")
+            added = merged[len(os.path.commonprefix([previous, merged])):]
+        self._written = merged
+        return added
+
+    def report_lag(self):
+        """印出每段延遲的統計"""
+        if not self.lags:
+            print("⚠️  沒有轉錄到任何內容")
+            return
+        print(f"⏱️  共 {len(self.lags)} 段，延遲 p50 {percentile(self.lags, 0.5):.1f} 秒、"
+              f"p95 {percentile(self.lags, 0.95):.1f} 秒、最大 {max(self.lags):.1f} 秒")
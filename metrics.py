@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+效能指標紀錄工具
+記錄每個檔案在各階段 (雜湊、上傳、Whisper、ChatGPT、合併、寫檔) 的耗時與 token 用量，
+每個檔案輸出一行 JSON (JSONL)；也可以統計 JSONL 產生各階段的 p50 / p95 報表
+"""
+
+import contextlib
+import contextvars
+import io
+import json
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# 目前正在處理的檔案紀錄，跨執行緒時需以 submit() 複製 context
+_current_record = contextvars.ContextVar("stt_metrics_record", default=None)
+
+
+class _DiscardDict(dict):
+    """關閉指標時使用，寫入的欄位直接丟棄"""
+
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+_NULL_CONTEXT = contextlib.nullcontext(_DiscardDict())
+
+
+def submit(executor, func, *args):
+    """把工作交給執行緒池，並讓它沿用目前的檔案紀錄"""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+
+class TimedReader(io.RawIOBase):
+    """
+    包裝上傳用的檔案物件，記錄讀到檔案結尾 (上傳送完) 的時間
+
+    必須是 io.IOBase 的子類別，OpenAI SDK 才會把它當成檔案上傳。
+    """
+
+    def __init__(self, f):
+        super().__init__()
+        self._f = f
+        self.started_at = None
+        self.eof_at = None
+
+    @property
+    def name(self):
+        return self._f.name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._f.seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._f.seek(offset, whence)
+
+    def tell(self):
+        return self._f.tell()
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def start(self):
+        """每次 (重新) 上傳前呼叫"""
+        self.started_at = time.perf_counter()
+        self.eof_at = None
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        if self.eof_at is None and (not data or size is None or size < 0):
+            self.eof_at = time.perf_counter()
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class NullMetrics:
+    """關閉指標時的替代品，所有操作幾乎沒有成本"""
+
+    enabled = False
+
+    def file_record(self, input_path, kind):
+        return _NULL_CONTEXT
+
+    def stage(self, name, **fields):
+        return _NULL_CONTEXT
+
+    def add_stage(self, name, ms, **fields):
+        pass
+
+    def annotate(self, **fields):
+        pass
+
+
+class MetricsRecorder:
+    """將每個檔案的各階段耗時寫成 JSONL"""
+
+    enabled = True
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): JSONL 輸出路徑 (附加寫入)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def file_record(self, input_path, kind):
+        """
+        開始記錄一個檔案，離開時寫出一行 JSON
+
+        Args:
+            input_path (str): 輸入檔案
+            kind (str): 處理類型 (audio / text)
+        """
+        if _current_record.get() is not None:
+            # 已經在同一個檔案的紀錄中 (例如 process_file 內的整理步驟)
+            yield _current_record.get()
+            return
+        record = {
+            "file": str(input_path),
+            "kind": kind,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ok": True,
+            "stages": [],
+        }
+        token = _current_record.set(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["ok"] = False
+            record["error"] = str(e)
+            raise
+        finally:
+            record["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            _current_record.reset(token)
+            line = json.dumps(record, ensure_ascii=False)
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        """
+        記錄一個階段的耗時，可在 with 區塊中補充欄位 (例如 token 數)
+
+        Args:
+            name (str): 階段名稱
+        """
+        record = _current_record.get()
+        entry = {"stage": name, **fields}
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry.setdefault("ms", round((time.perf_counter() - start) * 1000, 1))
+            if record is not None:
+                with self._lock:
+                    record["stages"].append(entry)
+
+    def add_stage(self, name, ms, **fields):
+        """直接加入一個已知耗時的階段"""
+        record = _current_record.get()
+        if record is not None:
+            with self._lock:
+                record["stages"].append({"stage": name, **fields, "ms": round(ms, 1)})
+
+    def annotate(self, **fields):
+        """在目前的檔案紀錄加上欄位 (例如 summary_type)"""
+        record = _current_record.get()
+        if record is not None:
+            record.update(fields)
+
+
+def percentile(values, ratio):
+    """以最近排名法計算百分位數"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(ratio * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_report(jsonl_path):
+    """
+    統計 JSONL 紀錄
+
+    Returns:
+        dict: {"files": 檔案數, "failed": 失敗數, "stages": {階段: [耗時...]},
+               "tokens": {整理類型: {"prompt_tokens": n, "completion_tokens": n}}}
+    """
+    stages = defaultdict(list)
+    tokens = defaultdict(lambda: {"prompt_tokens": 0, "completion_tokens": 0})
+    files = failed = 0
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            files += 1
+            failed += 0 if record.get("ok") else 1
+            stages["total"].append(record.get("total_ms", 0))
+            summary_type = record.get("summary_type") or "-"
+            for entry in record.get("stages", []):
+                stages[entry["stage"]].append(entry.get("ms", 0))
+                for key in ("prompt_tokens", "completion_tokens"):
+                    tokens[summary_type][key] += entry.get(key) or 0
+    return {"files": files, "failed": failed, "stages": dict(stages), "tokens": dict(tokens)}
+
+
+def print_report(jsonl_path):
+    """印出各階段 p50 / p95 耗時與各整理類型的 token 總量"""
+    report = build_report(jsonl_path)
+    print("📊 效能指標報表")
+    print("=" * 60)
+    print(f"📁 檔案數: {report['files']} (失敗 {report['failed']})")
+    print("")
+    print(f"{'階段':<16}{'次數':>8}{'p50 (ms)':>12}{'p95 (ms)':>12}{'總計 (s)':>12}")
+    print("-" * 60)
+    for name, values in sorted(report["stages"].items()):
+        print(f"{name:<16}{len(values):>8}{percentile(values, 0.5):>12.1f}"
+              f"{percentile(values, 0.95):>12.1f}{sum(values) / 1000:>12.1f}")
+    if report["tokens"]:
+        print("")
+        print(f"{'整理類型':<16}{'輸入 tokens':>14}{'輸出 tokens':>14}")
+        print("-" * 60)
+        for summary_type, usage in sorted(report["tokens"].items()):
+            print(f"{summary_type:<16}{usage['prompt_tokens']:>14}{usage['completion_tokens']:>14}")
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("使用方法: python metrics.py <指標檔案.jsonl>")
+        print("範例: python metrics.py stt_metrics.jsonl")
+        sys.exit(1)
+
+    print_report(sys.argv[1])
+
+
+if __name__ == "__main__":
+    main()
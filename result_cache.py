@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+結果快取
+以內容雜湊為鍵，將 API 結果保存在本機 SQLite 檔案中，
+重複處理相同內容時不必再次呼叫 API
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# 計算檔案雜湊時每次讀取的大小
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path, block_size=HASH_BLOCK_SIZE):
+    """
+    以串流方式計算檔案內容的 SHA-256，不會把整個檔案載入記憶體
+
+    Args:
+        file_path (str): 檔案路徑
+        block_size (int): 每次讀取的大小 (bytes)
+
+    Returns:
+        str: 十六進位雜湊值
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def hash_text(text):
+    """計算文字的 SHA-256"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(*parts):
+    """將多個欄位組合成快取鍵"""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def transcription_keys(digest, language, engine, *variant):
+    """
+    轉錄快取鍵 (命令列與 stt_library 共用)：文字存放在第一個鍵，
+    片段以 JSON [[開始, 結束, 文字], ...] 存放在第二個鍵
+
+    Args:
+        digest (str): 音訊檔案的 SHA-256
+        language (str): 語言代碼
+        engine (str): 轉錄引擎的識別 (OpenAI 為模型名稱)
+        variant: 其他會影響結果的設定 (例如音訊前處理)
+
+    Returns:
+        tuple: (文字的快取鍵, 片段的快取鍵)
+    """
+    parts = ("transcription", digest, language, engine, *variant)
+    return make_key(*parts), make_key(*parts, "segments")
+
+
+class ResultCache:
+    """以 SQLite 儲存、依最近使用時間 (LRU) 淘汰的快取"""
+
+    def __init__(self, db_path, max_bytes=200 * 1024 * 1024):
+        """
+        Args:
+            db_path (str): SQLite 檔案路徑
+            max_bytes (int): 快取內容總大小上限 (bytes)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def get(self, key):
+        """
+        讀取快取
+
+        Returns:
+            str: 快取內容，沒有命中時為 None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        """寫入快取，超過大小上限時淘汰最久未使用的項目"""
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def stats(self):
+        """
+        Returns:
+            dict: 命中次數、未命中次數、項目數與總大小
+        """
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SummaryCache(ResultCache):
+    """整理結果的快取，另外記錄命中時省下的 API 呼叫次數與 token 數"""
+
+    def __init__(self, db_path, max_bytes=200 * 1024 * 1024):
+        super().__init__(db_path, max_bytes)
+        self.saved_calls = 0
+        self.saved_tokens = 0
+
+    def get_result(self, key):
+        """
+        Returns:
+            str: 快取的整理結果，沒有命中時為 None
+        """
+        raw = self.get(key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        with self._lock:
+            self.saved_calls += 1
+            self.saved_tokens += entry.get("usage", {}).get("total_tokens", 0)
+        return entry["text"]
+
+    def put_result(self, key, text, usage=None):
+        """
+        Args:
+            key (str): 快取鍵
+            text (str): 整理結果
+            usage (dict): 這次呼叫的 token 用量 (prompt_tokens / completion_tokens / total_tokens)
+        """
+        self.put(key, json.dumps({"text": text, "usage": usage or {}}, ensure_ascii=False))
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(saved_calls=self.saved_calls, saved_tokens=self.saved_tokens)
+        return stats
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+逐字稿時間索引
+把轉錄片段的開始/結束時間與它們在 .txt 中的位置存成精簡的二進位檔 (<檔名>.segments)。
+索引檔以 mmap 開啟，依時間或文字位置二分搜尋，不需要把整個檔案讀進記憶體；
+也可以直接匯出 SRT / VTT 字幕，不必再呼叫轉錄 API。
+
+檔案格式 (little-endian)：
+    標頭  magic (8 bytes)、片段數、逐字稿長度 (字元)、逐字稿 UTF-8 的 CRC32
+    接著四個 uint32 陣列依序存放：開始毫秒、結束毫秒、文字開始位置、文字結束位置
+文字位置是 .txt 內容的字元索引 (Python 字串索引)，text[開始:結束] 即為該片段的文字。
+"""
+
+import array
+import bisect
+import mmap
+import re
+import struct
+import sys
+import zlib
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from atomic_file import atomic_open
+
+SUFFIX = ".segments"
+MAGIC = b"STTSEG01"
+HEADER = struct.Struct("<8sIII")
+FIELDS = 4
+
+SRT = "srt"
+VTT = "vtt"
+SUBTITLE_FORMATS = (SRT, VTT)
+# --seek 的時間：[時:]分:秒[.毫秒]，字幕格式的逗號小數點也接受
+TIMESTAMP_RE = re.compile(r"(?:(\d+):)?(\d+):([0-5]\d(?:[.,]\d+)?)")
+
+# 在逐字稿中尋找片段文字時，從上一段結尾往後比對的範圍 (字元)
+ALIGN_WINDOW = 200
+# 片段文字找不到完全相同的內容時 (接縫被修剪過)，視為對齊的最短共同長度
+MIN_MATCH = 4
+
+
+def sidecar_path(path):
+    """音訊檔或逐字稿對應的索引檔路徑 (recording.m4a / recording.txt → recording.segments)"""
+    return Path(path).with_suffix(SUFFIX)
+
+
+def _crc(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _segment_fields(segment):
+    """接受 (開始, 結束, 文字) tuple，或有 start / end / text 屬性的物件"""
+    if hasattr(segment, "start"):
+        return segment.start, segment.end, segment.text
+    return segment
+
+
+def align_segments(text, segments, window=ALIGN_WINDOW, min_match=MIN_MATCH):
+    """
+    找出每個片段在逐字稿中的位置
+
+    逐字稿是各片段 (或各分段) 接合而成，接縫處的重複內容已被移除，
+    所以依序從上一段的結尾往後尋找片段文字；找不到完全相同的內容時以最長共同片段對齊，
+    仍然對不上的片段涵蓋前後兩個已對齊片段之間的文字。
+
+    Args:
+        text (str): 逐字稿
+        segments (list): [(開始秒數, 結束秒數, 文字), ...]，依時間排序
+        window (int): 比對範圍 (字元)
+        min_match (int): 視為對齊的最短共同長度 (字元)
+
+    Returns:
+        list: [(文字開始位置, 文字結束位置) 或 None, ...]
+    """
+    spans = []
+    cursor = 0
+    for segment in segments:
+        piece = _segment_fields(segment)[2].strip()
+        if not piece:
+            spans.append(None)
+            continue
+        limit = cursor + len(piece) + window
+        position = text.find(piece, cursor, limit)
+        if position >= 0:
+            span = (position, position + len(piece))
+        else:
+            area = text[cursor:limit]
+            match = SequenceMatcher(None, piece, area, autojunk=False).find_longest_match(0, len(piece), 0, len(area))
+            if match.size < min(min_match, len(piece)):
+                spans.append(None)
+                continue
+            # 以共同片段推算整段的位置，開頭被修剪時從共同片段開始
+            start = cursor + max(0, match.b - match.a)
+            end = min(len(text), cursor + match.b + (len(piece) - match.a))
+            span = (start, max(start, end))
+        spans.append(span)
+        cursor = span[1]
+
+    # 對不上的片段填入前後已對齊片段之間的空隙
+    for i, span in enumerate(spans):
+        if span is None:
+            start = spans[i - 1][1] if i > 0 else 0
+            end = next((s[0] for s in spans[i + 1:] if s is not None), len(text))
+            spans[i] = (start, max(start, end))
+    return spans
+
+
+def write_index(path, text, segments):
+    """
+    建立索引檔 (先寫入暫存檔再改名)
+
+    Args:
+        path (str): 索引檔路徑
+        text (str): 寫入 .txt 的逐字稿
+        segments (list): [(開始秒數, 結束秒數, 文字), ...]，時間相對於錄音開頭
+
+    Returns:
+        int: 片段數
+    """
+    segments = sorted((_segment_fields(s) for s in segments), key=lambda s: (s[0], s[1]))
+    spans = align_segments(text, segments)
+    columns = [array.array("I") for _ in range(FIELDS)]
+    for (start, end, _), (text_start, text_end) in zip(segments, spans):
+        start_ms = max(0, round(start * 1000))
+        columns[0].append(start_ms)
+        columns[1].append(max(start_ms, round(end * 1000)))
+        columns[2].append(text_start)
+        columns[3].append(text_end)
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+
+    with atomic_open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(segments), len(text), _crc(text)))
+        for column in columns:
+            column.tofile(f)
+    return len(segments)
+
+
+class SegmentIndex:
+    """
+    以 mmap 開啟的索引檔
+
+    四個欄位直接以 memoryview 對應到檔案內容，查詢只讀取用到的頁面；
+    index[i] 為 (開始秒數, 結束秒數, 文字開始位置, 文字結束位置)。
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): 索引檔路徑
+
+        Raises:
+            ValueError: 檔案不是索引檔或已損毀
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise ValueError(f"不是逐字稿時間索引: {self.path}")
+            magic, count, self.text_length, self.text_crc = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or len(self._mmap) != HEADER.size + count * FIELDS * 4:
+                raise ValueError(f"不是逐字稿時間索引或檔案已損毀: {self.path}")
+            self._count = count
+            if sys.byteorder == "little":
+                self._view = memoryview(self._mmap)[HEADER.size:].cast("I")
+            else:
+                # 大端序的機器無法直接對應，改為讀入記憶體後轉換
+                values = array.array("I")
+                values.frombytes(self._mmap[HEADER.size:])
+                values.byteswap()
+                self._view = values
+            self._columns = [self._view[i * count:(i + 1) * count] for i in range(FIELDS)]
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """釋放 memoryview 後關閉 mmap"""
+        for column in getattr(self, "_columns", ()):
+            if isinstance(column, memoryview):
+                column.release()
+        self._columns = []
+        view = getattr(self, "_view", None)
+        if isinstance(view, memoryview):
+            view.release()
+        self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not -self._count <= i < self._count:
+            raise IndexError("片段索引超出範圍")
+        i %= self._count
+        starts, ends, text_starts, text_ends = self._columns
+        return starts[i] / 1000, ends[i] / 1000, text_starts[i], text_ends[i]
+
+    def matches(self, text):
+        """索引是否對應這份逐字稿 (逐字稿修改過時位置已經不正確)"""
+        return len(text) == self.text_length and _crc(text) == self.text_crc
+
+    def at_time(self, seconds):
+        """
+        找出錄音某個時間點所在的片段；落在兩段之間時為前一段
+
+        Returns:
+            int: 片段索引，沒有片段時為 None
+        """
+        if not self._count:
+            return None
+        return max(0, bisect.bisect_right(self._columns[0], round(seconds * 1000)) - 1)
+
+    def at_offset(self, position):
+        """
+        找出逐字稿某個字元位置所在的片段
+
+        Returns:
+            int: 片段索引，沒有片段時為 None
+        """
+        if not self._count:
+            return None
+        return max(0, bisect.bisect_right(self._columns[2], position) - 1)
+
+    def text_of(self, i, text):
+        """片段 i 的文字"""
+        _, _, start, end = self[i]
+        return text[start:end].strip()
+
+
+def format_timestamp(seconds, separator=","):
+    """秒數 → HH:MM:SS,mmm (SRT) 或 HH:MM:SS.mmm (VTT)"""
+    ms = max(0, round(seconds * 1000))
+    hours, ms = divmod(ms, 3600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{ms:03d}"
+
+
+def parse_timestamp(value):
+    """
+    解析時間：MM:SS 或 HH:MM:SS，秒數可含小數 (12:30、1:02:03.500、00:01:02,250)
+
+    只接受數字，"2024"、"nan" 等不是時間，由呼叫端當成文字尋找。
+
+    Returns:
+        float: 秒數，無法解析時為 None
+    """
+    match = TIMESTAMP_RE.fullmatch(value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    if hours is not None and int(minutes) >= 60:
+        return None
+    return int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds.replace(",", "."))
+
+
+def to_subtitles(index, text, fmt=SRT):
+    """
+    以索引與逐字稿產生字幕
+
+    Args:
+        index (SegmentIndex): 時間索引
+        text (str): 逐字稿
+        fmt (str): srt / vtt
+
+    Returns:
+        str: 字幕內容
+    """
+    if fmt not in SUBTITLE_FORMATS:
+        raise ValueError(f"未知的字幕格式: {fmt} (可用: {', '.join(SUBTITLE_FORMATS)})")
+    separator = "," if fmt == SRT else "."
+    blocks = ["WEBVTT\n"] if fmt == VTT else []
+    number = 0
+    for i in range(len(index)):
+        caption = index.text_of(i, text)
+        if not caption:
+            continue
+        number += 1
+        start, end = index[i][:2]
+        timing = f"{format_timestamp(start, separator)} --> {format_timestamp(end, separator)}"
+        blocks.append(f"{number}\n{timing}\n{caption}\n" if fmt == SRT else f"{timing}\n{caption}\n")
+    return "\n".join(blocks)
+
+
+def load(txt_path):
+    """
+    讀取逐字稿與對應的索引
+
+    Returns:
+        tuple: (逐字稿, SegmentIndex)
+
+    Raises:
+        FileNotFoundError: 沒有索引檔
+        ValueError: 索引與逐字稿不一致
+    """
+    txt_path = Path(txt_path).with_suffix(".txt")
+    index_path = sidecar_path(txt_path)
+    if not index_path.exists():
+        raise FileNotFoundError(f"找不到時間索引: {index_path} (需要重新轉錄才會產生)")
+    text = txt_path.read_text(encoding="utf-8")
+    index = SegmentIndex(index_path)
+    if not index.matches(text):
+        index.close()
+        raise ValueError(f"{txt_path.name} 在轉錄後被修改過，時間索引已不正確")
+    return text, index
+
+
+def export_subtitles(path, fmt=SRT, output_path=None):
+    """
+    將逐字稿的時間索引匯出成字幕檔
+
+    Args:
+        path (str): 音訊檔或逐字稿路徑
+        fmt (str): srt / vtt
+        output_path (str): 輸出路徑 (預設為 <檔名>.srt / <檔名>.vtt)
+
+    Returns:
+        tuple: (輸出路徑, 字幕數)
+    """
+    text, index = load(path)
+    with index:
+        content = to_subtitles(index, text, fmt)
+        count = len(index)
+    output_path = Path(output_path) if output_path else Path(path).with_suffix(f".{fmt}")
+    output_path.write_text(content, encoding="utf-8")
+    return output_path, count
+
+
+def seek(path, target, context=1):
+    """
+    依時間 (MM:SS、HH:MM:SS) 或文字找出逐字稿中的位置
+
+    Args:
+        path (str): 音訊檔或逐字稿路徑
+        target (str): 時間或要尋找的文字
+        context (int): 前後多顯示幾個片段
+
+    Returns:
+        list: 每個符合位置的片段 [[(開始秒數, 結束秒數, 文字), ...], ...]；
+              以文字尋找時每個出現位置一組，依時間尋找時只有一組
+    """
+    text, index = load(path)
+    with index:
+        seconds = parse_timestamp(target)
+        if seconds is not None:
+            hits = [index.at_time(seconds)]
+        else:
+            hits = []
+            position = text.find(target)
+            while position >= 0:
+                i = index.at_offset(position)
+                if i is not None and (not hits or hits[-1] != i):
+                    hits.append(i)
+                position = text.find(target, position + 1)
+        # 相鄰的符合位置前後內容重疊時合併成一組
+        ranges = []
+        for hit in hits:
+            if hit is None:
+                continue
+            low, high = max(0, hit - context), min(len(index), hit + context + 1)
+            if ranges and low <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], high)
+            else:
+                ranges.append([low, high])
+        groups = [[(index[i][0], index[i][1], index.text_of(i, text)) for i in range(low, high)]
+                  for low, high in ranges]
+    return groups
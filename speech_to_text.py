@@ -7,42 +7,243 @@ iPhone 語音檔轉文字工具
 """
 
 import os
+import re
 import sys
+import glob
+import json
+import sqlite3
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from atomic_file import atomic_open, write_text_atomic
+import audio_chunker
+import audio_preprocess
+import http_transport
+from api_scheduler import APIScheduler
+import metrics
+from metrics import MetricsRecorder, NullMetrics, TimedReader
+from result_cache import ResultCache, SummaryCache, hash_file, hash_text, make_key, transcription_keys
+from text_chunker import chunk_text, count_tokens
+from text_loader import load_text
+import transcription_backends
+from transcription_backends import BackendSelector, timed_transcribe
+
+# OpenAI Whisper API 單一檔案上傳限制 (MB)
+MAX_UPLOAD_MB = 25
+
+# 可一次送出整理的文字長度上限，以及長文本分段時每段的長度 (token)
+# gpt-3.5-turbo 的上下文為 16K，需保留提示詞與 2000 token 的回覆空間
+MAX_INPUT_TOKENS = 12000
+CHUNK_TOKENS = 8000
+# 分段至少填滿預算的比例，之後只在內容決定的錨點句子切開，修改文字後未變動的段落可沿用快取
+CHUNK_MIN_FILL = 0.75
+
+# 提示詞版本，修改任何整理提示詞時請遞增，讓舊的摘要快取失效
+PROMPT_VERSION = 1
+
+# 各整理類型的提示詞
+SUMMARY_PROMPTS = {
+    "重點整理": """
+    請幫我整理以下文字內容的重點：
+
+    1. 提取主要觀點和重要資訊
+    2. 整理成條列式要點
+    3. 保持原文的語言風格
+    4. 如果有時間、地點、人名等重要細節，請特別標註
+
+    請用繁體中文回覆。
+
+    原文內容：
+    """,
+    "會議紀錄": """
+    請幫我將以下內容整理成正式的會議紀錄格式：
+
+    1. 主要議題和討論內容
+    2. 重要決議和行動項目
+    3. 責任歸屬和時間點
+    4. 如有具體數字、日期請特別標註
+
+    請用繁體中文回覆，格式要清晰易讀。
+
+    會議內容：
+    """,
+    "筆記整理": """
+    請幫我將以下內容整理成結構化的筆記：
+
+    1. 按主題分類整理
+    2. 重要概念和關鍵字標註
+    3. 補充說明和細節
+    4. 如有可行動項目請列出
+
+    請用繁體中文回覆。
+
+    筆記內容：
+    """,
+    "摘要總結": """
+    請幫我將以下內容寫成簡潔的摘要：
+
+    1. 用 2-3 段文字總結主要內容
+    2. 保留最重要的資訊
+    3. 語言要簡潔清晰
+    4. 保持客觀中性的語調
+
+    請用繁體中文回覆。
+
+    原文內容：
+    """
+}
+
+
+def parse_summary_types(value):
+    """
+    解析整理類型：單一類型、以逗號分隔的多個類型，或 all (全部類型)
+
+    Returns:
+        list: 不重複的整理類型
+    """
+    if isinstance(value, (list, tuple)):
+        types = list(value)
+    elif value.strip().lower() == "all":
+        types = list(SUMMARY_PROMPTS)
+    else:
+        types = [t.strip() for t in re.split(r"[,，、]", value) if t.strip()]
+    return list(dict.fromkeys(types)) or ["重點整理"]
+
 class SpeechToText:
-    def __init__(self):
-        """初始化語音轉文字類別"""
+    def __init__(self, use_cache=True, metrics_path=None, backend=None):
+        """
+        初始化語音轉文字類別
+        
+        Args:
+            use_cache (bool): 是否使用本機轉錄與摘要快取 (STT_CACHE_DIR，預設 .stt_cache)
+            metrics_path (str): 效能指標 JSONL 輸出路徑 (可選，未指定時不記錄)
+            backend (str): 轉錄引擎 openai / local / auto (預設讀取 STT_BACKEND，未設定時為 openai)
+        """
         # 載入環境變數
         load_dotenv()
+        backend = backend or os.getenv('STT_BACKEND', transcription_backends.OPENAI)
         
         # 設定 OpenAI API 金鑰
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key or api_key == 'your_openai_api_key_here':
-            print("❌ 請設定 OpenAI API 金鑰")
-            print("1. 建立 .env 檔案")
-            print("2. 在檔案中加入: OPENAI_API_KEY=您的金鑰")
-            print("3. 到 https://platform.openai.com/api-keys 取得金鑰")
-            raise ValueError("請在 .env 檔案中設定 OPENAI_API_KEY")
+            if backend != transcription_backends.LOCAL:
+                print("❌ 請設定 OpenAI API 金鑰")
+                print("1. 建立 .env 檔案")
+                print("2. 在檔案中加入: OPENAI_API_KEY=您的金鑰")
+                print("3. 到 https://platform.openai.com/api-keys 取得金鑰")
+                raise ValueError("請在 .env 檔案中設定 OPENAI_API_KEY")
+            # 只使用本機轉錄時不需要金鑰 (但無法使用 ChatGPT 整理)
+            print("⚠️  未設定 OpenAI API 金鑰，只能使用本機轉錄")
+            api_key = None
         
-        self.client = OpenAI(api_key=api_key)
+        # 重試交給共用的排程器處理，避免與 SDK 內建的重試疊加；
+        # 所有執行緒共用同一組連線池，轉錄上傳另外使用一個連線池，整理呼叫不會等在大型上傳後面
+        self.transport = http_transport.TransportConfig.from_env()
+        self.client = None
+        self.upload_client = None
+        if api_key:
+            self.client = OpenAI(
+                api_key=api_key, max_retries=0, timeout=self.transport.timeout(http_transport.CHAT),
+                http_client=http_transport.shared_client(self.transport, http_transport.API_POOL)
+            )
+            self.upload_client = self.client.with_options(
+                timeout=self.transport.timeout(http_transport.TRANSCRIPTION),
+                http_client=http_transport.shared_client(self.transport, http_transport.UPLOAD_POOL)
+            )
         
         # OpenAI Whisper API 支援的音訊格式
         self.supported_formats = ['.mp3', '.mp4', '.mpeg', '.mpga', '.m4a', '.wav', '.webm']
         
-    def transcribe_audio(self, file_path, language="zh"):
+        # 超過上傳限制的檔案會切段處理：每段大小上限 (MB) 與同時轉錄的段數
+        self.chunk_size_mb = 24
+        self.chunk_workers = 4
+        
+        self.transcription_model = "whisper-1"
+        
+        # 上傳前轉成單聲道 16kHz Opus (需要 ffmpeg)，可選擇去除開頭與結尾的長靜音
+        self.preprocess = os.getenv('STT_PREPROCESS', '').lower() in ('1', 'true', 'yes')
+        self.trim_silence = os.getenv('STT_TRIM_SILENCE', '').lower() in ('1', 'true', 'yes')
+        
+        # 長文本整理：同時進行的 API 呼叫數與每次合併的摘要數
+        self.summary_model = "gpt-3.5-turbo"
+        self.max_input_tokens = MAX_INPUT_TOKENS
+        self.chunk_tokens = CHUNK_TOKENS
+        self.summary_workers = 4
+        self.merge_fan_in = 4
+        # 長文本的處理方式 ("1" 截斷、"2" 分段合併)；None 表示每次詢問使用者
+        self.long_text_choice = None
+        
+        # 所有 API 呼叫共用的排程器：依帳號的 RPM / TPM 上限排隊，暫時性錯誤自動重試
+        self.scheduler = APIScheduler(max_retries=int(os.getenv('STT_MAX_RETRIES', '5')))
+        self.scheduler.set_limits(self.transcription_model, int(os.getenv('STT_AUDIO_RPM', '50')))
+        self.scheduler.set_limits(
+            self.summary_model,
+            int(os.getenv('STT_CHAT_RPM', '500')),
+            int(os.getenv('STT_CHAT_TPM', '200000'))
+        )
+        
+        # 轉錄引擎：OpenAI API、本機 faster-whisper，或依錄音長度自動選擇
+        self.backends = BackendSelector(
+            self, backend,
+            local_max_seconds=float(os.getenv('STT_LOCAL_MAX_SECONDS', '600')),
+            local_options={
+                "model_size": os.getenv('STT_LOCAL_MODEL', 'small'),
+                "compute_type": os.getenv('STT_LOCAL_COMPUTE_TYPE', 'int8'),
+                "num_workers": int(os.getenv('STT_LOCAL_WORKERS', '2')),
+            }
+        )
+        
+        # 實際上傳到 API 的位元組數 (快取命中不計)
+        self.uploaded_bytes = 0
+        self._stats_lock = threading.Lock()
+        
+        # 以音訊內容雜湊為鍵的轉錄快取，檔名不同但內容相同的錄音也能命中
+        # 摘要快取以段落內容為鍵，修改過的逐字稿只需重送變動的段落與最終合併
+        self.transcription_cache = None
+        self.summary_cache = None
+        if use_cache:
+            cache_dir = Path(os.getenv('STT_CACHE_DIR', '.stt_cache'))
+            max_bytes = int(float(os.getenv('STT_CACHE_MAX_MB', '200')) * 1024 * 1024)
+            self.transcription_cache = ResultCache(cache_dir / 'transcriptions.sqlite3', max_bytes=max_bytes)
+            self.summary_cache = SummaryCache(cache_dir / 'summaries.sqlite3', max_bytes=max_bytes)
+        
+        # 寫出的逐字稿與整理結果直接加入的全文索引，只有命令列在 STT_SEARCH_INDEX=true 時開啟
+        self.search_index = None
+        
+        # 各階段耗時紀錄，未開啟時使用幾乎沒有成本的 NullMetrics
+        self.metrics = MetricsRecorder(metrics_path) if metrics_path else NullMetrics()
+        
+    def transcribe_audio(self, file_path, language="zh", chunk_size_mb=None, chunk_workers=None):
         """
-        使用 Whisper API 轉錄音訊檔案
+        使用選定的轉錄引擎 (Whisper API 或本機 faster-whisper) 轉錄音訊檔案
+        
+        使用 API 時：開啟前處理 (self.preprocess) 時先轉成單聲道 16kHz Opus 再上傳；
+        超過 25MB 的檔案會在靜音處切段，同時轉錄後再依序接合。
         
         Args:
             file_path (str): 音訊檔案路徑
             language (str): 語言代碼 (預設為中文)
+            chunk_size_mb (float): 分段大小上限 (MB)，預設使用 self.chunk_size_mb
+            chunk_workers (int): 同時轉錄的段數，預設使用 self.chunk_workers
         
         Returns:
             str: 轉錄的文字
         """
+        return self.transcribe_segments(file_path, language, chunk_size_mb, chunk_workers)[0]
+    
+    def transcribe_segments(self, file_path, language="zh", chunk_size_mb=None, chunk_workers=None):
+        """
+        轉錄音訊檔案並保留每個片段的時間戳記 (參數同 transcribe_audio)
+        
+        Returns:
+            tuple: (轉錄的文字, [(開始秒數, 結束秒數, 文字), ...])；
+                   加入時間戳記之前的快取命中時沒有片段，片段為 None
+        """
         file_path = Path(file_path)
         
         if not file_path.exists():
@@ -53,45 +254,254 @@ class SpeechToText:
             print(f"⚠️  檔案格式 {file_path.suffix} 可能不被支援")
             print(f"建議的格式: {', '.join(self.supported_formats)}")
         
-        # 檢查檔案大小 (OpenAI 限制 25MB)
-        file_size = file_path.stat().st_size / (1024 * 1024)  # MB
-        if file_size > 25:
-            raise ValueError(f"檔案太大 ({file_size:.1f}MB)，OpenAI 限制為 25MB")
+        backend, duration = self.backends.select(file_path)
+        
+        # 前處理只用來減少上傳量，本機轉錄不需要
+        preprocess = (self.preprocess or self.trim_silence) and backend.name == transcription_backends.OPENAI
+        if preprocess:
+            try:
+                audio_chunker.check_ffmpeg()
+            except RuntimeError as e:
+                print(f"⚠️  略過音訊前處理: {e}")
+                preprocess = False
+        
+        # 先查快取，命中時不需要上傳
+        cache_key = None
+        if self.transcription_cache is not None:
+            with self.metrics.stage("hash", bytes=file_path.stat().st_size) as stage:
+                variant = [audio_preprocess.preprocess_signature(self.trim_silence)] if preprocess else []
+                cache_key, segments_key = transcription_keys(
+                    hash_file(file_path), language, backend.cache_id, *variant
+                )
+                cached = self.transcription_cache.get(cache_key)
+                stage["cache_hit"] = cached is not None
+            if cached is not None:
+                print(f"♻️  使用快取的轉錄結果: {file_path.name}")
+                # 片段另外存放，文字的快取鍵與加入時間戳記之前相同
+                cached_segments = self.transcription_cache.get(segments_key)
+                return cached, json.loads(cached_segments) if cached_segments is not None else None
         
+        if backend.name == transcription_backends.LOCAL:
+            text, segments = self._transcribe_local(backend, file_path, language, duration)
+        elif preprocess:
+            with tempfile.TemporaryDirectory(prefix="stt_preprocess_") as temp_dir:
+                upload_path, offset = self._preprocess_audio(file_path, temp_dir)
+                text, segments = self._transcribe_path(upload_path, language, chunk_size_mb, chunk_workers)
+            # 去除了開頭的靜音時，片段時間加回被去除的長度
+            segments = [(start + offset, end + offset, piece) for start, end, piece in segments]
+        else:
+            text, segments = self._transcribe_path(file_path, language, chunk_size_mb, chunk_workers)
+        
+        if cache_key is not None:
+            self.transcription_cache.put(cache_key, text)
+            self.transcription_cache.put(segments_key, json.dumps(segments, ensure_ascii=False))
+        return text, segments
+    
+    def _transcribe_local(self, backend, file_path, language, duration):
+        """在本機轉錄並記錄即時率 (處理時間 / 音訊長度)"""
+        with self.metrics.stage("local_whisper", audio_seconds=duration) as stage:
+            text, segments, elapsed, rtf = timed_transcribe(backend, file_path, language, duration)
+            stage["rtf"] = rtf
+        if rtf is not None:
+            print(f"⚡ 本機轉錄 {duration:.0f} 秒音訊花了 {elapsed:.1f} 秒 (即時率 {rtf:.2f})")
+        return text, segments
+    
+    def _preprocess_audio(self, file_path, temp_dir):
+        """
+        將音訊轉成單聲道 16kHz Opus 並記錄前後大小
+        
+        Returns:
+            tuple: (要上傳的檔案, 開頭去除的秒數)；前處理沒有變小時使用原始檔案
+        """
+        before = file_path.stat().st_size
+        print(f"🎛️  正在前處理音訊: {file_path.name}")
+        with self.metrics.stage("preprocess", bytes_before=before) as stage:
+            output_path, trimmed, offset = audio_preprocess.preprocess_audio(
+                file_path, temp_dir, trim_silence=self.trim_silence
+            )
+            after = output_path.stat().st_size
+            stage["bytes_after"] = after
+        if trimmed:
+            print(f"✂️  已去除 {trimmed:.1f} 秒的前後靜音")
+        if after >= before:
+            print(f"📦 前處理沒有縮小檔案 ({before / (1024 * 1024):.1f}MB)，上傳原始檔案")
+            return file_path, 0.0
+        print(f"📦 上傳大小: {before / (1024 * 1024):.1f}MB → {after / (1024 * 1024):.1f}MB "
+              f"(減少 {(1 - after / before) * 100:.0f}%)")
+        return output_path, offset
+    
+    def _transcribe_path(self, file_path, language, chunk_size_mb=None, chunk_workers=None):
+        """
+        依檔案大小選擇直接轉錄或分段轉錄
+        
+        Returns:
+            tuple: (文字, [(開始秒數, 結束秒數, 文字), ...])
+        """
+        # 檢查檔案大小 (OpenAI 限制 25MB)，超過時改用分段轉錄
+        file_size = file_path.stat().st_size / (1024 * 1024)  # MB
+        if file_size > MAX_UPLOAD_MB:
+            return self._transcribe_chunked(file_path, language, chunk_size_mb, chunk_workers)
         print(f"🎤 正在轉錄: {file_path.name}")
         print(f"📁 檔案大小: {file_size:.1f}MB")
         print("⏳ 請稍候...")
+        return self._transcribe_file(file_path, language)
+    
+    def _transcribe_file(self, file_path, language):
+        """
+        呼叫 Whisper API 轉錄單一檔案 (不做大小檢查)
         
+        Returns:
+            tuple: (文字, [(開始秒數, 結束秒數, 文字), ...])
+        """
         try:
-            with open(file_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language
+            file_size = Path(file_path).stat().st_size
+            # 以 mmap 逐塊上傳，不把整個檔案讀進記憶體
+            with http_transport.MappedUpload(file_path) as audio_file:
+                if self.metrics.enabled:
+                    audio_file = TimedReader(audio_file)
+                transcript = self.scheduler.call(
+                    self.transcription_model,
+                    self._upload_transcription,
+                    audio_file,
+                    language
                 )
-            return transcript.text
+                if self.metrics.enabled:
+                    # 上傳階段到檔案讀完為止，之後到收到回應為 Whisper 處理時間
+                    end = time.perf_counter()
+                    sent = audio_file.eof_at or end
+                    self.metrics.add_stage("upload", (sent - (audio_file.started_at or sent)) * 1000, bytes=file_size)
+                    self.metrics.add_stage("whisper", (end - sent) * 1000)
+            with self._stats_lock:
+                self.uploaded_bytes += file_size
+            segments = [(s.start, s.end, s.text.strip()) for s in (getattr(transcript, "segments", None) or [])]
+            return transcript.text, segments
         except Exception as e:
             raise Exception(f"轉錄失敗: {e}")
     
-    def summarize_text(self, text, summary_type="重點整理"):
+    def _upload_transcription(self, audio_file, language):
+        """上傳音訊檔案 (重試時從檔案開頭重新上傳)；verbose_json 回應包含每個片段的時間戳記"""
+        audio_file.seek(0)
+        if isinstance(audio_file, TimedReader):
+            audio_file.start()
+        return self.upload_client.audio.transcriptions.create(
+            model=self.transcription_model,
+            file=audio_file,
+            language=language,
+            response_format="verbose_json"
+        )
+    
+    def _transcribe_chunked(self, file_path, language, chunk_size_mb=None, chunk_workers=None):
+        """
+        將大型音訊檔案在靜音處切段，同時轉錄各段後依序接合
+        
+        每段的切割與轉錄在同一個工作執行緒中完成，總耗時約等於最慢的一段。
+        """
+        chunk_size_mb = min(chunk_size_mb or self.chunk_size_mb, MAX_UPLOAD_MB)
+        chunk_workers = max(1, int(chunk_workers or self.chunk_workers))
+        
+        try:
+            audio_chunker.check_ffmpeg()
+        except RuntimeError as e:
+            raise ValueError(f"檔案超過 {MAX_UPLOAD_MB}MB 且無法分段: {e}")
+        
+        file_size = file_path.stat().st_size
+        print(f"🎤 正在轉錄: {file_path.name}")
+        print(f"📁 檔案大小: {file_size / (1024 * 1024):.1f}MB (超過 {MAX_UPLOAD_MB}MB，將分段處理)")
+        print("🔍 正在尋找靜音切割點...")
+        
+        with self.metrics.stage("silence_detect"):
+            duration = audio_chunker.probe_duration(file_path)
+            silences = audio_chunker.detect_silences(file_path)
+        chunks = audio_chunker.plan_chunks(duration, file_size, silences, int(chunk_size_mb * 1024 * 1024))
+        print(f"✂️  已切成 {len(chunks)} 段，同時轉錄 {min(chunk_workers, len(chunks))} 段")
+        
+        with tempfile.TemporaryDirectory(prefix="stt_chunks_") as temp_dir:
+            def run_chunk(index, start, end):
+                chunk_path = Path(temp_dir) / f"chunk_{index:03d}{file_path.suffix}"
+                with self.metrics.stage("extract", index=index):
+                    audio_chunker.extract_chunk(file_path, start, end, chunk_path)
+                chunk_mb = chunk_path.stat().st_size / (1024 * 1024)
+                if chunk_mb > MAX_UPLOAD_MB:
+                    raise ValueError(f"第 {index + 1} 段仍然太大 ({chunk_mb:.1f}MB)，請調低分段大小")
+                result = self._transcribe_file(chunk_path, language)
+                print(f"✅ 第 {index + 1}/{len(chunks)} 段轉錄完成")
+                return result
+            
+            with ThreadPoolExecutor(max_workers=chunk_workers) as executor:
+                futures = [metrics.submit(executor, run_chunk, i, start, end) for i, (start, end) in enumerate(chunks)]
+                parts = [future.result() for future in futures]
+        
+        print("🧵 正在接合分段結果...")
+        # 片段時間換算成原始錄音的時間，重疊區的片段只保留一次；
+        # 每段都有片段時文字由保留的片段組成，與時間索引完全對應，否則以文字比對接合
+        segments = audio_chunker.stitch_segments([part[1] for part in parts], chunks)
+        if all(part[1] for part in parts):
+            return audio_chunker.join_segments(segments), segments
+        return audio_chunker.stitch_transcripts([part[0] for part in parts]), segments
+    
+    def summarize_text(self, text, summary_type="重點整理", stream_to=None):
         """
         使用 ChatGPT 整理文字內容
         
         Args:
             text (str): 需要整理的文字
             summary_type (str): 整理類型
+            stream_to (str): 串流模式的輸出檔案路徑 (可選)；指定時結果會邊產生邊顯示並寫入此檔案
         
         Returns:
             str: 整理後的文字
         """
+        self._require_client()
         print(f"🤖 正在使用 ChatGPT 進行{summary_type}...")
-        print(f"📝 文字長度: {len(text)} 字元")
+        text, long_text = self._prepare_text(text)
+        if long_text:
+            return self._process_long_text(text, summary_type, stream_to=stream_to)
+        return self._summarize_single(text, summary_type, stream_to)
+    
+    def summarize_many(self, text, summary_types):
+        """
+        一次產生多種整理結果
+        
+        長文本的分段摘要與逐層合併只做一次，之後各整理類型的最終整理同時進行，
+        多產生一種整理只多一次最終整理的輸入 token。
+        
+        Args:
+            text (str): 需要整理的文字
+            summary_types (list): 整理類型 (也可以是 parse_summary_types 接受的字串)
+        
+        Returns:
+            dict: {整理類型: 整理後的文字}，順序與 summary_types 相同
+        """
+        self._require_client()
+        summary_types = parse_summary_types(summary_types)
+        print(f"🤖 正在使用 ChatGPT 進行{'、'.join(summary_types)}...")
+        text, long_text = self._prepare_text(text)
+        if long_text:
+            combined_summary = self._condense_long_text(text)
+            return self._fan_out(summary_types, lambda t: self._final_merge(combined_summary, t))
+        return self._fan_out(summary_types, lambda t: self._summarize_single(text, t))
+    
+    def _require_client(self):
+        if self.client is None:
+            raise ValueError("未設定 OPENAI_API_KEY，無法使用 ChatGPT 整理")
+    
+    def _prepare_text(self, text):
+        """
+        檢查文字長度，超過單次呼叫的 token 預算時決定處理方式
+        
+        Returns:
+            tuple: (要整理的文字, 是否需要分段處理)
+        """
+        token_count = count_tokens(text, self.summary_model)
+        print(f"📝 文字長度: {len(text)} 字元 (約 {token_count} tokens)")
+        if token_count <= self.max_input_tokens:
+            return text, False
         
-        # 檢查文字長度，如果太長需要特殊處理
-        if len(text) > 8000:  # 保守的長度限制
-            print("⚠️  文字內容較長，可能需要分段處理...")
+        print("⚠️  文字內容較長，可能需要分段處理...")
+        choice = self.long_text_choice
+        if choice is None:
             print("請選擇處理方式：")
-            print("1️⃣  只處理前 8000 字元")
+            print(f"1️⃣  只處理前 {self.max_input_tokens} tokens")
             print("2️⃣  分段處理並合併結果")
             print("3️⃣  取消整理")
             
@@ -99,150 +509,305 @@ class SpeechToText:
                 choice = input("請選擇 (1-3): ").strip()
             except:
                 choice = "1"  # 默認選擇
-            
-            if choice == "1":
-                text = text[:8000]
-                print(f"📝 已截取前 8000 字元進行處理")
-            elif choice == "2":
-                return self._process_long_text(text, summary_type)
-            else:
-                raise Exception("用戶取消整理")
         
+        if choice == "1":
+            text = chunk_text(text, self.max_input_tokens, self.summary_model)[0]
+            print(f"📝 已截取前 {len(text)} 字元 (完整句子) 進行處理")
+            return text, False
+        if choice == "2":
+            return text, True
+        raise Exception("用戶取消整理")
+    
+    def _summarize_single(self, text, summary_type, stream_to=None):
+        """以一次 API 呼叫整理整份文字"""
         print("⏳ 正在連接 OpenAI API...")
         
-        # 根據不同類型設定不同的提示詞
-        prompts = {
-            "重點整理": """
-            請幫我整理以下文字內容的重點：
-
-            1. 提取主要觀點和重要資訊
-            2. 整理成條列式要點
-            3. 保持原文的語言風格
-            4. 如果有時間、地點、人名等重要細節，請特別標註
-
-            請用繁體中文回覆。
-
-            原文內容：
-            """,
-            "會議紀錄": """
-            請幫我將以下內容整理成正式的會議紀錄格式：
-
-            1. 主要議題和討論內容
-            2. 重要決議和行動項目
-            3. 責任歸屬和時間點
-            4. 如有具體數字、日期請特別標註
-
-            請用繁體中文回覆，格式要清晰易讀。
-
-            會議內容：
-            """,
-            "筆記整理": """
-            請幫我將以下內容整理成結構化的筆記：
-
-            1. 按主題分類整理
-            2. 重要概念和關鍵字標註
-            3. 補充說明和細節
-            4. 如有可行動項目請列出
-
-            請用繁體中文回覆。
-
-            筆記內容：
-            """,
-            "摘要總結": """
-            請幫我將以下內容寫成簡潔的摘要：
-
-            1. 用 2-3 段文字總結主要內容
-            2. 保留最重要的資訊
-            3. 語言要簡潔清晰
-            4. 保持客觀中性的語調
-
-            請用繁體中文回覆。
-
-            原文內容：
-            """
-        }
-        
-        system_prompt = prompts.get(summary_type, prompts["重點整理"])
-        
         try:
             print("🔄 正在處理中，請稍候...")
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "你是一個專業的文字整理助手，擅長將語音轉錄內容整理成清晰易讀的格式。"},
-                    {"role": "user", "content": system_prompt + text}
-                ],
-                max_tokens=2000,
-                temperature=0.3
-            )
+            result = self._chat(*self._single_request(text, summary_type), stream_to=stream_to)
             print("✅ API 呼叫成功")
-            return response.choices[0].message.content
+            return result
         except Exception as e:
             raise Exception(f"文字整理失敗: {e}")
     
-    def _process_long_text(self, text, summary_type):
+    def _fan_out(self, summary_types, func):
+        """對每個整理類型同時執行 func，回傳 {整理類型: 結果}"""
+        with ThreadPoolExecutor(max_workers=max(1, min(self.summary_workers, len(summary_types)))) as executor:
+            futures = {t: metrics.submit(executor, func, t) for t in summary_types}
+            return {t: future.result() for t, future in futures.items()}
+    
+    def _process_long_text(self, text, summary_type, max_workers=None, fan_in=None, stream_to=None):
         """
         處理長文本，分段處理並合併結果
+        
+        Args:
+            text (str): 需要整理的文字
+            summary_type (str): 整理類型
+            max_workers (int): 同時進行的 API 呼叫數，預設使用 self.summary_workers
+            fan_in (int): 每次合併的摘要數量，預設使用 self.merge_fan_in
+            stream_to (str): 串流模式的輸出檔案路徑 (可選)，只有最終整理會串流輸出
+        
+        Returns:
+            str: 整理後的文字
         """
-        print("🔄 開始分段處理長文本...")
+        combined_summary = self._condense_long_text(text, max_workers, fan_in)
+        return self._final_merge(combined_summary, summary_type, stream_to)
+    
+    def _condense_long_text(self, text, max_workers=None, fan_in=None):
+        """
+        將長文本分段摘要並逐層合併，直到可以一次完成最終整理
         
-        # 將文字分成多段，每段約 6000 字元
-        chunk_size = 6000
-        chunks = []
-        for i in range(0, len(text), chunk_size):
-            chunks.append(text[i:i + chunk_size])
+        各段摘要同時進行 (map)，合併時若內容仍然太長，
+        則每次合併 fan_in 段、逐層往上合併 (reduce)。這一步與整理類型無關，
+        多種整理類型可以共用同一份結果。
         
-        print(f"📝 文字已分成 {len(chunks)} 段進行處理")
+        Returns:
+            str: 合併後的分段摘要
+        """
+        max_workers = max(1, int(max_workers or self.summary_workers))
+        fan_in = max(2, int(fan_in or self.merge_fan_in))
         
-        summaries = []
-        for i, chunk in enumerate(chunks):
-            print(f"🔄 正在處理第 {i+1}/{len(chunks)} 段...")
-            try:
-                # 為分段添加特殊提示
-                chunk_prompt = f"這是第{i+1}段，共{len(chunks)}段內容。請整理這段內容的重點："
-                
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "你是一個專業的文字整理助手，正在處理分段內容。"},
-                        {"role": "user", "content": chunk_prompt + "\n\n" + chunk}
-                    ],
-                    max_tokens=1500,
-                    temperature=0.3
-                )
-                summaries.append(response.choices[0].message.content)
-                print(f"✅ 第 {i+1} 段處理完成")
-            except Exception as e:
-                print(f"⚠️  第 {i+1} 段處理失敗: {e}")
-                summaries.append(f"[第 {i+1} 段處理失敗]")
+        print("🔄 開始分段處理長文本...")
         
-        # 合併所有摘要
-        print("🔄 正在合併分段結果...")
-        combined_summary = "\n\n".join([f"## 第 {i+1} 段摘要\n{summary}" for i, summary in enumerate(summaries)])
+        # 在句子邊界將文字分段，每段盡量填滿 token 預算
+        chunks = chunk_text(text, self.chunk_tokens, self.summary_model, min_fill=CHUNK_MIN_FILL)
         
-        # 對合併結果進行最終整理
-        try:
-            final_prompt = f"以下是分段整理的結果，請將它們合併成一個完整的{summary_type}：\n\n{combined_summary}"
+        print(f"📝 文字已分成 {len(chunks)} 段進行處理 (同時處理 {min(max_workers, len(chunks))} 段)")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [metrics.submit(executor, self._summarize_chunk, i, len(chunks), chunk) for i, chunk in enumerate(chunks)]
+            summaries = [future.result() for future in futures]
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": f"請將分段整理的內容合併成一個完整的{summary_type}。"},
-                    {"role": "user", "content": final_prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.3
+            # 合併結果仍然太長時，逐層合併
+            level = 1
+            while len(summaries) > 1 and count_tokens(self._combine_summaries(summaries), self.summary_model) > self.max_input_tokens:
+                groups = [summaries[i:i + fan_in] for i in range(0, len(summaries), fan_in)]
+                print(f"🔄 第 {level} 層合併: {len(summaries)} 份摘要 → {len(groups)} 份")
+                futures = [metrics.submit(executor, self._condense_summaries, group) for group in groups]
+                summaries = [future.result() for future in futures]
+                level += 1
+        
+        return self._combine_summaries(summaries)
+    
+    def _final_merge(self, combined_summary, summary_type, stream_to=None):
+        """依整理類型對合併後的分段摘要進行最終整理，失敗時回傳分段結果"""
+        print(f"🔄 正在合併分段結果 ({summary_type})...")
+        try:
+            result = self._labelled(
+                "最終合併",
+                self._chat,
+                *self._merge_request(combined_summary, summary_type),
+                stream_to
             )
-            
-            print("✅ 分段處理完成，已合併結果")
-            return response.choices[0].message.content
-            
+            print(f"✅ 分段處理完成，已合併結果 ({summary_type})")
+            return result
         except Exception as e:
             print(f"⚠️  最終合併失敗: {e}")
             print("返回分段結果...")
+            if stream_to is not None:
+                write_text_atomic(stream_to, combined_summary)
             return combined_summary
     
-    def process_file(self, input_path, output_txt_path=None, language="zh", auto_summarize=False, summary_type="重點整理"):
+    def _chat(self, system_content, user_content, max_tokens, cache_parts=None, stream_to=None):
+        """
+        呼叫 ChatGPT 並回傳文字內容
+        
+        指定 cache_parts 時先查摘要快取，鍵由 cache_parts、模型與提示詞版本組成。
+        指定 stream_to 時改用串流模式，並將結果寫入該檔案。
+        """
+        step = cache_parts[0] if cache_parts else "chat"
+        with self.metrics.stage(f"chat:{step}", model=self.summary_model) as stage:
+            cache_key = None
+            if cache_parts is not None and self.summary_cache is not None:
+                cache_key = self._summary_cache_key(cache_parts)
+                cached = self.summary_cache.get_result(cache_key)
+                if cached is not None:
+                    stage["cache_hit"] = True
+                    if stream_to is not None:
+                        write_text_atomic(stream_to, cached)
+                    return cached
+            
+            if stream_to is not None:
+                content, usage = self._stream_chat(system_content, user_content, max_tokens, stream_to)
+            else:
+                response = self.scheduler.call(
+                    self.summary_model,
+                    self.client.chat.completions.create,
+                    model=self.summary_model,
+                    messages=[
+                        {"role": "system", "content": system_content},
+                        {"role": "user", "content": user_content}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0.3,
+                    estimated_tokens=self._estimate_chat_tokens(system_content, user_content, max_tokens)
+                )
+                content = response.choices[0].message.content
+                usage = response.usage.model_dump() if getattr(response, "usage", None) else None
+            
+            if usage:
+                stage["prompt_tokens"] = usage.get("prompt_tokens")
+                stage["completion_tokens"] = usage.get("completion_tokens")
+            if cache_key is not None:
+                self.summary_cache.put_result(cache_key, content, usage)
+            return content
+    
+    def _estimate_chat_tokens(self, system_content, user_content, max_tokens):
+        """TPM 額度以輸入 token 數加上最大輸出 token 數估計"""
+        return count_tokens(system_content + user_content, self.summary_model) + max_tokens
+    
+    def _stream_chat(self, system_content, user_content, max_tokens, output_path):
+        """
+        以串流模式呼叫 ChatGPT，token 一到就同時輸出到終端機與檔案
+        
+        內容先寫入同資料夾的暫存檔，完成後才以原子方式改名為輸出檔案，
+        中途失敗不會留下不完整的結果。
+        
+        Returns:
+            tuple: (完整文字, token 用量 dict 或 None)
+        """
+        parts = []
+        usage = None
+        first_token_at = None
+        start_time = time.perf_counter()
+        try:
+            with atomic_open(output_path) as f:
+                stream = self.scheduler.call(
+                    self.summary_model,
+                    self.client.chat.completions.create,
+                    model=self.summary_model,
+                    messages=[
+                        {"role": "system", "content": system_content},
+                        {"role": "user", "content": user_content}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0.3,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    estimated_tokens=self._estimate_chat_tokens(system_content, user_content, max_tokens)
+                )
+                for event in stream:
+                    if getattr(event, "usage", None):
+                        usage = event.usage.model_dump()
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(delta)
+                    f.write(delta)
+                    f.flush()
+                    sys.stdout.write(delta)
+                    sys.stdout.flush()
+        except BaseException:
+            print("")
+            raise
+        
+        end_time = time.perf_counter()
+        content = "".join(parts)
+        print("")
+        if first_token_at is not None:
+            completion_tokens = (usage or {}).get("completion_tokens") or count_tokens(content, self.summary_model)
+            generation_time = max(end_time - first_token_at, 1e-6)
+            print(f"⚡ 首個 token: {first_token_at - start_time:.2f} 秒，"
+                  f"輸出速度: {completion_tokens / generation_time:.1f} tokens/秒")
+        return content, usage
+    
+    def _labelled(self, label, func, *args):
+        """執行一個步驟 (暫時性錯誤已由 self.scheduler 重試)，失敗時在錯誤訊息標示步驟名稱"""
+        try:
+            return func(*args)
+        except Exception as e:
+            raise Exception(f"{label}處理失敗: {e}")
+    
+    def _summarize_chunk(self, index, total, chunk):
+        """整理單一段落的重點 (失敗時由排程器單獨重試這一段)"""
+        print(f"🔄 正在處理第 {index + 1}/{total} 段...")
+        summary = self._labelled(f"第 {index + 1} 段", self._chat, *self._chunk_request(index, total, chunk))
+        print(f"✅ 第 {index + 1} 段處理完成")
+        return summary
+    
+    def _condense_summaries(self, summaries):
+        """將一組分段摘要合併成一份較精簡的摘要 (階層式合併的中間層)"""
+        return self._labelled("中間層合併", self._chat, *self._condense_request(summaries))
+    
+    # 以下產生各步驟的 ChatGPT 請求 (系統提示, 使用者內容, 最大輸出 tokens, 快取鍵欄位)，
+    # 即時整理與批次整理 (batch_summarize.py) 共用，兩者送出的內容與快取鍵完全相同
+    
+    @staticmethod
+    def _single_request(text, summary_type):
+        """一次整理整份文字 (根據不同類型設定不同的提示詞)"""
+        system_prompt = SUMMARY_PROMPTS.get(summary_type, SUMMARY_PROMPTS["重點整理"])
+        return (
+            "你是一個專業的文字整理助手，擅長將語音轉錄內容整理成清晰易讀的格式。",
+            system_prompt + text,
+            2000,
+            ("single", summary_type, hash_text(text))
+        )
+    
+    @staticmethod
+    def _chunk_request(index, total, chunk):
+        """整理單一段落的重點"""
+        # 為分段添加特殊提示 (快取鍵只看段落內容，段落位置改變時仍可沿用)
+        chunk_prompt = f"這是第{index + 1}段，共{total}段內容。請整理這段內容的重點："
+        return (
+            "你是一個專業的文字整理助手，正在處理分段內容。",
+            chunk_prompt + "\n\n" + chunk,
+            1500,
+            ("chunk", hash_text(chunk))
+        )
+    
+    @classmethod
+    def _condense_request(cls, summaries):
+        """合併一組分段摘要 (階層式合併的中間層)"""
+        combined = cls._combine_summaries(summaries)
+        prompt = f"以下是連續數段內容的摘要，請依原本順序合併成一份精簡的摘要，保留所有重要資訊與細節：\n\n{combined}"
+        return (
+            "你是一個專業的文字整理助手，正在合併分段摘要。",
+            prompt,
+            1500,
+            ("condense", hash_text(combined))
+        )
+    
+    @staticmethod
+    def _merge_request(combined_summary, summary_type):
+        """依整理類型對合併後的分段摘要進行最終整理"""
+        final_prompt = f"以下是分段整理的結果，請將它們合併成一個完整的{summary_type}：\n\n{combined_summary}"
+        return (
+            f"請將分段整理的內容合併成一個完整的{summary_type}。",
+            final_prompt,
+            2000,
+            ("merge", summary_type, hash_text(combined_summary))
+        )
+    
+    def _summary_cache_key(self, cache_parts):
+        """摘要快取鍵：由步驟欄位、模型與提示詞版本組成"""
+        return make_key("summary", PROMPT_VERSION, self.summary_model, *cache_parts)
+    
+    def report_summary_cache(self):
+        """顯示摘要快取省下的 API 呼叫次數與 token 數"""
+        if self.summary_cache is None:
+            return
+        stats = self.summary_cache.stats()
+        if stats["hits"] or stats["misses"]:
+            print(f"♻️  摘要快取: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次，"
+                  f"省下 {stats['saved_calls']} 次 API 呼叫、約 {stats['saved_tokens']} tokens")
+    
+    def report_scheduler(self):
+        """顯示 API 排程器的統計 (限流等待與重試)"""
+        stats = self.scheduler.stats()
+        print(f"🚦 API 排程: 送出 {stats['requests']} 次請求，限流等待 {stats['throttled']} 次 "
+              f"(共 {stats['throttle_seconds']} 秒)，重試 {stats['retries']} 次 (其中 429 {stats['rate_limited']} 次)")
+    
+    @staticmethod
+    def _combine_summaries(summaries):
+        """將多份摘要串接成一段文字"""
+        return "\n\n".join([f"## 第 {i+1} 段摘要\n{summary}" for i, summary in enumerate(summaries)])
+    
+    def process_file(self, input_path, output_txt_path=None, language="zh", auto_summarize=False, summary_type="重點整理",
+                     chunk_size_mb=None, chunk_workers=None, stream=False):
         """
         處理語音檔案並轉錄，可選擇自動整理
         
@@ -251,123 +816,547 @@ class SpeechToText:
             output_txt_path (str): 輸出文字檔案路徑 (可選)
             language (str): 語言代碼
             auto_summarize (bool): 是否自動整理文字
-            summary_type (str): 整理類型
+            summary_type (str): 整理類型 (可用逗號分隔多個類型，或 all)
+            chunk_size_mb (float): 大型檔案的分段大小上限 (MB，可選)
+            chunk_workers (int): 大型檔案同時轉錄的段數 (可選)
+            stream (bool): 整理結果是否邊產生邊顯示並寫入檔案
         
         Returns:
-            tuple: (轉錄文字, 整理後文字 或 None)
+            tuple: (轉錄文字, 整理後文字 或 None)；多個整理類型時整理結果為 {整理類型: 文字}
         """
         input_path = Path(input_path)
         
-        # 轉錄音訊
-        text = self.transcribe_audio(input_path, language)
+        with self.metrics.file_record(input_path, "audio"):
+            # 轉錄音訊
+            text, segments = self.transcribe_segments(
+                input_path, language, chunk_size_mb=chunk_size_mb, chunk_workers=chunk_workers
+            )
+        
+            # 儲存原始轉錄檔案
+            if output_txt_path is None:
+                output_txt_path = input_path.with_suffix('.txt')
         
-        # 儲存原始轉錄檔案
-        if output_txt_path is None:
-            output_txt_path = input_path.with_suffix('.txt')
+            with self.metrics.stage("write"):
+                with open(output_txt_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                self._index_output(output_txt_path, text, None)
+                self._write_segments(output_txt_path, text, segments)
         
-        with open(output_txt_path, 'w', encoding='utf-8') as f:
-            f.write(text)
+            print(f"✅ 轉錄完成！文字已儲存到: {output_txt_path}")
         
-        print(f"✅ 轉錄完成！文字已儲存到: {output_txt_path}")
+            summarized_text = None
+            if auto_summarize:
+                try:
+                    print("")
+                    print("🤖 開始智能整理流程...")
+                    print(f"📝 整理類型: {'、'.join(parse_summary_types(summary_type))}")
+                    print("─" * 50)
+                    summarized_text = self._summarize_and_save(text, input_path, summary_type, stream)
+                    print("─" * 50)
+                except Exception as e:
+                    print(f"⚠️  文字整理失敗: {e}")
+                    print("原始轉錄檔案已保存")
         
-        summarized_text = None
-        if auto_summarize:
-            try:
+            return text, summarized_text
+    
+    def process_live(self, source, output_txt_path=None, language="zh", auto_summarize=False, summary_type="重點整理",
+                     window_seconds=15.0, overlap_seconds=2.0, jobs=2, idle_seconds=10.0, stream=False):
+        """
+        即時轉錄錄音中的檔案或標準輸入，錄音結束後可選擇整理累積的逐字稿
+        
+        Args:
+            source (str): 仍在變大的音訊檔案，或 "-" 表示標準輸入
+            output_txt_path (str): 輸出文字檔案路徑 (可選，標準輸入時預設為 live_<時間>.txt)
+            language (str): 語言代碼
+            auto_summarize (bool): 錄音結束後是否整理
+            summary_type (str): 整理類型 (可用逗號分隔多個類型，或 all)
+            window_seconds (float): 每段長度 (秒)
+            overlap_seconds (float): 相鄰兩段重疊的長度 (秒)
+            jobs (int): 同時轉錄的段數
+            idle_seconds (float): 檔案多久沒有變大視為錄音結束 (秒)
+            stream (bool): 整理結果是否邊產生邊顯示並寫入檔案
+        
+        Returns:
+            tuple: (轉錄文字, 整理後文字 或 None)
+        """
+        if output_txt_path is None:
+            output_txt_path = (Path(f"live_{time.strftime('%Y%m%d-%H%M%S')}.txt") if source == "-"
+                               else Path(source).with_suffix('.txt'))
+        output_txt_path = Path(output_txt_path)
+        from live_transcribe import LiveTranscriber
+        
+        with self.metrics.file_record(source, "live"):
+            transcriber = LiveTranscriber(
+                self, output_txt_path, language=language, window_seconds=window_seconds,
+                overlap_seconds=overlap_seconds, jobs=jobs
+            )
+            text = transcriber.run(source, idle_seconds=idle_seconds)
+            if not text.strip():
+                return text, None
+            self._index_output(output_txt_path, text, None)
+            print(f"✅ 錄音結束！逐字稿已儲存到: {output_txt_path}")
+        
+            summarized_text = None
+            if auto_summarize:
                 print("")
-                print("🤖 開始智能整理流程...")
-                print(f"📝 整理類型: {summary_type}")
+                print(f"🤖 開始整理累積的逐字稿 ({len(text)} 字元)...")
+                print("─" * 50)
+                summarized_text = self._summarize_and_save(text, output_txt_path, summary_type, stream)
                 print("─" * 50)
+            return text, summarized_text
+    
+    def _summarize_and_save(self, text, source_path, summary_type, stream=False):
+        """
+        整理文字並儲存成 <原檔名>.<整理類型>.txt
+        
+        summary_type 包含多個類型時共用同一次分段處理，結果為 {整理類型: 文字}；
+        多個類型同時產生時不使用串流顯示，避免輸出交錯。
+        
+        Returns:
+            str 或 dict: 整理後的文字
+        """
+        summary_types = parse_summary_types(summary_type)
+        self.metrics.annotate(summary_type=",".join(summary_types))
+        if len(summary_types) == 1:
+            summary_type = summary_types[0]
+            summary_path = source_path.with_suffix(f'.{summary_type}.txt')
+            if stream:
+                # 串流模式在產生結果的同時寫入檔案
+                summarized_text = self.summarize_text(text, summary_type, stream_to=summary_path)
+            else:
                 summarized_text = self.summarize_text(text, summary_type)
                 
                 # 儲存整理後的檔案
-                summary_path = input_path.with_suffix(f'.{summary_type}.txt')
                 print(f"💾 正在儲存整理結果到: {summary_path.name}")
-                with open(summary_path, 'w', encoding='utf-8') as f:
-                    f.write(summarized_text)
-                
-                print(f"🤖 文字整理完成！已儲存到: {summary_path}")
-                print("─" * 50)
-            except Exception as e:
-                print(f"⚠️  文字整理失敗: {e}")
-                print("原始轉錄檔案已保存")
+                with self.metrics.stage("write"):
+                    write_text_atomic(summary_path, summarized_text)
+            self._index_output(summary_path, summarized_text, summary_type)
+            print(f"🤖 文字整理完成！已儲存到: {summary_path}")
+            return summarized_text
         
-        return text, summarized_text
+        if stream:
+            print("💡 同時產生多種整理時不使用串流顯示")
+        results = self.summarize_many(text, summary_types)
+        with self.metrics.stage("write"):
+            for summary_type, summarized_text in results.items():
+                summary_path = source_path.with_suffix(f'.{summary_type}.txt')
+                write_text_atomic(summary_path, summarized_text)
+                self._index_output(summary_path, summarized_text, summary_type)
+                print(f"🤖 {summary_type}完成！已儲存到: {summary_path}")
+        return results
     
-    def process_text_file(self, text_file_path, summary_type="重點整理"):
+    def _write_segments(self, txt_path, text, segments):
+        """
+        在逐字稿旁寫入時間索引 (<檔名>.segments)；沒有片段時移除舊的索引，
+        避免留下與新逐字稿不符的時間
+        """
+        import segment_index
+        index_path = segment_index.sidecar_path(txt_path)
+        if not segments:
+            index_path.unlink(missing_ok=True)
+            return
+        try:
+            count = segment_index.write_index(index_path, text, segments)
+        except OSError as e:
+            print(f"⚠️  無法寫入時間索引: {e}")
+            return
+        print(f"🕒 已儲存 {count} 個片段的時間索引: {index_path.name}")
+    
+    def _index_output(self, path, text, kind):
+        """將寫出的檔案加入全文索引 (kind 為 None 表示逐字稿)；索引失敗不影響轉錄與整理結果"""
+        if self.search_index is None:
+            return
+        if kind is None:
+            from transcript_search import TRANSCRIPT_KIND
+            kind = TRANSCRIPT_KIND
+        try:
+            self.search_index.add(path, text, kind)
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  無法更新搜尋索引: {e}")
+    
+    def process_text_file(self, text_file_path, summary_type="重點整理", stream=False):
         """
         處理已存在的文字檔案，進行整理
         
         Args:
             text_file_path (str): 文字檔案路徑
-            summary_type (str): 整理類型
+            summary_type (str): 整理類型 (可用逗號分隔多個類型，或 all)
+            stream (bool): 整理結果是否邊產生邊顯示並寫入檔案
         
         Returns:
-            str: 整理後的文字
+            str: 整理後的文字；多個整理類型時為 {整理類型: 文字}
         """
         text_file_path = Path(text_file_path)
         
-        if not text_file_path.exists():
-            raise FileNotFoundError(f"找不到檔案: {text_file_path}")
+        with self.metrics.file_record(text_file_path, "text"):
+            if not text_file_path.exists():
+                raise FileNotFoundError(f"找不到檔案: {text_file_path}")
         
-        print(f"📄 正在處理文字檔案: {text_file_path.name}")
-        print(f"📂 檔案路徑: {text_file_path}")
+            print(f"📄 正在處理文字檔案: {text_file_path.name}")
+            print(f"📂 檔案路徑: {text_file_path}")
         
-        # 讀取文字檔案
-        print("📖 正在讀取檔案內容...")
-        try:
-            with open(text_file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        except UnicodeDecodeError:
-            print("⚠️  UTF-8 編碼讀取失敗，嘗試其他編碼...")
+            # 讀取文字檔案：由 BOM 與樣本判斷編碼，讀取時一併計算統計
+            print("📖 正在讀取檔案內容...")
+            loaded = load_text(text_file_path)
+            if loaded.encoding not in ("utf-8", "utf-8-sig"):
+                print(f"✅ 使用 {loaded.encoding.upper()} 編碼成功讀取")
+            stats = loaded.stats
+        
+            # 檢查檔案內容
+            if not stats.content_chars:
+                raise ValueError("文字檔案內容是空的或只包含空白字元")
+        
+            # 清理和預處理文字
+            text = loaded.text.strip()
+        
+            print(f"✅ 檔案讀取完成")
+            print(f"📏 原始長度: {stats.chars} 字元")
+            print(f"📏 處理後長度: {len(text)} 字元") 
+            print(f"📊 總行數: {stats.lines} 行")
+            print(f"📊 非空行數: {stats.non_empty_lines} 行")
+        
+            # 顯示文字樣本
+            sample_text = text[:200] + "..." if len(text) > 200 else text
+            print(f"📄 內容預覽: {sample_text}")
+        
+            # 檢查是否有足夠的內容進行整理
+            if len(text) < 50:
+                print("⚠️  警告：檔案內容較短，整理結果可能不理想")
+        
+            # 整理文字
+            print(f"🎯 開始進行 {'、'.join(parse_summary_types(summary_type))} 整理...")
+            summarized_text = self._summarize_and_save(text, text_file_path, summary_type, stream)
+            self.report_summary_cache()
+        
+            return summarized_text
+
+    def bulk_summarize(self, folder, summary_type="重點整理", force=False, poll_interval=None):
+        """
+        以 Batch API 整理資料夾中所有逐字稿 (.txt)，結果寫成 <原檔名>.<整理類型>.txt
+
+        所有檔案同一輪的請求打包成一個批次送出，等待完成後再送出下一輪
+        (長文本的逐層合併與最終整理)；批次中失敗的請求改以即時呼叫完成。
+
+        Args:
+            folder (str): 資料夾路徑 (包含子資料夾)
+            summary_type (str): 整理類型 (可用逗號分隔多個類型，或 all)
+            force (bool): 已有整理結果的檔案也重新整理
+            poll_interval (float): 查詢批次狀態的間隔 (秒)，預設 STT_BULK_POLL_SECONDS
+
+        Returns:
+            tuple: ({檔案: {整理類型: 文字}}, {檔案: 錯誤訊息})
+        """
+        self._require_client()
+        summary_types = parse_summary_types(summary_type)
+        folder = Path(folder)
+        if not folder.is_dir():
+            raise FileNotFoundError(f"找不到資料夾: {folder}")
+
+        documents = {}
+        skipped = 0
+        for path in sorted(folder.rglob('*.txt')):
+            # 略過隱藏檔與整理結果本身 (<錄音>.<整理類型>.txt)
+            if path.name.startswith('.') or Path(path.stem).suffix[1:] in SUMMARY_PROMPTS:
+                continue
+            if not force and all(path.with_suffix(f'.{t}.txt').exists() for t in summary_types):
+                skipped += 1
+                continue
             try:
-                with open(text_file_path, 'r', encoding='big5') as f:
-                    text = f.read()
-                print("✅ 使用 Big5 編碼成功讀取")
-            except UnicodeDecodeError:
+                text = load_text(path).text.strip()
+            except (ValueError, OSError) as e:
+                print(f"⚠️  無法讀取 {path.name}: {e}")
+                continue
+            if text:
+                documents[path] = text
+        print(f"📚 批次整理 {len(documents)} 個檔案 ({'、'.join(summary_types)})"
+              + (f"，略過 {skipped} 個已整理的檔案" if skipped else ""))
+        if not documents:
+            return {}, {}
+
+        def save(path, results):
+            for result_type, summarized_text in results.items():
+                summary_path = path.with_suffix(f'.{result_type}.txt')
+                write_text_atomic(summary_path, summarized_text)
+                self._index_output(summary_path, summarized_text, result_type)
+            print(f"💾 {path.name}: 已儲存 {'、'.join(results)}")
+
+        from batch_summarize import BulkSummarizer
+        summarizer = BulkSummarizer(
+            self,
+            state_path=os.getenv('STT_BULK_STATE', '.stt_bulk_batches.json'),
+            poll_interval=float(poll_interval or os.getenv('STT_BULK_POLL_SECONDS', '30')),
+            chunk_min_fill=CHUNK_MIN_FILL
+        )
+        start_time = time.time()
+        with self.metrics.file_record(folder, "bulk"):
+            results, failed = summarizer.run(documents, summary_types, on_done=save)
+            self.metrics.annotate(summary_type=",".join(summary_types), files=len(documents), **summarizer.counts)
+
+        counts = summarizer.counts
+        print("=" * 60)
+        print(f"📊 批次整理完成: 成功 {len(results)} 個，失敗 {len(failed)} 個，耗時 {time.time() - start_time:.1f} 秒")
+        print(f"📦 送出 {counts['batches']} 個批次共 {counts['batch_requests']} 個請求，"
+              f"快取命中 {counts['cached']} 個，改為即時呼叫 {counts['fallback']} 個")
+        return results, failed
+
+    def collect_audio_files(self, target):
+        """
+        收集批次處理要用的音訊檔案
+
+        Args:
+            target (str): 資料夾路徑或 glob 樣式 (例如 recordings/*.m4a)
+
+        Returns:
+            list: 排序後的音訊檔案路徑
+        """
+        target_path = Path(target)
+        if target_path.is_dir():
+            candidates = target_path.rglob('*')
+        else:
+            candidates = (Path(p) for p in glob.glob(str(target), recursive=True))
+
+        files = {p for p in candidates if p.is_file() and p.suffix.lower() in self.supported_formats}
+        return sorted(files)
+
+    def find_duplicates(self, files, summary_types=(), workers=4):
+        """
+        找出重複的錄音並印出省下的上傳量與費用
+
+        Returns:
+            DedupReport: 重複的錄音組與每組的代表檔案
+        """
+        import audio_dedup
+        if not audio_dedup.fingerprint_available():
+            print("⚠️  聲學指紋需要 numpy 與 ffmpeg，只偵測內容完全相同的檔案")
+        report = audio_dedup.find_duplicates(files, workers=workers)
+        report.print(summary_types)
+        return report
+
+    def _share_outputs(self, representative, duplicates, suffixes):
+        """將代表檔案的輸出複製給重複的錄音，並加入全文索引"""
+        import audio_dedup
+        for duplicate in duplicates:
+            copied = audio_dedup.copy_outputs(representative, duplicate, suffixes)
+            for path in copied:
+                if path.suffix != '.txt':
+                    continue
+                kind = Path(path.stem).suffix[1:] or None
+                self._index_output(path, path.read_text(encoding='utf-8'), kind)
+            if copied:
+                print(f"🧬 {Path(duplicate).name}: 沿用 {Path(representative).name} 的結果")
+
+    def _report_run(self, unit, total, successful, start_time, uploaded_before, summarized):
+        """印出批次或佇列執行的統計"""
+        elapsed = max(time.perf_counter() - start_time, 1e-6)
+        uploaded_mb = (self.uploaded_bytes - uploaded_before) / (1024 * 1024)
+
+        print("")
+        print("📊 批次處理完成統計:")
+        print(f"總{unit}數: {total}")
+        print(f"成功: {successful}")
+        print(f"失敗: {total - successful}")
+        print(f"⏱️  總耗時: {elapsed:.1f} 秒")
+        print(f"🚀 處理速度: {successful / elapsed * 60:.1f} {unit}/分鐘")
+        print(f"📤 上傳量: {uploaded_mb:.1f}MB ({uploaded_mb / elapsed:.2f} MB/s)")
+        if self.transcription_cache is not None:
+            stats = self.transcription_cache.stats()
+            print(f"♻️  轉錄快取: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次")
+        if summarized:
+            self.report_summary_cache()
+        self.report_scheduler()
+
+    def enqueue_batch(self, store, target, language="zh", auto_summarize=False, summary_type="重點整理", dedup=False):
+        """
+        將資料夾或 glob 中的音訊檔案加入工作佇列
+
+        dedup 時重複的錄音只加入代表檔案，其他檔案記錄在佇列中，
+        代表檔案完成各階段後複製結果 (--resume 也會照做)。
+
+        Returns:
+            int: 新加入的工作數
+        """
+        files = self.collect_audio_files(target)
+        if not files:
+            print(f"⚠️  找不到任何音訊檔案: {target}")
+            print(f"支援的格式: {', '.join(self.supported_formats)}")
+            return 0
+        import job_queue
+        stages = [job_queue.TRANSCRIBE]
+        if auto_summarize:
+            # 多種整理類型放在同一個階段，共用同一次分段處理
+            stages.append(job_queue.summarize_stage(",".join(parse_summary_types(summary_type))))
+        found = len(files)
+        if dedup:
+            report = self.find_duplicates(files, parse_summary_types(summary_type) if auto_summarize else ())
+            store.add_duplicates(report.groups)
+            files = report.representatives
+        added = store.enqueue(files, stages, language)
+        print(f"🗂️  找到 {found} 個音訊檔案，新加入 {added} 個工作")
+        return added
+
+    def process_queue(self, store, jobs=4, retry_failed=False, idle_interval=1.0):
+        """
+        以 jobs 個執行緒處理工作佇列，直到沒有可領取的工作
+
+        每個工作完成後立刻寫回 SQLite，中斷後以 --resume 從停下的地方繼續；
+        多個程序可以同時處理同一個佇列。按下 Ctrl-C 時處理中的工作會放回佇列。
+
+        Args:
+            store (JobStore): 工作佇列
+            jobs (int): 同時處理的工作數
+            retry_failed (bool): 是否重試先前失敗的工作
+            idle_interval (float): 沒有可領取的工作但仍有處理中的工作時，等待的秒數
+
+        Returns:
+            list: 每個工作的結果 (檔案路徑, 階段, 是否成功, 錯誤訊息 或 None)
+        """
+        import job_queue
+        import segment_index
+        jobs = max(1, int(jobs))
+        results = []
+        lock = threading.Lock()
+        stop = threading.Event()
+        uploaded_before = self.uploaded_bytes
+        start_time = time.perf_counter()
+
+        def run_job(job):
+            path = Path(job["file"])
+            if job["stage"] == job_queue.TRANSCRIBE:
+                self.process_file(path, language=job["language"])
+                suffixes = ['.txt', segment_index.SUFFIX]
+            else:
+                summary_type = job["stage"][len(job_queue.SUMMARIZE_PREFIX):]
+                self.process_text_file(path.with_suffix('.txt'), summary_type)
+                suffixes = [f'.{t}.txt' for t in parse_summary_types(summary_type)]
+            duplicates = store.duplicates_of(path)
+            if duplicates:
+                self._share_outputs(path, duplicates, suffixes)
+
+        def worker(index):
+            name = f"{store.owner}:{index}"
+            while not stop.is_set():
+                job = store.claim(name, retry_failed=retry_failed)
+                if job is None:
+                    if not store.has_active():
+                        return
+                    stop.wait(idle_interval)
+                    continue
+                label = f"{Path(job['file']).name} [{job['stage']}]"
                 try:
-                    with open(text_file_path, 'r', encoding='cp950') as f:
-                        text = f.read()
-                    print("✅ 使用 CP950 編碼成功讀取")
-                except UnicodeDecodeError:
-                    raise ValueError("檔案編碼無法識別，請檢查檔案格式")
-        
-        # 檢查檔案內容
-        original_length = len(text)
-        if not text.strip():
-            raise ValueError("文字檔案內容是空的或只包含空白字元")
-        
-        # 清理和預處理文字
-        text = text.strip()
-        lines = text.splitlines()
-        non_empty_lines = [line.strip() for line in lines if line.strip()]
-        
-        print(f"✅ 檔案讀取完成")
-        print(f"📏 原始長度: {original_length} 字元")
-        print(f"📏 處理後長度: {len(text)} 字元") 
-        print(f"📊 總行數: {len(lines)} 行")
-        print(f"📊 非空行數: {len(non_empty_lines)} 行")
-        
-        # 顯示文字樣本
-        sample_text = text[:200] + "..." if len(text) > 200 else text
-        print(f"📄 內容預覽: {sample_text}")
-        
-        # 檢查是否有足夠的內容進行整理
-        if len(text) < 50:
-            print("⚠️  警告：檔案內容較短，整理結果可能不理想")
-        
-        # 整理文字
-        print(f"🎯 開始進行 {summary_type} 整理...")
-        summarized_text = self.summarize_text(text, summary_type)
-        
-        # 儲存整理後的檔案
-        summary_path = text_file_path.with_suffix(f'.{summary_type}.txt')
-        print(f"💾 正在儲存整理結果...")
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            f.write(summarized_text)
-        
-        print(f"🤖 文字整理完成！已儲存到: {summary_path}")
-        
-        return summarized_text
+                    run_job(job)
+                    owned = store.complete(job["id"], name)
+                    ok, error = True, None
+                except Exception as e:
+                    owned = store.fail(job["id"], name, e)
+                    ok, error = False, str(e)
+                if not owned:
+                    print(f"⚠️  {label}: 租約已過期，工作已由其他程序重新領取，這次的結果不會寫回佇列")
+                with lock:
+                    results.append((job["file"], job["stage"], ok, error))
+                    if ok:
+                        print(f"✅ [{len(results)}] {label} 完成")
+                    else:
+                        print(f"❌ [{len(results)}] {label} 失敗 (第 {job['attempts']} 次): {error}")
+
+        print(f"🔄 開始處理工作佇列，同時處理 {jobs} 個工作")
+        print("─" * 50)
+        workers = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(jobs)]
+        for thread in workers:
+            thread.start()
+        # 處理中的工作 (例如長錄音) 可能超過租約時間，定期延長租約避免被其他程序重複領取
+        heartbeat = store.lease_seconds / 3
+        last_renewal = time.monotonic()
+        try:
+            for thread in workers:
+                while thread.is_alive():
+                    thread.join(0.5)
+                    if time.monotonic() - last_renewal >= heartbeat:
+                        try:
+                            store.renew(store.owner)
+                        except sqlite3.Error as e:
+                            print(f"⚠️  無法延長工作租約: {e}")
+                        last_renewal = time.monotonic()
+        except KeyboardInterrupt:
+            stop.set()
+            released = store.release(store.owner)
+            print(f"\n🛑 已停止，{released} 個處理中的工作已放回佇列，下次使用 --resume 繼續")
+            raise
+
+        successful = sum(1 for _, _, ok, _ in results if ok)
+        summarized = any(stage != job_queue.TRANSCRIBE for _, stage, _, _ in results)
+        self._report_run("工作", len(results), successful, start_time, uploaded_before, summarized)
+        return results
+
+def open_search_index():
+    """開啟全文索引 (STT_SEARCH_DB，預設 .stt_search.sqlite3)"""
+    from transcript_search import TranscriptIndex
+    return TranscriptIndex(os.getenv('STT_SEARCH_DB', '.stt_search.sqlite3'), summary_types=SUMMARY_PROMPTS)
+
+def search_transcripts(query, folder="recordings", limit=10, kinds=None):
+    """
+    先依修改時間增量更新資料夾的索引，再搜尋關鍵字並印出結果
+
+    Returns:
+        list: 搜尋結果
+    """
+    from transcript_search import print_results
+    index = open_search_index()
+    try:
+        if Path(folder).is_dir():
+            counts = index.update(folder)
+            if counts["indexed"] or counts["removed"]:
+                print(f"🗂️  索引已更新: 新增或變更 {counts['indexed']} 個檔案，移除 {counts['removed']} 個")
+        start_time = time.perf_counter()
+        results = index.search(query, limit=limit, kinds=kinds)
+        print_results(results, time.perf_counter() - start_time)
+        return results
+    finally:
+        index.close()
+
+def export_subtitles(path, fmt="srt", output_path=None):
+    """
+    以逐字稿的時間索引產生 SRT / VTT 字幕 (不需要 API 金鑰，也不會重新轉錄)
+    
+    Args:
+        path (str): 音訊檔或逐字稿路徑
+        fmt (str): srt / vtt
+        output_path (str): 輸出路徑 (預設為 <檔名>.srt / <檔名>.vtt)
+    
+    Returns:
+        Path: 字幕檔路徑
+    """
+    import segment_index
+    output_path, count = segment_index.export_subtitles(path, fmt, output_path)
+    print(f"🎬 已輸出 {count} 段字幕: {output_path}")
+    return output_path
+
+def seek_transcript(path, target, context=1):
+    """
+    依時間 (MM:SS、HH:MM:SS) 或文字找出逐字稿中的片段並印出前後內容
+    
+    Returns:
+        list: segment_index.seek 的結果
+    """
+    import segment_index
+    groups = segment_index.seek(path, target, context)
+    if not groups:
+        print(f"🔍 逐字稿中沒有「{target}」")
+    for rows in groups:
+        print("─" * 50)
+        for start, end, text in rows:
+            print(f"[{segment_index.format_timestamp(start, '.')[:-4]}–"
+                  f"{segment_index.format_timestamp(end, '.')[:-4]}] {text}")
+    return groups
+
+def _get_option(name, default=None):
+    """讀取命令列選項，支援 --name=值 與 --name 值 兩種寫法"""
+    flag = f"--{name}"
+    for i, arg in enumerate(sys.argv):
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+        if arg == flag and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
 
 def main():
     """主函式"""
@@ -376,27 +1365,168 @@ def main():
     
     if len(sys.argv) < 2:
         print("使用方法: python speech_to_text.py <音訊檔案路徑> [--summarize] [--type=類型]")
+        print("          python speech_to_text.py --batch <資料夾或glob> [--jobs N] [--summarize] [--type=類型] [--dedup]")
+        print("          python speech_to_text.py --resume [--jobs N]      繼續中斷的批次 (可在多個終端機同時執行)")
+        print("          python speech_to_text.py --status                 查看批次進度")
+        print("          python speech_to_text.py --watch <資料夾> [--jobs N] [--settle 秒數] [--summarize] [--type=類型]")
         print("範例: python speech_to_text.py recording.m4a")
         print("範例: python speech_to_text.py recording.m4a --summarize --type=會議紀錄")
+        print("          python speech_to_text.py --serve [--port N] [--jobs N]")
+        print("          python speech_to_text.py --live <錄音中的檔案 或 -> [--window 秒數] [--overlap 秒數] [--summarize]")
+        print("          python speech_to_text.py --search \"關鍵字\" [--in 資料夾] [--limit N] [--type=類型]")
+        print("          python speech_to_text.py --bulk-summarize <資料夾> [--type=類型] [--poll 秒數] [--force]")
+        print("          python speech_to_text.py --subtitles <音訊或逐字稿> [--format=srt|vtt] [--output 檔案]")
+        print("          python speech_to_text.py --seek <音訊或逐字稿> --at <時間 (MM:SS) 或文字>")
+        print("範例: python speech_to_text.py --batch recordings --jobs 4 --summarize")
+        print("\n選項: --no-cache  不使用本機轉錄與摘要快取")
+        print("      --stream    整理結果邊產生邊顯示並寫入檔案")
+        print("      --dedup     批次時偵測重複的錄音 (含重新編碼的副本)，每組只轉錄一次")
+        print("      --backend=openai|local|auto  轉錄引擎：OpenAI API、本機 faster-whisper，或短錄音本機、長錄音 API")
+        print("      --preprocess    上傳前轉成單聲道 16kHz Opus 以減少上傳量 (需要 ffmpeg)")
+        print("      --trim-silence  前處理時一併去除開頭與結尾的長靜音")
+        print("      --metrics[=檔案]  記錄各階段耗時 (預設 stt_metrics.jsonl)，以 python metrics.py <檔案> 產生報表")
         print("\n支援的格式: .mp3, .m4a, .wav, .mp4, .mpeg, .mpga, .webm")
         print("\n整理類型: 重點整理, 會議紀錄, 筆記整理, 摘要總結")
+        print("          --type=會議紀錄,重點整理 同時產生多種整理，--type=all 產生全部；長文本的分段摘要只做一次")
         sys.exit(1)
     
     input_file = sys.argv[1]
     auto_summarize = "--summarize" in sys.argv
+    stream = "--stream" in sys.argv
+    batch_target = _get_option("batch")
+    watch_target = _get_option("watch")
     
-    # 解析整理類型
+    # 解析整理類型 (可用逗號分隔多個類型，或 all)
     summary_type = "重點整理"
+    metrics_path = None
     for arg in sys.argv:
         if arg.startswith("--type="):
-            summary_type = arg.split("=", 1)[1]
+            summary_type = ",".join(parse_summary_types(arg.split("=", 1)[1]))
+        elif arg == "--metrics":
+            metrics_path = "stt_metrics.jsonl"
+        elif arg.startswith("--metrics="):
+            metrics_path = arg.split("=", 1)[1]
+    
+    # 批次工作佇列 (記錄每個檔案每個階段的進度)
+    queue_path = _get_option("queue", os.getenv('STT_JOB_DB', '.stt_jobs.sqlite3'))
+    if "--status" in sys.argv:
+        from job_queue import JobStore
+        JobStore(queue_path).print_status()
+        return
+    
+    # 全文搜尋：不需要 API 金鑰；--type 可以是整理類型或「逐字稿」
+    search_query = _get_option("search")
+    if search_query is not None:
+        kinds = _get_option("type")
+        search_transcripts(
+            search_query,
+            folder=_get_option("in", os.getenv('STT_SEARCH_ROOT', 'recordings')),
+            limit=int(_get_option("limit", 10)),
+            kinds=[t.strip() for t in re.split(r"[,，、]", kinds) if t.strip()] if kinds else None
+        )
+        return
+    
+    # 字幕與時間定位：只讀取轉錄時寫入的時間索引，不需要 API 金鑰
+    subtitles_target = _get_option("subtitles")
+    seek_target = _get_option("seek")
+    if subtitles_target is not None or seek_target is not None:
+        try:
+            if subtitles_target is not None:
+                export_subtitles(subtitles_target, _get_option("format", "srt"), _get_option("output"))
+            else:
+                at = _get_option("at")
+                if not at:
+                    raise ValueError("請以 --at 指定時間 (例如 12:30) 或要尋找的文字")
+                seek_transcript(seek_target, at)
+        except (OSError, ValueError) as e:
+            print(f"❌ 錯誤: {e}")
+            sys.exit(1)
+        return
     
     try:
         # 建立語音轉文字實例
-        stt = SpeechToText()
+        stt = SpeechToText(use_cache="--no-cache" not in sys.argv, metrics_path=metrics_path,
+                           backend=_get_option("backend"))
+        if "--preprocess" in sys.argv:
+            stt.preprocess = True
+        if "--trim-silence" in sys.argv:
+            stt.trim_silence = True
+        # 寫出時直接加入全文索引 (否則由 --search 搜尋前依修改時間補上)
+        if os.getenv('STT_SEARCH_INDEX', '').lower() in ('1', 'true', 'yes'):
+            stt.search_index = open_search_index()
+        
+        # 服務模式：常駐背景，透過 stt_client.py 接受工作
+        if "--serve" in sys.argv:
+            from stt_server import DEFAULT_PORT, serve
+            port = int(_get_option("port", os.getenv('STT_SERVE_PORT', DEFAULT_PORT)))
+            serve(stt, port=port, jobs=int(_get_option("jobs", 2)))
+            return
+        
+        # 即時模式：邊錄音邊轉錄，錄音結束後可整理累積的逐字稿
+        live_source = _get_option("live")
+        if live_source is not None:
+            stt.process_live(
+                live_source,
+                output_txt_path=_get_option("output"),
+                auto_summarize=auto_summarize,
+                summary_type=summary_type,
+                window_seconds=float(_get_option("window", 15)),
+                overlap_seconds=float(_get_option("overlap", 2)),
+                jobs=int(_get_option("jobs", 2)),
+                idle_seconds=float(_get_option("idle", 10)),
+                stream=stream
+            )
+            return
+        
+        # 批次整理：以 Batch API 離線整理整個資料夾的逐字稿
+        bulk_target = _get_option("bulk-summarize")
+        if bulk_target is not None:
+            poll = _get_option("poll")
+            _, failed = stt.bulk_summarize(
+                bulk_target, summary_type, force="--force" in sys.argv,
+                poll_interval=float(poll) if poll else None
+            )
+            stt.report_summary_cache()
+            if failed:
+                sys.exit(1)
+            return
+        
+        # 監看模式：持續處理資料夾中新增的錄音
+        if watch_target:
+            # 監看模式無人值守，工作執行緒不能等待輸入，長文本一律分段處理並合併
+            stt.long_text_choice = "2"
+            from watch_folder import FolderWatcher
+            watcher = FolderWatcher(
+                stt, watch_target,
+                jobs=int(_get_option("jobs", 2)),
+                auto_summarize=auto_summarize,
+                summary_type=parse_summary_types(summary_type),
+                settle_seconds=float(_get_option("settle", 5))
+            )
+            watcher.run()
+            return
+        
+        # 批次模式：檔案先加入工作佇列，再由同一個程序、同一個連線池處理；
+        # 中斷後以 --resume 從停下的地方繼續
+        if batch_target or "--resume" in sys.argv:
+            from job_queue import JobStore
+            store = JobStore(queue_path)
+            # 批次處理無人值守，長文本一律分段處理並合併
+            stt.long_text_choice = "2"
+            if batch_target:
+                stt.enqueue_batch(store, batch_target, auto_summarize=auto_summarize, summary_type=summary_type,
+                                  dedup="--dedup" in sys.argv)
+            try:
+                results = stt.process_queue(store, jobs=int(_get_option("jobs", 4)), retry_failed="--resume" in sys.argv)
+            except KeyboardInterrupt:
+                sys.exit(130)
+            store.print_status()
+            if not all(ok for _, _, ok, _ in results):
+                sys.exit(1)
+            return
         
         # 處理檔案
-        text, summarized_text = stt.process_file(input_file, auto_summarize=auto_summarize, summary_type=summary_type)
+        text, summarized_text = stt.process_file(input_file, auto_summarize=auto_summarize, summary_type=summary_type, stream=stream)
         
         print("\n" + "="*60)
         print("🎯 轉錄結果:")
@@ -404,12 +1534,21 @@ def main():
         print(text)
         print("="*60)
         
-        if summarized_text:
+        if isinstance(summarized_text, dict):
+            for result_type, result_text in summarized_text.items():
+                print("\n" + "="*60)
+                print(f"🤖 {result_type}結果:")
+                print("="*60)
+                print(result_text)
+                print("="*60)
+        elif summarized_text and not stream:
             print("\n" + "="*60)
             print(f"🤖 {summary_type}結果:")
             print("="*60)
             print(summarized_text)
             print("="*60)
+        if summarized_text:
+            stt.report_summary_cache()
         
     except Exception as e:
         print(f"❌ 錯誤: {e}")
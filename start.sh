@@ -18,6 +18,14 @@ PURPLE='\033[0;35m'
 CYAN='\033[0;36m'
 NC='\033[0m' # No Color
 
+# 批次處理同時執行的檔案數 (可用環境變數 STT_BATCH_JOBS 覆寫)
+BATCH_JOBS="${STT_BATCH_JOBS:-4}"
+
+# 互動式選單使用的背景服務 (STT_SERVE=0 可停用)
+SERVE_PORT="${STT_SERVE_PORT:-8766}"
+export STT_SERVE_PORT="$SERVE_PORT"
+SERVICE_PID=""
+
 # 印出帶顏色的訊息
 print_info() {
     echo -e "${BLUE}ℹ️  $1${NC}"
@@ -43,6 +51,84 @@ print_menu() {
     echo -e "${CYAN}$1${NC}"
 }
 
+# 檢查背景服務是否可用 (服務要求權杖，權杖檔不存在表示服務尚未啟動)
+service_running() {
+    local token_file="${STT_SERVE_TOKEN_FILE:-.stt_server.token}"
+    [ -f "$token_file" ] || return 1
+    if command -v curl &> /dev/null; then
+        curl -sf --max-time 1 -H "Authorization: Bearer $(cat "$token_file")" \
+            "http://127.0.0.1:$SERVE_PORT/health" > /dev/null 2>&1
+    else
+        python3 stt_client.py health > /dev/null 2>&1
+    fi
+}
+
+# 啟動背景服務：之後的轉錄、整理、診斷都交給同一個已載入的 Python 程序
+start_service() {
+    if [ "${STT_SERVE:-1}" = "0" ] || service_running; then
+        return
+    fi
+    print_info "啟動背景服務 (port $SERVE_PORT)..."
+    (source venv/bin/activate && exec python speech_to_text.py --serve --port "$SERVE_PORT") > .stt_server.log 2>&1 &
+    SERVICE_PID=$!
+    trap stop_service EXIT
+    for _ in $(seq 1 50); do
+        if service_running; then
+            print_success "背景服務已啟動"
+            return
+        fi
+        sleep 0.2
+    done
+    print_warning "背景服務未能啟動，改用一般模式 (詳見 .stt_server.log)"
+}
+
+stop_service() {
+    if [ -n "$SERVICE_PID" ]; then
+        kill "$SERVICE_PID" 2>/dev/null || true
+        SERVICE_PID=""
+    fi
+}
+
+# 轉錄單一檔案：服務可用時交給服務，否則啟動新的 Python 程序
+# 用法: run_transcribe <檔案> [--summarize] [--stream] [--type=類型]
+run_transcribe() {
+    if service_running; then
+        python3 stt_client.py transcribe "$@"
+    else
+        source venv/bin/activate && python speech_to_text.py "$@"
+    fi
+}
+
+# 整理文字檔案 (串流模式)
+# 用法: run_summarize <檔案> <整理類型>
+run_summarize() {
+    if service_running; then
+        python3 stt_client.py summarize "$1" --type="$2" --stream
+        return
+    fi
+    source venv/bin/activate && STT_FILE="$1" STT_TYPE="$2" python -c "
+import os
+import sys
+from speech_to_text import SpeechToText
+try:
+    stt = SpeechToText()
+    # 串流模式：整理結果邊產生邊顯示並寫入檔案
+    stt.process_text_file(os.environ['STT_FILE'], os.environ['STT_TYPE'], stream=True)
+except Exception as e:
+    print(f'❌ 錯誤: {e}')
+    sys.exit(1)
+"
+}
+
+# 診斷檔案
+run_diagnose() {
+    if service_running; then
+        python3 stt_client.py diagnose "$1"
+    else
+        source venv/bin/activate && python debug_file.py "$1"
+    fi
+}
+
 # 標題
 show_title() {
     clear
@@ -140,9 +226,10 @@ show_main_menu() {
     print_menu "  6️⃣  檔案診斷工具"
     print_menu "  7️⃣  查看系統狀態"
     print_menu "  8️⃣  說明與幫助"
+    print_menu "  9️⃣  搜尋逐字稿與整理結果"
     print_menu "  0️⃣  退出程式"
     echo ""
-    print_menu "請輸入選項 (0-8): "
+    print_menu "請輸入選項 (0-9): "
 }
 
 # 單一檔案轉錄
@@ -175,7 +262,7 @@ single_file_transcription() {
     print_info "開始處理語音檔案: $(basename "$file_path")"
     echo ""
     
-    if source venv/bin/activate && python speech_to_text.py "$file_path"; then
+    if run_transcribe "$file_path"; then
         echo ""
         print_success "🎉 轉錄完成！"
     else
@@ -213,8 +300,6 @@ process_recordings_folder() {
     fi
     
     total_files=${#audio_files[@]}
-    successful=0
-    failed=0
     
     print_info "找到 $total_files 個音訊檔案"
     echo ""
@@ -258,34 +343,8 @@ process_recordings_folder() {
     print_progress "開始批次處理..."
     echo ""
     
-    # 逐一處理每個檔案
-    for i in "${!audio_files[@]}"; do
-        file="${audio_files[$i]}"
-        current=$((i + 1))
-        
-        print_progress "[$current/$total_files] 處理: $(basename "$file")"
-        echo ""
-        
-        if source venv/bin/activate && python speech_to_text.py "$file" --summarize --type="$summary_type"; then
-            ((successful++))
-            print_success "✓ $(basename "$file") 轉錄成功"
-        else
-            ((failed++))
-            print_error "✗ $(basename "$file") 轉錄失敗"
-        fi
-        
-        echo ""
-        echo "─────────────────────────────────────────────"
-        echo ""
-    done
-    
-    # 顯示統計結果
-    echo -e "${BLUE}📊 批次處理完成統計:${NC}"
-    echo "總檔案數: $total_files"
-    echo -e "${GREEN}成功: $successful${NC}"
-    echo -e "${RED}失敗: $failed${NC}"
-    
-    if [ $failed -eq 0 ]; then
+    # 在同一個 Python 程序中平行處理所有檔案
+    if source venv/bin/activate && python speech_to_text.py --batch recordings --jobs "$BATCH_JOBS" --summarize --type="$summary_type"; then
         print_success "🎉 所有檔案都成功轉錄完成！"
     else
         print_warning "⚠️  部分檔案轉錄失敗，請檢查錯誤訊息"
@@ -337,7 +396,7 @@ show_system_status() {
     # 套件狀態
     echo ""
     echo "📦 已安裝套件:"
-    pip list | grep -E "(openai|python-dotenv)" || echo "部分套件可能未安裝"
+    pip list | grep -E "(openai|python-dotenv|tiktoken)" || echo "部分套件可能未安裝"
     
     echo ""
     print_info "💡 按任意鍵返回主選單..."
@@ -363,6 +422,7 @@ show_help() {
     echo "3️⃣  轉錄+整理 - 自動整理轉錄結果"
     echo "4️⃣  批次轉錄+整理 - 批次處理並整理"
     echo "5️⃣  整理文字檔案 - 整理已有的轉錄檔案"
+    echo "9️⃣  搜尋 - 以關鍵字搜尋 recordings 中的逐字稿與整理結果"
     echo ""
     
     echo "🤖 ChatGPT 整理類型："
@@ -459,7 +519,7 @@ transcribe_and_summarize_single() {
     
     print_success "✅ 已選擇整理類型: $summary_type"
     
-    if source venv/bin/activate && python speech_to_text.py "$file_path" --summarize --type="$summary_type"; then
+    if run_transcribe "$file_path" --summarize --stream --type="$summary_type"; then
         echo ""
         print_success "🎉 轉錄和整理完成！"
     else
@@ -539,37 +599,8 @@ batch_transcribe_and_summarize() {
     print_progress "開始批次處理..."
     echo ""
     
-    successful=0
-    failed=0
-    
-    # 逐一處理每個檔案
-    for i in "${!audio_files[@]}"; do
-        file="${audio_files[$i]}"
-        current=$((i + 1))
-        
-        print_progress "[$current/$total_files] 轉錄並整理: $(basename "$file")"
-        echo ""
-        
-        if source venv/bin/activate && python speech_to_text.py "$file" --summarize --type="$summary_type"; then
-            ((successful++))
-            print_success "✓ $(basename "$file") 處理成功"
-        else
-            ((failed++))
-            print_error "✗ $(basename "$file") 處理失敗"
-        fi
-        
-        echo ""
-        echo "─────────────────────────────────────────────"
-        echo ""
-    done
-    
-    # 顯示統計結果
-    echo -e "${BLUE}📊 批次處理完成統計:${NC}"
-    echo "總檔案數: $total_files"
-    echo -e "${GREEN}成功: $successful${NC}"
-    echo -e "${RED}失敗: $failed${NC}"
-    
-    if [ $failed -eq 0 ]; then
+    # 在同一個 Python 程序中平行處理所有檔案
+    if source venv/bin/activate && python speech_to_text.py --batch recordings --jobs "$BATCH_JOBS" --summarize --type="$summary_type"; then
         print_success "🎉 所有檔案都成功處理完成！"
     else
         print_warning "⚠️  部分檔案處理失敗，請檢查錯誤訊息"
@@ -798,22 +829,7 @@ except Exception as e:
     echo ""
     
     # 使用 Python 腳本的文字整理功能
-    if source venv/bin/activate && python -c "
-from speech_to_text import SpeechToText
-import sys
-try:
-    stt = SpeechToText()
-    result = stt.process_text_file('$file_path', '$summary_type')
-    print()
-    print('='*60)
-    print('🤖 整理結果:')
-    print('='*60)
-    print(result)
-    print('='*60)
-except Exception as e:
-    print(f'❌ 錯誤: {e}')
-    sys.exit(1)
-"; then
+    if run_summarize "$file_path" "$summary_type"; then
         echo ""
         print_success "🎉 文字整理完成！"
         
@@ -899,7 +915,7 @@ diagnose_file_function() {
     echo ""
     
     # 使用 Python 診斷腳本
-    if source venv/bin/activate && python debug_file.py "$file_path"; then
+    if run_diagnose "$file_path"; then
         echo ""
         print_success "✅ 診斷完成"
     else
@@ -907,6 +923,25 @@ diagnose_file_function() {
     fi
 }
 
+# 搜尋逐字稿與整理結果
+search_transcripts_function() {
+    echo ""
+    print_info "🔎 搜尋逐字稿與整理結果"
+    echo "─────────────────────────────────────────────"
+    echo ""
+    echo "💡 多個關鍵字以空白分隔，全部都要出現"
+    echo ""
+    read -p "關鍵字: " keyword
+    
+    if [ -z "$keyword" ]; then
+        print_warning "未輸入關鍵字"
+        return
+    fi
+    
+    echo ""
+    source venv/bin/activate && python speech_to_text.py --search "$keyword" --limit 20 || print_error "搜尋失敗"
+}
+
 # 主程式邏輯
 main() {
     # 如果有參數，直接執行對應功能（向後相容）
@@ -946,6 +981,11 @@ main() {
             print_success "✅ 環境檢查完成"
         fi
         
+        # 背景服務只需要啟動一次，之後的操作不必重新載入 Python 套件
+        if [ -z "$SERVICE_PID" ]; then
+            start_service
+        fi
+        
         show_main_menu
         read -n 1 choice
         echo ""
@@ -987,6 +1027,12 @@ main() {
             8)
                 show_help
                 ;;
+            9)
+                search_transcripts_function
+                echo ""
+                print_info "💡 按任意鍵繼續..."
+                read -n 1
+                ;;
             0)
                 echo ""
                 print_success "👋 謝謝使用！"
@@ -994,7 +1040,7 @@ main() {
                 ;;
             *)
                 echo ""
-                print_warning "無效的選項，請輸入 0-8"
+                print_warning "無效的選項，請輸入 0-9"
                 echo ""
                 print_info "💡 按任意鍵繼續..."
                 read -n 1
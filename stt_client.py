@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐服務的命令列客戶端
+只使用標準函式庫，啟動時不需要載入 openai，把工作交給 python speech_to_text.py --serve 執行
+"""
+
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+DEFAULT_PORT = 8766
+
+# 服務啟動時寫入權杖的檔案 (與 stt_server.py 相同)，可用 STT_SERVE_TOKEN_FILE 指定
+TOKEN_FILE = Path(__file__).resolve().parent / ".stt_server.token"
+
+# 無法連線到服務時的結束代碼，start.sh 依此改用一般模式
+EXIT_UNAVAILABLE = 3
+
+
+class ServiceUnavailable(Exception):
+    """服務沒有啟動或無法連線"""
+
+
+def _base_url():
+    return os.getenv("STT_SERVE_URL") or f"http://127.0.0.1:{os.getenv('STT_SERVE_PORT', DEFAULT_PORT)}"
+
+
+def _token():
+    path = Path(os.getenv("STT_SERVE_TOKEN_FILE") or TOKEN_FILE)
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except OSError:
+        raise ServiceUnavailable(f"找不到服務的權杖 {path}，服務可能沒有啟動")
+
+
+def _request(method, path, payload=None, timeout=10):
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+    headers = {"Authorization": f"Bearer {_token()}"}
+    if data is not None:
+        headers["Content-Type"] = "application/json"
+    request = urllib.request.Request(_base_url() + path, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        raise RuntimeError(message)
+    except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+        raise ServiceUnavailable(f"無法連線到服務 {_base_url()}: {e}")
+
+
+def health():
+    """
+    Returns:
+        dict: 服務狀態
+    """
+    return _request("GET", "/health", timeout=2)
+
+
+def submit(kind, path, **params):
+    """
+    送出工作
+
+    Args:
+        kind (str): transcribe / summarize / diagnose
+        path (str): 檔案路徑 (會轉成絕對路徑，服務的工作目錄可能不同)
+
+    Returns:
+        str: 工作編號
+    """
+    params["path"] = str(Path(path).resolve())
+    return _request("POST", f"/{kind}", params)["id"]
+
+
+def wait(job_id, interval=0.2, output=sys.stdout):
+    """
+    等待工作完成，同時把服務端的輸出即時顯示出來
+
+    Returns:
+        dict: 工作最終狀態
+    """
+    offset = 0
+    while True:
+        job = _request("GET", f"/jobs/{job_id}?offset={offset}")
+        if job["log"]:
+            output.write(job["log"])
+            output.flush()
+        offset = job["log_offset"]
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(interval)
+
+
+def _get_option(name, default=None):
+    flag = f"--{name}"
+    for arg in sys.argv:
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def main():
+    usage = [
+        "使用方法: python stt_client.py health",
+        "          python stt_client.py transcribe <音訊檔案> [--summarize] [--type=類型] [--stream] [--language=zh]",
+        "          python stt_client.py summarize <文字檔案> [--type=類型] [--stream]",
+        "          python stt_client.py diagnose <檔案>",
+        "          python stt_client.py status [工作編號]",
+        "請先啟動服務: python speech_to_text.py --serve",
+    ]
+    if len(sys.argv) < 2:
+        print("\n".join(usage))
+        sys.exit(2)
+
+    command = sys.argv[1]
+    args = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+    summary_type = _get_option("type", "重點整理")
+    stream = "--stream" in sys.argv
+
+    try:
+        if command == "health":
+            print(json.dumps(health(), ensure_ascii=False, indent=2))
+            return
+        if command == "status":
+            if args:
+                job = _request("GET", f"/jobs/{args[0]}")
+                job.pop("log", None)
+                print(json.dumps(job, ensure_ascii=False, indent=2))
+            else:
+                for job in _request("GET", "/jobs")["jobs"]:
+                    print(f"{job['id']}  {job['kind']:<10} {job['status']:<8} {job['path']}")
+            return
+        if command not in ("transcribe", "summarize", "diagnose") or not args:
+            print("\n".join(usage))
+            sys.exit(2)
+
+        if command == "transcribe":
+            job_id = submit(command, args[0], language=_get_option("language", "zh"),
+                            summarize="--summarize" in sys.argv, summary_type=summary_type, stream=stream)
+        elif command == "summarize":
+            job_id = submit(command, args[0], summary_type=summary_type, stream=stream)
+        else:
+            job_id = submit(command, args[0])
+        job = wait(job_id)
+    except ServiceUnavailable as e:
+        print(f"⚠️  {e}", file=sys.stderr)
+        sys.exit(EXIT_UNAVAILABLE)
+    except RuntimeError as e:
+        print(f"❌ 錯誤: {e}")
+        sys.exit(1)
+
+    if job["status"] != "done":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+語音轉文字函式庫介面
+給其他服務嵌入使用：設定以參數傳入 (不讀取 .env)、不使用 print 也不讀取標準輸入，
+進度以回呼函式與 logging 回報，結果以精簡的資料類別回傳。
+
+AsyncSpeechToText 使用 OpenAI 的非同步客戶端，一個事件迴圈可以同時處理數百個請求；
+SyncSpeechToText 在背景執行緒中執行同一個事件迴圈，提供一般的同步呼叫。
+
+與命令列版本共用提示詞、快取鍵與快取內容的格式 (result_cache.transcription_keys)，
+cache_dir 指向命令列的快取資料夾 (預設 .stt_cache) 時兩者的轉錄與整理快取可以互相沿用。
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from openai import AsyncOpenAI
+
+import audio_chunker
+import http_transport
+from result_cache import ResultCache, SummaryCache, hash_file, make_key, transcription_keys
+from speech_to_text import (
+    CHUNK_MIN_FILL, CHUNK_TOKENS, MAX_INPUT_TOKENS, MAX_UPLOAD_MB, PROMPT_VERSION,
+    SpeechToText, parse_summary_types,
+)
+from text_chunker import chunk_text, count_tokens
+
+logger = logging.getLogger("stt_library")
+
+# Python 3.10 以上的資料類別使用 __slots__ (每個結果物件更小、屬性存取更快)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# 長文本的處理方式
+SPLIT = "split"
+TRUNCATE = "truncate"
+ERROR = "error"
+LONG_TEXT_MODES = (SPLIT, TRUNCATE, ERROR)
+
+
+@dataclass(**_SLOTS)
+class STTConfig:
+    """函式庫設定 (所有值都以參數傳入；from_env 可由環境變數建立)"""
+
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    transcription_model: str = "whisper-1"
+    summary_model: str = "gpt-3.5-turbo"
+    language: str = "zh"
+    # 長文本：split 分段整理後合併、truncate 只整理前 max_input_tokens、error 拋出 ValueError
+    long_text: str = SPLIT
+    max_input_tokens: int = MAX_INPUT_TOKENS
+    chunk_tokens: int = CHUNK_TOKENS
+    merge_fan_in: int = 4
+    # 超過上傳限制的檔案切段的大小上限 (MB，需要 ffmpeg)
+    chunk_size_mb: float = 24
+    # 同時進行的 API 呼叫數上限 (轉錄 / ChatGPT)
+    max_concurrent_transcriptions: int = 8
+    max_concurrent_chats: int = 32
+    # 暫時性錯誤 (429、5xx、連線中斷) 由 SDK 重試的次數
+    max_retries: int = 5
+    timeout: float = 600.0
+    # 連線池、keep-alive、HTTP/2 與各用途逾時，None 表示使用 TransportConfig 的預設值
+    transport: Optional[http_transport.TransportConfig] = None
+    # 快取資料夾，None 表示不使用快取
+    cache_dir: Optional[str] = None
+    cache_max_mb: float = 200
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """
+        由環境變數建立設定 (不會載入 .env，需要時請呼叫端自行 load_dotenv)
+
+        Args:
+            **overrides: 覆寫的設定值
+
+        Returns:
+            STTConfig: 設定
+        """
+        values = {
+            "api_key": os.getenv("OPENAI_API_KEY"),
+            "base_url": os.getenv("OPENAI_BASE_URL"),
+            "max_retries": int(os.getenv("STT_MAX_RETRIES", "5")),
+            "cache_dir": os.getenv("STT_CACHE_DIR"),
+            "cache_max_mb": float(os.getenv("STT_CACHE_MAX_MB", "200")),
+            "transport": http_transport.TransportConfig.from_env(),
+        }
+        values.update(overrides)
+        return cls(**values)
+
+
+@dataclass(**_SLOTS)
+class Segment:
+    """一段有時間戳記的轉錄文字 (秒)"""
+
+    start: float
+    end: float
+    text: str
+
+
+@dataclass(**_SLOTS)
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+    def add(self, usage):
+        """累加一次呼叫的用量 (API 回傳的 usage dict)"""
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+            self.total_tokens += usage.get("total_tokens") or 0
+
+    def as_dict(self):
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+@dataclass(**_SLOTS)
+class TranscriptionResult:
+    text: str
+    segments: tuple = ()
+    language: str = "zh"
+    # 音訊長度 (秒)，API 沒有回傳時為 None；快取命中時為最後一段的結束時間
+    duration: Optional[float] = None
+    model: str = ""
+    cache_hit: bool = False
+    # 各階段耗時 (秒)
+    timings: dict = field(default_factory=dict)
+
+
+@dataclass(**_SLOTS)
+class SummaryResult:
+    """
+    一種整理類型的結果
+
+    長文本同時產生多種整理時，共用的分段摘要只計入第一個整理類型的用量與呼叫次數，
+    各結果相加即為總用量。
+    """
+
+    summary_type: str
+    text: str
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    api_calls: int = 0
+    cache_hits: int = 0
+    # 是否經過分段處理、是否只整理了開頭、最終合併是否成功 (失敗時 text 為分段摘要)
+    long_text: bool = False
+    truncated: bool = False
+    merged: bool = True
+    timings: dict = field(default_factory=dict)
+
+
+@dataclass(**_SLOTS)
+class ProcessResult:
+    transcription: TranscriptionResult
+    # {整理類型: SummaryResult}
+    summaries: dict = field(default_factory=dict)
+
+
+@dataclass(**_SLOTS)
+class ProgressEvent:
+    """
+    進度事件
+
+    stage: transcribe (整個檔案) / audio_chunk (大型檔案的一段) / chunk (長文本的一段) /
+           condense (逐層合併) / summary (一種整理完成)
+    """
+
+    stage: str
+    done: int
+    total: int
+    detail: str = ""
+
+
+@dataclass(**_SLOTS)
+class _Tally:
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    api_calls: int = 0
+    cache_hits: int = 0
+
+
+async def _run_sync(func, *args, **kwargs):
+    """在預設的執行緒池執行會阻塞的函式 (檔案雜湊、SQLite、ffmpeg、token 計算)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def _gather(awaitables):
+    """同時執行，任何一個失敗時取消其他尚未完成的工作"""
+    tasks = [asyncio.ensure_future(aw) for aw in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class AsyncSpeechToText:
+    """
+    非同步的語音轉文字與整理
+
+    所有呼叫共用一個 AsyncOpenAI 客戶端 (連線池)；同時進行的 API 呼叫數以 semaphore 限制，
+    暫時性錯誤由 SDK 依 retry-after 重試。
+    """
+
+    def __init__(self, config=None, on_progress=None, client=None):
+        """
+        Args:
+            config (STTConfig): 設定，未指定時使用預設值 (需要另外傳入 client)
+            on_progress (callable): 進度回呼，在事件迴圈中以 ProgressEvent 呼叫
+            client (AsyncOpenAI): 自訂的客戶端 (可選)，未指定時依設定建立；自訂時上傳也使用這個客戶端
+        """
+        self.config = config or STTConfig()
+        if self.config.long_text not in LONG_TEXT_MODES:
+            raise ValueError(f"未知的長文本處理方式: {self.config.long_text} (可用: {', '.join(LONG_TEXT_MODES)})")
+        self.transport = self.config.transport or http_transport.TransportConfig()
+        upload_client = client
+        if client is None:
+            if not self.config.api_key:
+                raise ValueError("需要 api_key (STTConfig.api_key) 或自訂的 client")
+            client = AsyncOpenAI(
+                api_key=self.config.api_key, base_url=self.config.base_url,
+                max_retries=self.config.max_retries, timeout=self.config.timeout,
+                http_client=http_transport.async_client(self.transport, http_transport.API_POOL)
+            )
+            # 轉錄上傳使用另一個連線池，整理呼叫不會等在大型上傳後面
+            upload_client = client.with_options(
+                http_client=http_transport.async_client(self.transport, http_transport.UPLOAD_POOL)
+            )
+        self.client = client
+        self.upload_client = upload_client
+        self.on_progress = on_progress
+        self._transcription_slots = asyncio.Semaphore(self.config.max_concurrent_transcriptions)
+        self._chat_slots = asyncio.Semaphore(self.config.max_concurrent_chats)
+
+        self.transcription_cache = None
+        self.summary_cache = None
+        if self.config.cache_dir:
+            cache_dir = Path(self.config.cache_dir)
+            max_bytes = int(self.config.cache_max_mb * 1024 * 1024)
+            self.transcription_cache = ResultCache(cache_dir / "transcriptions.sqlite3", max_bytes=max_bytes)
+            self.summary_cache = SummaryCache(cache_dir / "summaries.sqlite3", max_bytes=max_bytes)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """關閉連線池與快取"""
+        if self.upload_client is not self.client:
+            await self.upload_client.close()
+        await self.client.close()
+        for cache in (self.transcription_cache, self.summary_cache):
+            if cache is not None:
+                cache.close()
+
+    def _progress(self, stage, done, total, detail=""):
+        logger.debug("%s %d/%d %s", stage, done, total, detail)
+        if self.on_progress is not None:
+            try:
+                self.on_progress(ProgressEvent(stage, done, total, detail))
+            except Exception:
+                logger.exception("進度回呼發生錯誤")
+
+    # ── 轉錄 ────────────────────────────────────────────────
+
+    async def transcribe(self, file_path, language=None):
+        """
+        轉錄音訊檔案 (含每段的時間戳記)；超過 25MB 的檔案在靜音處切段後同時轉錄
+
+        Args:
+            file_path (str): 音訊檔案路徑
+            language (str): 語言代碼，預設使用設定值
+
+        Returns:
+            TranscriptionResult: 轉錄結果
+        """
+        path = Path(file_path)
+        language = language or self.config.language
+        model = self.config.transcription_model
+        if not path.exists():
+            raise FileNotFoundError(f"找不到檔案: {path}")
+        started = time.perf_counter()
+        timings = {}
+
+        cache_key = None
+        if self.transcription_cache is not None:
+            digest = await _run_sync(hash_file, path)
+            cache_key, segments_key = transcription_keys(digest, language, model)
+            text = await _run_sync(self.transcription_cache.get, cache_key)
+            raw_segments = await _run_sync(self.transcription_cache.get, segments_key) if text is not None else None
+            timings["hash"] = time.perf_counter() - started
+            # 命令列在加入時間戳記之前寫入的快取沒有片段，需要重新轉錄
+            if raw_segments is not None:
+                segments = tuple(Segment(*s) for s in json.loads(raw_segments) or ())
+                timings["total"] = time.perf_counter() - started
+                self._progress("transcribe", 1, 1, path.name)
+                return TranscriptionResult(
+                    text, segments, language, segments[-1].end if segments else None, model,
+                    cache_hit=True, timings=timings
+                )
+
+        self._progress("transcribe", 0, 1, path.name)
+        step = time.perf_counter()
+        if path.stat().st_size > MAX_UPLOAD_MB * 1024 * 1024:
+            text, segments, duration = await self._transcribe_chunked(path, language, timings)
+        else:
+            text, segments, duration = await self._transcribe_file(path, language)
+        timings["transcribe"] = time.perf_counter() - step
+
+        if cache_key is not None:
+            await _run_sync(self.transcription_cache.put, cache_key, text)
+            await _run_sync(
+                self.transcription_cache.put, segments_key, json.dumps([list(s) for s in segments], ensure_ascii=False)
+            )
+        timings["total"] = time.perf_counter() - started
+        self._progress("transcribe", 1, 1, path.name)
+        return TranscriptionResult(
+            text, tuple(Segment(*s) for s in segments), language, duration, model, timings=timings
+        )
+
+    async def _transcribe_file(self, path, language):
+        """
+        Returns:
+            tuple: (文字, [(開始, 結束, 文字), ...], 音訊長度)
+        """
+        # 以 mmap 逐塊上傳 (直接傳入路徑時 SDK 會先把整個檔案讀進記憶體)
+        async with self._transcription_slots:
+            with http_transport.MappedUpload(path) as upload:
+                response = await self.upload_client.audio.transcriptions.create(
+                    model=self.config.transcription_model,
+                    file=upload,
+                    language=language,
+                    response_format="verbose_json",
+                    timeout=self.transport.timeout(http_transport.TRANSCRIPTION),
+                )
+        segments = [(s.start, s.end, s.text.strip()) for s in (getattr(response, "segments", None) or [])]
+        return response.text, segments, getattr(response, "duration", None)
+
+    async def _transcribe_chunked(self, path, language, timings):
+        try:
+            audio_chunker.check_ffmpeg()
+        except RuntimeError as e:
+            raise ValueError(f"檔案超過 {MAX_UPLOAD_MB}MB 且無法分段: {e}")
+        step = time.perf_counter()
+        duration = await _run_sync(audio_chunker.probe_duration, path)
+        silences = await _run_sync(audio_chunker.detect_silences, path)
+        chunks = audio_chunker.plan_chunks(
+            duration, path.stat().st_size, silences, int(min(self.config.chunk_size_mb, MAX_UPLOAD_MB) * 1024 * 1024)
+        )
+        timings["silence_detect"] = time.perf_counter() - step
+        done = 0
+
+        with tempfile.TemporaryDirectory(prefix="stt_chunks_") as temp_dir:
+            async def run_chunk(index, start, end):
+                nonlocal done
+                chunk_path = Path(temp_dir) / f"chunk_{index:03d}{path.suffix}"
+                await _run_sync(audio_chunker.extract_chunk, path, start, end, chunk_path)
+                chunk_mb = chunk_path.stat().st_size / (1024 * 1024)
+                if chunk_mb > MAX_UPLOAD_MB:
+                    raise ValueError(f"第 {index + 1} 段仍然太大 ({chunk_mb:.1f}MB)，請調低 chunk_size_mb")
+                result = await self._transcribe_file(chunk_path, language)
+                done += 1
+                self._progress("audio_chunk", done, len(chunks), path.name)
+                return result
+
+            parts = await _gather(run_chunk(i, start, end) for i, (start, end) in enumerate(chunks))
+
+        segments = audio_chunker.stitch_segments([part[1] for part in parts], chunks)
+        if all(part[1] for part in parts):
+            text = audio_chunker.join_segments(segments)
+        else:
+            text = audio_chunker.stitch_transcripts([part[0] for part in parts])
+        return text, segments, duration
+
+    # ── 整理 ────────────────────────────────────────────────
+
+    async def summarize(self, text, summary_type="重點整理"):
+        """
+        整理文字
+
+        Returns:
+            SummaryResult: 整理結果
+        """
+        return (await self.summarize_many(text, [summary_type]))[summary_type]
+
+    async def summarize_many(self, text, summary_types):
+        """
+        一次產生多種整理結果：長文本的分段摘要與逐層合併只做一次，之後同時進行各類型的最終整理
+
+        Args:
+            text (str): 需要整理的文字
+            summary_types (list): 整理類型 (也可以是 parse_summary_types 接受的字串)
+
+        Returns:
+            dict: {整理類型: SummaryResult}，順序與 summary_types 相同
+        """
+        summary_types = parse_summary_types(summary_types)
+        started = time.perf_counter()
+        timings = {}
+        shared = _Tally()
+        text, long_text, truncated = await self._prepare_text(text)
+
+        combined_summary = None
+        if long_text:
+            step = time.perf_counter()
+            combined_summary = await self._condense_long_text(text, shared)
+            timings["chunks"] = time.perf_counter() - step
+            requests = {t: SpeechToText._merge_request(combined_summary, t) for t in summary_types}
+        else:
+            requests = {t: SpeechToText._single_request(text, t) for t in summary_types}
+
+        tallies = {t: _Tally() for t in summary_types}
+        done = 0
+
+        async def finish(summary_type):
+            nonlocal done
+            merged = True
+            try:
+                result = await self._chat(requests[summary_type], tallies[summary_type])
+            except Exception:
+                if combined_summary is None:
+                    raise
+                # 與命令列版本相同：最終合併失敗時回傳分段摘要
+                logger.warning("最終合併失敗 (%s)，回傳分段摘要", summary_type, exc_info=True)
+                result, merged = combined_summary, False
+            done += 1
+            self._progress("summary", done, len(summary_types), summary_type)
+            return result, merged
+
+        step = time.perf_counter()
+        outputs = await _gather(finish(t) for t in summary_types)
+        timings["merge" if long_text else "summarize"] = time.perf_counter() - step
+        timings["total"] = time.perf_counter() - started
+
+        results = {}
+        for i, (summary_type, (result_text, merged)) in enumerate(zip(summary_types, outputs)):
+            tally = tallies[summary_type]
+            if i == 0:
+                tally.usage.add(shared.usage.as_dict())
+                tally.api_calls += shared.api_calls
+                tally.cache_hits += shared.cache_hits
+            results[summary_type] = SummaryResult(
+                summary_type, result_text, tally.usage, tally.api_calls, tally.cache_hits,
+                long_text, truncated, merged, dict(timings)
+            )
+        return results
+
+    async def _prepare_text(self, text):
+        """
+        Returns:
+            tuple: (要整理的文字, 是否需要分段處理, 是否已截斷)
+        """
+        model = self.config.summary_model
+        tokens = await _run_sync(count_tokens, text, model)
+        if tokens <= self.config.max_input_tokens:
+            return text, False, False
+        if self.config.long_text == ERROR:
+            raise ValueError(f"文字長度 {tokens} tokens 超過上限 {self.config.max_input_tokens}")
+        if self.config.long_text == TRUNCATE:
+            chunks = await _run_sync(chunk_text, text, self.config.max_input_tokens, model)
+            return chunks[0], False, True
+        return text, True, False
+
+    async def _condense_long_text(self, text, tally):
+        """分段摘要 (同時進行) 後逐層合併，直到可以一次完成最終整理"""
+        model = self.config.summary_model
+        chunks = await _run_sync(chunk_text, text, self.config.chunk_tokens, model, min_fill=CHUNK_MIN_FILL)
+        done = 0
+
+        async def summarize_chunk(index, chunk):
+            nonlocal done
+            summary = await self._chat(SpeechToText._chunk_request(index, len(chunks), chunk), tally)
+            done += 1
+            self._progress("chunk", done, len(chunks))
+            return summary
+
+        summaries = await _gather(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks))
+
+        fan_in = max(2, int(self.config.merge_fan_in))
+        level = 1
+        while len(summaries) > 1:
+            combined = SpeechToText._combine_summaries(summaries)
+            if await _run_sync(count_tokens, combined, model) <= self.config.max_input_tokens:
+                break
+            groups = [summaries[i:i + fan_in] for i in range(0, len(summaries), fan_in)]
+            self._progress("condense", level, level, f"{len(summaries)} → {len(groups)}")
+            summaries = await _gather(self._chat(SpeechToText._condense_request(group), tally) for group in groups)
+            level += 1
+        return SpeechToText._combine_summaries(summaries)
+
+    async def _chat(self, request, tally):
+        """呼叫 ChatGPT (先查摘要快取)，用量記錄到 tally"""
+        system_content, user_content, max_tokens, cache_parts = request
+        cache_key = make_key("summary", PROMPT_VERSION, self.config.summary_model, *cache_parts)
+        if self.summary_cache is not None:
+            cached = await _run_sync(self.summary_cache.get_result, cache_key)
+            if cached is not None:
+                tally.cache_hits += 1
+                return cached
+
+        async with self._chat_slots:
+            response = await self.client.chat.completions.create(
+                model=self.config.summary_model,
+                messages=[
+                    {"role": "system", "content": system_content},
+                    {"role": "user", "content": user_content}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.3,
+                timeout=self.transport.timeout(http_transport.CHAT),
+            )
+        content = response.choices[0].message.content
+        usage = response.usage.model_dump() if getattr(response, "usage", None) else None
+        tally.api_calls += 1
+        tally.usage.add(usage)
+        if self.summary_cache is not None:
+            await _run_sync(self.summary_cache.put_result, cache_key, content, usage)
+        return content
+
+    # ── 轉錄並整理 ──────────────────────────────────────────
+
+    async def process(self, file_path, summary_types=(), language=None):
+        """
+        轉錄音訊檔案，可同時產生多種整理 (不寫出任何檔案)
+
+        Returns:
+            ProcessResult: 轉錄與整理結果
+        """
+        transcription = await self.transcribe(file_path, language)
+        summaries = {}
+        if summary_types and transcription.text.strip():
+            summaries = await self.summarize_many(transcription.text, summary_types)
+        return ProcessResult(transcription, summaries)
+
+
+class SyncSpeechToText:
+    """
+    AsyncSpeechToText 的同步版本：在背景執行緒中執行一個事件迴圈，
+    所有呼叫共用同一個連線池，可以從多個執行緒同時呼叫
+    """
+
+    def __init__(self, config=None, on_progress=None, client=None):
+        """
+        Args:
+            config (STTConfig): 設定
+            on_progress (callable): 進度回呼 (在背景執行緒中呼叫)
+            client (AsyncOpenAI): 自訂的客戶端 (可選)
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="stt-library", daemon=True)
+        self._thread.start()
+        try:
+            self._async = self._call(self._create(config, on_progress, client))
+        except BaseException:
+            self._stop()
+            raise
+
+    @staticmethod
+    async def _create(config, on_progress, client):
+        # semaphore 與客戶端要在背景事件迴圈中建立
+        return AsyncSpeechToText(config, on_progress, client)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def transcribe(self, file_path, language=None):
+        """同 AsyncSpeechToText.transcribe"""
+        return self._call(self._async.transcribe(file_path, language))
+
+    def summarize(self, text, summary_type="重點整理"):
+        """同 AsyncSpeechToText.summarize"""
+        return self._call(self._async.summarize(text, summary_type))
+
+    def summarize_many(self, text, summary_types):
+        """同 AsyncSpeechToText.summarize_many"""
+        return self._call(self._async.summarize_many(text, summary_types))
+
+    def process(self, file_path, summary_types=(), language=None):
+        """同 AsyncSpeechToText.process"""
+        return self._call(self._async.process(file_path, summary_types, language))
+
+    def close(self):
+        """關閉連線池並停止背景事件迴圈"""
+        if self._loop.is_closed():
+            return
+        try:
+            self._call(self._async.aclose())
+        finally:
+            self._stop()
+
+    def _stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐服務
+讓一個已初始化的 SpeechToText (以及其 OpenAI 連線池與 API 排程器) 常駐在背景，
+透過本機 HTTP API 接受轉錄、整理與診斷工作，start.sh 與其他工具不必每次重新啟動 Python
+
+瀏覽器中的任何網頁都能對 127.0.0.1 送出請求，所以每個請求都要附上啟動時產生的權杖
+(Authorization: Bearer <權杖>)，權杖存在只有使用者可讀取的 .stt_server.token；
+送出工作還必須是 application/json，網頁無法不經 CORS 預檢送出這種請求。
+"""
+
+import contextvars
+import hmac
+import io
+import itertools
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import debug_file
+
+DEFAULT_PORT = 8766
+
+# 存放權杖的檔案 (與 stt_client.py 相同)，可用 STT_SERVE_TOKEN_FILE 指定
+TOKEN_FILE = Path(__file__).resolve().parent / ".stt_server.token"
+
+# 各種工作接受的參數，其他參數一律拒絕
+JOB_PARAMS = {
+    "transcribe": {"path", "language", "summarize", "summary_type", "stream"},
+    "summarize": {"path", "summary_type", "stream"},
+    "diagnose": {"path"},
+}
+
+# 只保留最近的工作紀錄
+MAX_FINISHED_JOBS = 200
+
+# 目前執行緒所屬的工作，print 的輸出會導到該工作的紀錄
+_current_job = contextvars.ContextVar("stt_current_job", default=None)
+
+
+def token_path():
+    return Path(os.getenv("STT_SERVE_TOKEN_FILE") or TOKEN_FILE)
+
+
+def _write_token(path):
+    """產生新的權杖並寫入只有擁有者可讀寫 (0600) 的檔案"""
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        # 檔案已存在時 os.open 不會改變權限
+        os.chmod(path, 0o600)
+        f.write(token)
+    return token
+
+
+def _remove_token(path, token):
+    """服務停止時刪除權杖檔 (已被另一個服務覆寫時保留)"""
+    try:
+        if path.read_text(encoding="utf-8") == token:
+            path.unlink()
+    except OSError:
+        pass
+
+
+class _JobOutput(io.TextIOBase):
+    """取代 sys.stdout：工作中的輸出寫入工作紀錄，其他輸出照常寫到原本的 stdout"""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+
+    def write(self, text):
+        job = _current_job.get()
+        if job is None:
+            return self._fallback.write(text)
+        job.append_log(text)
+        return len(text)
+
+    def flush(self):
+        self._fallback.flush()
+
+
+class Job:
+    """一個轉錄、整理或診斷工作"""
+
+    def __init__(self, job_id, kind, params):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._log = []
+        self._lock = threading.Lock()
+
+    def append_log(self, text):
+        with self._lock:
+            self._log.append(text)
+
+    def to_dict(self, log_offset=0):
+        """
+        Args:
+            log_offset (int): 只回傳這個位置 (字元) 之後的輸出
+
+        Returns:
+            dict: 工作狀態與新增的輸出
+        """
+        with self._lock:
+            log = "".join(self._log)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "log": log[log_offset:],
+            "log_offset": len(log),
+        }
+
+
+class STTService:
+    """管理工作佇列，所有工作共用同一個 SpeechToText 實例"""
+
+    def __init__(self, stt, jobs=2):
+        """
+        Args:
+            stt (SpeechToText): 共用的語音轉文字實例
+            jobs (int): 同時執行的工作數
+        """
+        self.stt = stt
+        # 背景服務無法互動，長文本一律分段處理並合併
+        self.stt.long_text_choice = "2"
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(jobs)))
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def submit(self, kind, params):
+        """
+        建立工作並交給執行緒池
+
+        Returns:
+            Job: 新建立的工作
+
+        Raises:
+            ValueError: 參數不是物件或包含不接受的參數
+            FileNotFoundError: 檔案不存在
+        """
+        if not isinstance(params, dict):
+            raise ValueError("參數必須是 JSON 物件")
+        unknown = set(params) - JOB_PARAMS[kind]
+        if unknown:
+            raise ValueError(f"不接受的參數: {', '.join(sorted(unknown))}")
+        handler = getattr(self, f"_run_{kind}")
+        path = Path(params.get("path") or "")
+        if not path.is_file():
+            raise FileNotFoundError(f"找不到檔案: {path}")
+        with self._lock:
+            job = Job(f"{next(self._ids):06d}", kind, params)
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, handler)
+        return job
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.finished_at is not None),
+                          key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def _run(self, job, handler):
+        token = _current_job.set(job)
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = handler(**job.params)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            print(f"❌ 錯誤: {e}")
+        finally:
+            job.finished_at = time.time()
+            _current_job.reset(token)
+
+    def _run_transcribe(self, path, language="zh", summarize=False, summary_type="重點整理", stream=False):
+        text, summarized_text = self.stt.process_file(
+            path, language=language, auto_summarize=summarize, summary_type=summary_type, stream=stream
+        )
+        result = {"text_path": str(Path(path).with_suffix(".txt")), "chars": len(text)}
+        if summarized_text is not None:
+            result["summary_paths"] = self._summary_paths(path, summary_type, summarized_text)
+        return result
+
+    def _run_summarize(self, path, summary_type="重點整理", stream=False):
+        summarized_text = self.stt.process_text_file(path, summary_type, stream=stream)
+        return {"summary_paths": self._summary_paths(path, summary_type, summarized_text)}
+
+    @staticmethod
+    def _summary_paths(path, summary_type, summarized_text):
+        """整理結果的檔案路徑 (多個整理類型時結果為 dict)"""
+        types = list(summarized_text) if isinstance(summarized_text, dict) else [summary_type]
+        return [str(Path(path).with_suffix(f".{t}.txt")) for t in types]
+
+    def _run_diagnose(self, path):
+        debug_file.diagnose_file(path)
+        return {}
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [{"id": job.id, "kind": job.kind, "status": job.status, "path": job.params.get("path")} for job in jobs]
+
+    def health(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "running": statuses.count("running"),
+            "queued": statuses.count("queued"),
+            "scheduler": self.stt.scheduler.stats(),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        """檢查權杖，不符時回應 401"""
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), self.server.token.encode()):
+            return True
+        self._reject(401, "權杖錯誤或未提供")
+        return False
+
+    def _reject(self, status, message):
+        """在讀取請求內容之前拒絕：關閉連線，未讀取的內容不會被當成下一個請求"""
+        self.close_connection = True
+        self._send_json(status, {"error": message})
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        service = self.server.service
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["health"]:
+            self._send_json(200, service.health())
+        elif parts == ["jobs"]:
+            self._send_json(200, {"jobs": service.list_jobs()})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = service.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": f"找不到工作: {parts[1]}"})
+                return
+            try:
+                offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+                if offset < 0:
+                    raise ValueError(offset)
+            except ValueError:
+                self._send_json(400, {"error": "offset 必須是非負整數"})
+                return
+            self._send_json(200, job.to_dict(offset))
+        else:
+            self._send_json(404, {"error": f"未知的路徑: {url.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        service = self.server.service
+        kind = urlparse(self.path).path.strip("/")
+        if kind not in JOB_PARAMS:
+            self._reject(404, f"未知的路徑: {self.path}")
+            return
+        content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+        if content_type != "application/json":
+            self._reject(415, "Content-Type 必須是 application/json")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            job = service.submit(kind, params)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": f"請求格式錯誤: {e}"})
+            return
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        self._send_json(202, {"id": job.id, "status": job.status})
+
+
+def serve(stt, port=DEFAULT_PORT, jobs=2, host="127.0.0.1"):
+    """
+    啟動常駐服務 (只接受本機連線)，直到 Ctrl-C
+
+    Args:
+        stt (SpeechToText): 共用的語音轉文字實例
+        port (int): 監聽埠號
+        jobs (int): 同時執行的工作數
+        host (str): 監聽位址
+    """
+    service = STTService(stt, jobs=jobs)
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    token_file = token_path()
+    server.token = _write_token(token_file)
+    sys.stdout = _JobOutput(sys.stdout)
+
+    print(f"🛰️  服務已啟動: http://{host}:{port} (同時處理 {jobs} 個工作)")
+    print(f"🔑 權杖: {token_file}")
+    print("💡 使用 python stt_client.py 送出工作，按 Ctrl-C 停止")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 服務已停止")
+    finally:
+        server.server_close()
+        service.shutdown()
+        _remove_token(token_file, server.token)
+        sys.stdout = sys.stdout._fallback
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文字分段工具
+以 token 數計算長度，並在中英文句子邊界切段，讓每段盡量接近 token 預算
+有安裝 tiktoken 時使用模型實際的 tokenizer，否則以平均值估計
+"""
+
+import math
+import re
+import zlib
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 為可選套件
+    tiktoken = None
+
+# 句子結尾：中英文句末標點或換行 (後面緊接的引號、括號歸在同一句)
+SENTENCE_BOUNDARY_RE = re.compile(
+    r"(?<=[。！？；!?;\n])(?![。！？；!?;」』”’）)\n])"
+    r"|(?<=[。！？!?][」』”’）)])"
+    r"|(?<=\.)(?=\s)"
+)
+# 內容定址切段：句子雜湊除以此數餘 0 的句子視為可切割的錨點
+ANCHOR_MODULUS = 8
+CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+# 沒有 tiktoken 時的估計：cl100k 平均每個中日韓字元約 1 個 token、英文約 4 個字元 1 個 token
+CJK_TOKENS_PER_CHAR = 1.0
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # 第一次使用時需要下載詞表，離線時改用估計值
+        return None
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """
+    計算文字的 token 數
+
+    沒有 tiktoken (或無法下載詞表) 時以每個中日韓字元 1 個、其他字元 4 個字元 1 個 token 估計。
+    估計值不刻意高估，長文本分段數與依字元切段時相同；
+    MAX_INPUT_TOKENS 保留的回覆空間足以容納估計的誤差。
+
+    Args:
+        text (str): 文字
+        model (str): 模型名稱
+
+    Returns:
+        int: token 數
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(CJK_RE.findall(text))
+    return math.ceil(cjk * CJK_TOKENS_PER_CHAR + (len(text) - cjk) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text):
+    """
+    在中英文句末標點 (。！？；. ! ?) 與換行處切成句子
+
+    Returns:
+        list: 句子 (保留原本的標點與空白，串接後等於原文)
+    """
+    return [sentence for sentence in SENTENCE_BOUNDARY_RE.split(text) if sentence]
+
+
+def _split_oversized(sentence, max_tokens, model):
+    """沒有標點的超長句子只能依字元數硬切"""
+    pieces = []
+    while sentence:
+        size = len(sentence)
+        while size > 1 and count_tokens(sentence[:size], model) > max_tokens:
+            size = max(1, size * max_tokens // count_tokens(sentence[:size], model) - 1)
+        pieces.append(sentence[:size])
+        sentence = sentence[size:]
+    return pieces
+
+
+def _is_anchor(sentence):
+    """依句子內容決定是否為錨點，與句子在全文中的位置無關"""
+    return zlib.crc32(sentence.strip().encode("utf-8")) % ANCHOR_MODULUS == 0
+
+
+def chunk_text(text, max_tokens, model="gpt-3.5-turbo", min_fill=None):
+    """
+    將文字依句子邊界切段，每段不超過 max_tokens 並盡量填滿
+
+    指定 min_fill 時改用內容定址切段：段落達到 max_tokens * min_fill 之後，
+    只在錨點句子後切開。錨點由句子內容決定，所以修改文字後，
+    修改處之前的段落不變、之後的段落很快會回到相同的切點，
+    未修改的段落可以沿用快取的整理結果。
+
+    Args:
+        text (str): 文字
+        max_tokens (int): 每段的 token 預算
+        model (str): 模型名稱 (決定使用的 tokenizer)
+        min_fill (float): 內容定址切段時每段的最低填滿比例 (0-1，可選)
+
+    Returns:
+        list: 各段文字
+    """
+    min_tokens = max_tokens * min_fill if min_fill else None
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence, model)
+        if tokens > max_tokens:
+            parts = _split_oversized(sentence, max_tokens, model)
+        else:
+            parts = [sentence]
+        for part in parts:
+            part_tokens = tokens if len(parts) == 1 else count_tokens(part, model)
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append("".join(current))
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += part_tokens
+        if min_tokens is not None and current_tokens >= min_tokens and _is_anchor(sentence):
+            chunks.append("".join(current))
+            current = []
+            current_tokens = 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
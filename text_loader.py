@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文字檔讀取工具
+先以 BOM 與開頭的樣本判斷編碼，再以增量解碼器分段讀取，
+讀取的同時一次算出字元、行數與各類字元的統計，不必重複開檔或多次掃描
+"""
+
+import codecs
+from collections import Counter
+from pathlib import Path
+
+# 依序嘗試的編碼：整理用的轉錄稿與診斷工具各自的候選清單
+TRANSCRIPT_ENCODINGS = ("utf-8", "big5", "cp950")
+DIAGNOSE_ENCODINGS = ("utf-8", "big5", "cp950", "gbk", "latin-1")
+
+# 判斷編碼時讀取的樣本大小，以及之後每次解碼的大小 (bytes)
+SAMPLE_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+# 由長到短比對，避免 UTF-32 LE 的 BOM 被誤判為 UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# str.splitlines 視為換行的字元
+LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+PREVIEW_LINES = 5
+HEAD_CHARS = 1000
+
+
+def sniff_bom(sample):
+    """
+    Returns:
+        str: 由 BOM 判斷出的編碼，沒有 BOM 時為 None
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    return None
+
+
+def detect_encoding(file_path, candidates=TRANSCRIPT_ENCODINGS, sample_size=SAMPLE_SIZE):
+    """
+    以檔案開頭的樣本判斷編碼
+
+    樣本結尾可能切在多位元組字元中間，因此以增量解碼器 (final=False) 檢查。
+
+    Args:
+        file_path (str): 檔案路徑
+        candidates (tuple): 依序嘗試的編碼
+        sample_size (int): 樣本大小 (bytes)
+
+    Returns:
+        list: 可能的編碼 (依優先順序)；有 BOM 時只有 BOM 指定的編碼
+    """
+    with open(file_path, "rb") as f:
+        sample = f.read(sample_size)
+    bom_encoding = sniff_bom(sample)
+    if bom_encoding:
+        return [bom_encoding]
+    matches = []
+    for encoding in candidates:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        matches.append(encoding)
+    return matches
+
+
+def iter_decoded(file_path, encoding, read_size=READ_SIZE):
+    """以增量解碼器分段讀取並解碼檔案，每次產生一段文字"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(file_path, "rb") as f:
+        while True:
+            data = f.read(read_size)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class TextStats:
+    """邊讀取邊累計的文字統計"""
+
+    def __init__(self):
+        self.chars = 0
+        self.whitespace = 0
+        self.cjk = 0
+        self.latin = 0
+        self.digits = 0
+        self.control = 0
+        self.control_chars = set()
+        self.lines = 0
+        self.non_empty_lines = 0
+        self.preview = []
+        self.head = ""
+        self._line_open = False
+        self._line_has_content = False
+        self._line_text = ""
+        self._after_cr = False
+
+    def update(self, text):
+        """加入一段文字"""
+        if not text:
+            return
+        if len(self.head) < HEAD_CHARS:
+            self.head += text[:HEAD_CHARS - len(self.head)]
+        self.chars += len(text)
+
+        # 以 C 實作的 Counter 掃描一次，之後只需要分類出現過的字元
+        for char, count in Counter(text).items():
+            code = ord(char)
+            if code < 32 and char not in "\n\r\t":
+                self.control += count
+                self.control_chars.add(repr(char))
+            elif char.isspace():
+                self.whitespace += count
+            elif 0x4E00 <= code <= 0x9FFF:
+                self.cjk += count
+            elif char.isascii() and char.isalpha():
+                self.latin += count
+            elif char.isdecimal():
+                self.digits += count
+
+        self._count_lines(text)
+
+    def _count_lines(self, text):
+        # 上一段結尾是 \r、這一段開頭是 \n 時，兩者是同一個換行
+        if self._after_cr and text.startswith("\n"):
+            text = text[1:]
+        self._after_cr = text.endswith("\r")
+        for part in text.splitlines(keepends=True):
+            body = part.rstrip(LINE_BREAKS)
+            has_content = self._line_has_content or bool(body.strip())
+            if len(self.preview) < PREVIEW_LINES and len(self._line_text) <= 100:
+                self._line_text += body[:101 - len(self._line_text)]
+            if len(body) == len(part):
+                # 這一行延續到下一段
+                self._line_open = True
+                self._line_has_content = has_content
+                continue
+            self._end_line(has_content)
+
+    def _end_line(self, has_content):
+        self.lines += 1
+        self.non_empty_lines += has_content
+        if len(self.preview) < PREVIEW_LINES:
+            self.preview.append(self._line_text)
+        self._line_open = False
+        self._line_has_content = False
+        self._line_text = ""
+
+    def finish(self):
+        """讀取結束時呼叫，計入最後一行沒有換行的內容"""
+        if self._line_open:
+            self._end_line(self._line_has_content)
+        return self
+
+    @property
+    def content_chars(self):
+        """非空白字元數"""
+        return self.chars - self.whitespace
+
+
+class LoadedText:
+    """讀取結果：編碼、統計，以及 (需要時) 完整文字"""
+
+    def __init__(self, path, encoding, stats, text=None):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.stats = stats
+        self.text = text
+
+
+def load_text(file_path, candidates=TRANSCRIPT_ENCODINGS, keep_text=True, read_size=READ_SIZE):
+    """
+    判斷編碼後以串流方式讀取檔案，同時計算統計
+
+    樣本之後才出現無法解碼的位元組時，改用下一個可能的編碼重新讀取。
+
+    Args:
+        file_path (str): 檔案路徑
+        candidates (tuple): 依序嘗試的編碼
+        keep_text (bool): 是否保留完整文字 (只需要統計時設為 False，記憶體用量固定)
+        read_size (int): 每次讀取的大小 (bytes)
+
+    Returns:
+        LoadedText: 讀取結果
+
+    Raises:
+        ValueError: 所有候選編碼都無法解碼
+    """
+    for encoding in detect_encoding(file_path, candidates):
+        stats = TextStats()
+        parts = [] if keep_text else None
+        try:
+            for text in iter_decoded(file_path, encoding, read_size):
+                stats.update(text)
+                if keep_text:
+                    parts.append(text)
+        except UnicodeDecodeError:
+            continue
+        return LoadedText(file_path, encoding, stats.finish(), "".join(parts) if keep_text else None)
+    raise ValueError("檔案編碼無法識別，請檢查檔案格式")
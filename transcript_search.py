@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+逐字稿與整理結果的全文檢索
+以 SQLite FTS5 建立索引：中日韓文字切成相鄰兩字 (bigram)，英文與數字以單字為單位，
+依檔案修改時間與內容雜湊增量更新，也可以在寫出檔案時直接加入索引
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from result_cache import hash_file, hash_text
+from text_loader import DIAGNOSE_ENCODINGS, load_text
+
+# 逐字稿 (<錄音>.txt) 在索引中的類型名稱；整理結果 (<錄音>.<整理類型>.txt) 使用整理類型
+TRANSCRIPT_KIND = "逐字稿"
+
+# 片段前後各保留的字元數
+SNIPPET_CONTEXT = 40
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_RE = re.compile(rf"[{_CJK}]")
+# 中日韓文字的連續區段，或其他文字與數字組成的單字
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|(?:(?![{_CJK}])[^\W_])+")
+
+
+def tokenize(text):
+    """
+    將文字轉成以空白分隔的索引詞
+
+    中日韓文字的每個區段產生所有相鄰兩字，最後再加上區段的最後一個字，
+    讓每個字都是某個索引詞的開頭 (單字查詢以前綴比對)。
+
+    Returns:
+        str: 以空白分隔的索引詞
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text):
+        if _CJK_RE.match(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return " ".join(tokens)
+
+
+def build_query(query):
+    """
+    將使用者輸入的關鍵字轉成 FTS5 查詢：以空白分隔的每個詞都必須出現，
+    中文詞以 bigram 片語比對 (字必須相連)，單一個字以前綴比對
+
+    Returns:
+        str: FTS5 查詢字串，沒有可查詢的內容時為 None
+    """
+    phrases = []
+    for run in _TOKEN_RE.findall(query):
+        if _CJK_RE.match(run) and len(run) > 1:
+            bigrams = " ".join(run[i:i + 2] for i in range(len(run) - 1))
+            phrases.append(f'"{bigrams}"')
+        else:
+            phrases.append(f'"{run}"*' if _CJK_RE.match(run) else f'"{run}"')
+    return " AND ".join(phrases) or None
+
+
+class TranscriptIndex:
+    """逐字稿與整理結果的全文索引"""
+
+    def __init__(self, db_path, summary_types=()):
+        """
+        Args:
+            db_path (str): SQLite 檔案路徑
+            summary_types (iterable): 已知的整理類型，用來由檔名判斷檔案類型
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.summary_types = set(summary_types)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY,"
+            " path TEXT NOT NULL UNIQUE,"
+            " kind TEXT NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " indexed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(tokens)")
+
+    def kind_of(self, path):
+        """
+        Returns:
+            str: 整理類型，或 TRANSCRIPT_KIND
+        """
+        kind = Path(Path(path).stem).suffix[1:]
+        return kind if kind in self.summary_types else TRANSCRIPT_KIND
+
+    def add(self, path, text, kind=None):
+        """
+        將剛寫出的檔案加入索引 (內容未變時不重建)
+
+        Args:
+            path (str): 檔案路徑
+            text (str): 檔案內容 (以 UTF-8 寫入)
+            kind (str): 檔案類型，未指定時由檔名判斷
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._upsert(path, kind or self.kind_of(path), stat, hash_text(text), text)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _upsert(self, path, kind, stat, digest, text):
+        row = self._conn.execute("SELECT id, hash FROM documents WHERE path = ?", (str(path),)).fetchone()
+        if row is not None and row[1] == digest:
+            self._conn.execute(
+                "UPDATE documents SET kind = ?, mtime_ns = ?, size = ? WHERE id = ?",
+                (kind, stat.st_mtime_ns, stat.st_size, row[0])
+            )
+            return False
+        if row is not None:
+            self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO documents (id, path, kind, mtime_ns, size, hash, indexed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (row[0] if row else None, str(path), kind, stat.st_mtime_ns, stat.st_size, digest, time.time())
+        )
+        self._conn.execute("INSERT INTO documents_fts (rowid, tokens) VALUES (?, ?)", (cursor.lastrowid, tokenize(text)))
+        return True
+
+    def update(self, folder, pattern="*.txt"):
+        """
+        增量更新資料夾的索引：修改時間或大小改變的檔案才重新計算雜湊，
+        內容確實改變才重新建立索引；已刪除的檔案從索引中移除
+
+        Args:
+            folder (str): 資料夾路徑 (包含子資料夾)
+            pattern (str): 檔名樣式
+
+        Returns:
+            dict: 新增或更新、未變更、移除的檔案數
+        """
+        folder = Path(folder).resolve()
+        files = {p: p.stat() for p in folder.rglob(pattern) if p.is_file() and not p.name.startswith(".")}
+        prefix = str(folder) + os.sep
+        with self._lock:
+            rows = self._conn.execute("SELECT id, path, mtime_ns, size FROM documents").fetchall()
+        known = {path: (doc_id, mtime_ns, size) for doc_id, path, mtime_ns, size in rows if path.startswith(prefix)}
+        counts = {"indexed": 0, "unchanged": 0, "removed": 0}
+        changed = []
+        for path, stat in files.items():
+            entry = known.get(str(path))
+            if entry is not None and entry[1:] == (stat.st_mtime_ns, stat.st_size):
+                counts["unchanged"] += 1
+            else:
+                changed.append((path, stat))
+        removed = [(doc_id,) for path, (doc_id, _, _) in known.items() if Path(path) not in files]
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for path, stat in changed:
+                    try:
+                        loaded = load_text(path, DIAGNOSE_ENCODINGS)
+                    except (ValueError, OSError):
+                        continue
+                    if self._upsert(path, self.kind_of(path), stat, hash_file(path), loaded.text):
+                        counts["indexed"] += 1
+                    else:
+                        counts["unchanged"] += 1
+                self._conn.executemany("DELETE FROM documents_fts WHERE rowid = ?", removed)
+                self._conn.executemany("DELETE FROM documents WHERE id = ?", removed)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        counts["removed"] = len(removed)
+        return counts
+
+    def search(self, query, limit=10, kinds=None):
+        """
+        搜尋關鍵字，依 BM25 相關程度排序
+
+        Args:
+            query (str): 關鍵字 (以空白分隔的多個詞都必須出現)
+            limit (int): 最多回傳幾筆
+            kinds (list): 只搜尋這些類型 (整理類型或 TRANSCRIPT_KIND)
+
+        Returns:
+            list: [{"path", "kind", "score", "snippet"}, ...]
+        """
+        match = build_query(query)
+        if match is None:
+            return []
+        sql = ("SELECT d.path, d.kind, bm25(documents_fts) AS score FROM documents_fts"
+               " JOIN documents AS d ON d.id = documents_fts.rowid WHERE documents_fts MATCH ?")
+        params = [match]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"path": path, "kind": kind, "score": -score, "snippet": make_snippet(path, query)}
+            for path, kind, score in rows
+        ]
+
+    def stats(self):
+        """
+        Returns:
+            dict: {類型: 檔案數}
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def make_snippet(path, query, context=SNIPPET_CONTEXT):
+    """
+    由檔案內容擷取第一個關鍵字出現處前後的文字，關鍵字以【】標示
+
+    Returns:
+        str: 片段 (檔案無法讀取時為空字串)
+    """
+    try:
+        text = load_text(path, DIAGNOSE_ENCODINGS).text
+    except (ValueError, OSError):
+        return ""
+    terms = sorted(set(query.split()), key=len, reverse=True)
+    lowered = text.lower()
+    found = [(lowered.find(term.lower()), term) for term in terms]
+    found = [(pos, term) for pos, term in found if pos >= 0]
+    if not found:
+        return " ".join(text[:context * 2].split())
+    pos, term = min(found)
+    start = max(0, pos - context)
+    end = min(len(text), pos + len(term) + context)
+    snippet = (
+        text[start:pos] + "【" + text[pos:pos + len(term)] + "】" + text[pos + len(term):end]
+    )
+    return ("…" if start > 0 else "") + " ".join(snippet.split()) + ("…" if end < len(text) else "")
+
+
+def print_results(results, elapsed):
+    """印出搜尋結果"""
+    if not results:
+        print(f"🔍 沒有找到符合的檔案 ({elapsed * 1000:.1f} ms)")
+        return
+    print(f"🔍 找到 {len(results)} 筆結果 ({elapsed * 1000:.1f} ms)")
+    print("─" * 60)
+    cwd = Path.cwd()
+    for i, result in enumerate(results, 1):
+        path = Path(result["path"])
+        try:
+            path = path.relative_to(cwd)
+        except ValueError:
+            pass
+        print(f"{i:2}. [{result['kind']}] {path}")
+        if result["snippet"]:
+            print(f"    {result['snippet']}")
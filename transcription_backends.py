@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轉錄引擎
+OpenAI Whisper API 與本機 CPU 引擎 (faster-whisper，int8 量化) 共用同一個介面，
+可以每次執行指定，或依錄音長度自動選擇：短錄音在本機轉錄，長錄音交給 API
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import audio_chunker
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:  # faster-whisper 為可選套件，只有本機轉錄需要
+    WhisperModel = None
+
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:  # 較舊的 faster-whisper 沒有批次解碼
+    BatchedInferencePipeline = None
+
+OPENAI = "openai"
+LOCAL = "local"
+AUTO = "auto"
+BACKENDS = (OPENAI, LOCAL, AUTO)
+
+# 無法取得長度時，以 128 kbps 由檔案大小估計 (bytes / 秒)
+ESTIMATED_BYTES_PER_SECOND = 16000
+
+
+def local_available():
+    """是否已安裝本機轉錄需要的 faster-whisper"""
+    return WhisperModel is not None
+
+
+def audio_duration(file_path):
+    """
+    取得音訊長度：優先使用 ffprobe，其次使用 faster-whisper 附帶的 PyAV，
+    都無法使用時由檔案大小估計
+
+    Returns:
+        float: 長度 (秒)
+    """
+    if shutil.which("ffprobe"):
+        try:
+            return audio_chunker.probe_duration(file_path)
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            pass
+    try:
+        import av
+        with av.open(str(file_path)) as container:
+            if container.duration:
+                return container.duration / 1_000_000
+    except (ImportError, OSError, ValueError):
+        pass
+    return Path(file_path).stat().st_size / ESTIMATED_BYTES_PER_SECOND
+
+
+class OpenAIBackend:
+    """
+    OpenAI Whisper API：沿用 SpeechToText 的排程器、前處理與大型檔案分段上傳
+    """
+
+    name = OPENAI
+
+    def __init__(self, stt):
+        self.stt = stt
+
+    @property
+    def cache_id(self):
+        # 與加入轉錄引擎之前的快取鍵相同，既有的快取仍可命中
+        return self.stt.transcription_model
+
+    def transcribe(self, file_path, language, chunk_size_mb=None, chunk_workers=None):
+        return self.stt._transcribe_path(Path(file_path), language, chunk_size_mb, chunk_workers)
+
+    def transcribe_clip(self, file_path, language):
+        """轉錄一小段音訊 (即時轉錄的片段)：直接上傳，不檢查大小也不顯示進度"""
+        return self.stt._transcribe_file(Path(file_path), language)[0]
+
+
+class LocalWhisperBackend:
+    """
+    本機 CPU 轉錄：faster-whisper (CTranslate2) 的 int8 量化模型
+
+    模型只載入一次並由所有執行緒共用；CTranslate2 以 num_workers 個工作同時解碼，
+    每個工作使用 cpu_threads 個核心。有 BatchedInferencePipeline 時，
+    同一個檔案的多個語音片段會合併成一批一起解碼。
+    """
+
+    name = LOCAL
+
+    def __init__(self, model_size="small", compute_type="int8", cpu_threads=None, num_workers=2,
+                 batch_size=8, beam_size=5):
+        """
+        Args:
+            model_size (str): 模型大小或本機模型路徑 (tiny / base / small / medium / large-v3 ...)
+            compute_type (str): 量化方式
+            cpu_threads (int): 每個解碼工作使用的執行緒數，預設平均分配所有核心
+            num_workers (int): 同時解碼的檔案數
+            batch_size (int): 批次解碼的片段數
+            beam_size (int): beam search 寬度
+        """
+        if not local_available():
+            raise RuntimeError("本機轉錄需要 faster-whisper，請執行: pip install faster-whisper")
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.num_workers = max(1, int(num_workers))
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.batch_size = batch_size
+        self.beam_size = beam_size
+        self._model = None
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_id(self):
+        return f"faster-whisper:{self.model_size}:{self.compute_type}"
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                print(f"🧠 正在載入本機模型: {self.model_size} ({self.compute_type})")
+                self._model = WhisperModel(
+                    self.model_size, device="cpu", compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads, num_workers=self.num_workers
+                )
+                if BatchedInferencePipeline is not None and self.batch_size > 1:
+                    self._pipeline = BatchedInferencePipeline(model=self._model)
+        return self._pipeline or self._model
+
+    def transcribe(self, file_path, language, chunk_size_mb=None, chunk_workers=None):
+        """
+        在本機轉錄音訊 (不需要 ffmpeg，也沒有檔案大小限制；分段參數不使用)
+
+        Returns:
+            tuple: (轉錄的文字, [(開始秒數, 結束秒數, 文字), ...])
+        """
+        print(f"🎤 正在本機轉錄: {Path(file_path).name}")
+        return self._decode(file_path, language)
+
+    def transcribe_clip(self, file_path, language):
+        """轉錄一小段音訊 (即時轉錄的片段)，不顯示進度"""
+        return self._decode(file_path, language)[0]
+
+    def _decode(self, file_path, language):
+        engine = self._load()
+        options = {"language": language, "beam_size": self.beam_size, "vad_filter": True}
+        if engine is self._pipeline:
+            options["batch_size"] = self.batch_size
+        segments, _ = engine.transcribe(str(file_path), **options)
+        # segments 是產生器，逐段取出時才實際解碼
+        segments = list(segments)
+        text = "".join(segment.text for segment in segments).strip()
+        return text, [(segment.start, segment.end, segment.text.strip()) for segment in segments]
+
+
+class BackendSelector:
+    """依設定選擇轉錄引擎：openai、local，或 auto (短錄音使用本機，長錄音使用 API)"""
+
+    def __init__(self, stt, mode=OPENAI, local_max_seconds=600, local_options=None):
+        """
+        Args:
+            stt (SpeechToText): 提供 API 轉錄的實例
+            mode (str): openai / local / auto
+            local_max_seconds (float): auto 模式下交給本機轉錄的最長錄音 (秒)
+            local_options (dict): LocalWhisperBackend 的參數
+        """
+        if mode not in BACKENDS:
+            raise ValueError(f"未知的轉錄引擎: {mode} (可用: {', '.join(BACKENDS)})")
+        if mode == LOCAL and not local_available():
+            raise RuntimeError("本機轉錄需要 faster-whisper，請執行: pip install faster-whisper")
+        self.mode = mode
+        self.local_max_seconds = local_max_seconds
+        self.local_options = local_options or {}
+        self.openai = OpenAIBackend(stt)
+        self._local = None
+        self._lock = threading.Lock()
+        if mode == AUTO and not local_available():
+            print("⚠️  未安裝 faster-whisper，自動模式一律使用 OpenAI API")
+
+    @property
+    def local(self):
+        with self._lock:
+            if self._local is None:
+                self._local = LocalWhisperBackend(**self.local_options)
+        return self._local
+
+    def select(self, file_path):
+        """
+        Returns:
+            tuple: (轉錄引擎, 音訊長度 (秒) 或 None)
+        """
+        if self.mode == OPENAI:
+            return self.openai, None
+        if self.mode == LOCAL:
+            return self.local, audio_duration(file_path)
+        if not local_available():
+            return self.openai, None
+        duration = audio_duration(file_path)
+        if duration <= self.local_max_seconds:
+            return self.local, duration
+        return self.openai, duration
+
+
+def timed_transcribe(backend, file_path, language, duration=None):
+    """
+    轉錄並計算即時率 (real-time factor，處理時間 / 音訊長度，越小越快)
+
+    Returns:
+        tuple: (文字, 片段, 處理秒數, 即時率 或 None)
+    """
+    start = time.perf_counter()
+    text, segments = backend.transcribe(file_path, language)
+    elapsed = time.perf_counter() - start
+    rtf = elapsed / duration if duration else None
+    return text, segments, elapsed, rtf
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料夾監看工具
+持續監看 recordings 資料夾，新的錄音同步完成 (大小不再變動) 後自動轉錄與整理
+Linux 使用 inotify 接收檔案事件，其他系統改用輪詢
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from atomic_file import atomic_open
+
+# inotify 事件旗標 (見 <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """以 ctypes 呼叫 Linux inotify，回報資料夾中有變動的檔名"""
+
+    def __init__(self, folder):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify 只支援 Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(str(folder)), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"無法監看資料夾: {folder}")
+
+    def wait(self, timeout):
+        """
+        等待檔案事件
+
+        Returns:
+            set: 有變動的檔名 (逾時則為空集合)
+        """
+        names = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return names
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """沒有 inotify 時的輪詢版本：比較 os.scandir 的大小與修改時間"""
+
+    def __init__(self, folder, interval=2.0):
+        self.folder = Path(folder)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {name for name, info in snapshot.items() if self._snapshot.get(name) != info}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class Manifest:
+    """記錄已轉錄與已整理的檔案，重新啟動後不會重複處理"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def _signature(file_path):
+        stat = Path(file_path).stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_done(self, file_path, summary_types=()):
+        """檔案內容未變動且已完成轉錄 (與指定的所有整理類型) 時回傳 True"""
+        with self._lock:
+            entry = self.entries.get(Path(file_path).name)
+        if not entry or not entry.get("transcribed_at"):
+            return False
+        signature = self._signature(file_path)
+        if entry["size"] != signature["size"] or entry["mtime_ns"] != signature["mtime_ns"]:
+            return False
+        return set(summary_types) <= set(entry.get("summaries", []))
+
+    def mark_done(self, file_path, summary_types=()):
+        """記錄檔案已轉錄，並附上完成的整理類型"""
+        name = Path(file_path).name
+        signature = self._signature(file_path)
+        with self._lock:
+            entry = self.entries.get(name, {})
+            # 檔案內容變動過時，舊的整理紀錄不再有效
+            unchanged = entry.get("size") == signature["size"] and entry.get("mtime_ns") == signature["mtime_ns"]
+            summaries = set(entry.get("summaries", [])) if unchanged else set()
+            summaries.update(summary_types)
+            entry.update(signature)
+            entry["transcribed_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            entry["summaries"] = sorted(summaries)
+            self.entries[name] = entry
+            self._save()
+
+    def _save(self):
+        with atomic_open(self.path) as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
+
+class FolderWatcher:
+    """
+    監看資料夾並以工作執行緒池處理新錄音
+
+    所有工作執行緒共用同一個 SpeechToText 實例 (以及其 API 連線池)。
+    """
+
+    def __init__(self, stt, folder, jobs=2, auto_summarize=False, summary_type="重點整理",
+                 settle_seconds=5.0, poll_interval=2.0, manifest_path=None):
+        """
+        Args:
+            stt (SpeechToText): 共用的語音轉文字實例
+            folder (str): 監看的資料夾
+            jobs (int): 同時處理的檔案數
+            auto_summarize (bool): 是否自動整理文字
+            summary_type (str 或 list): 整理類型 (可以是多個)
+            settle_seconds (float): 檔案大小維持不變多久才視為同步完成 (秒)
+            poll_interval (float): 無 inotify 時的輪詢間隔 (秒)
+            manifest_path (str): 處理紀錄檔路徑，預設為 <資料夾>/.stt_manifest.json
+        """
+        self.stt = stt
+        self.folder = Path(folder)
+        if not self.folder.is_dir():
+            raise FileNotFoundError(f"找不到資料夾: {self.folder}")
+        self.jobs = max(1, int(jobs))
+        self.auto_summarize = auto_summarize
+        self.summary_type = summary_type
+        self.summary_types = [summary_type] if isinstance(summary_type, str) else list(summary_type)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.manifest = Manifest(manifest_path or self.folder / ".stt_manifest.json")
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._stop = threading.Event()
+
+    def _is_audio(self, path):
+        return path.suffix.lower() in self.stt.supported_formats and not path.name.startswith(".")
+
+    def _required_summaries(self):
+        return self.summary_types if self.auto_summarize else []
+
+    def _track(self, name):
+        """記錄有變動的檔案，等大小穩定後再處理"""
+        path = self.folder / name
+        if not self._is_audio(path) or not path.is_file():
+            return
+        stat = path.stat()
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != (stat.st_size, stat.st_mtime_ns):
+            self._pending[path] = ((stat.st_size, stat.st_mtime_ns), time.monotonic())
+
+    def _release_settled(self):
+        """將大小已穩定 settle_seconds 的檔案放入處理佇列"""
+        now = time.monotonic()
+        for path, (signature, since) in list(self._pending.items()):
+            if not path.exists():
+                del self._pending[path]
+                continue
+            stat = path.stat()
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle_seconds and stat.st_size > 0:
+                del self._pending[path]
+                if not self.manifest.is_done(path, self._required_summaries()):
+                    print(f"📥 偵測到新錄音: {path.name}")
+                    self._queue.put(path)
+
+    def _worker(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            try:
+                _, summarized_text = self.stt.process_file(
+                    path, auto_summarize=self.auto_summarize, summary_type=self.summary_type
+                )
+                self.manifest.mark_done(path, self.summary_types if summarized_text is not None else [])
+                print(f"✅ {path.name} 處理完成")
+            except Exception as e:
+                print(f"❌ {path.name} 處理失敗: {e}")
+            finally:
+                self._queue.task_done()
+
+    def run(self):
+        """開始監看，直到 stop() 或 Ctrl-C"""
+        try:
+            watcher = InotifyWatcher(self.folder)
+            mode = "inotify"
+        except OSError:
+            watcher = PollingWatcher(self.folder, self.poll_interval)
+            mode = f"輪詢 (每 {self.poll_interval:g} 秒)"
+
+        print(f"👀 開始監看: {self.folder} ({mode}，同時處理 {self.jobs} 個檔案)")
+        print("💡 按 Ctrl-C 停止")
+
+        # 啟動時補處理停機期間新增或尚未完成的檔案
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                self._track(entry.name)
+
+        workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.jobs)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            while not self._stop.is_set():
+                timeout = self.settle_seconds / 2 if self._pending else self.poll_interval
+                for name in watcher.wait(timeout):
+                    self._track(name)
+                self._release_settled()
+        except KeyboardInterrupt:
+            print("\n🛑 停止監看，等待處理中的檔案完成...")
+        finally:
+            watcher.close()
+            # 尚未開始的檔案留到下次啟動時處理
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    break
+            for _ in workers:
+                self._queue.put(None)
+            for worker in workers:
+                worker.join()
+
+    def stop(self):
+        self._stop.set()